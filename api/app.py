@@ -261,6 +261,34 @@ async def get_portfolio():
         logger.error(f"Portfolio fetch failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/portfolio/frontier")
+async def get_efficient_frontier():
+    """Get the efficient frontier over current long positions"""
+    try:
+        from trading.portfolio_optimizer import portfolio_optimizer
+        
+        frontier = portfolio_optimizer.frontier()
+        return {
+            "frontier": frontier,
+            "count": len(frontier)
+        }
+        
+    except Exception as e:
+        logger.error(f"Frontier calculation failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/risk/var")
+async def get_value_at_risk():
+    """Get VaR and CVaR of open positions by every method"""
+    try:
+        from trading.var_engine import var_engine
+        
+        return var_engine.calculate()
+        
+    except Exception as e:
+        logger.error(f"VaR calculation failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/train")
 async def train_model():
     """Train ML and RL models"""
@@ -268,9 +296,9 @@ async def train_model():
         if not bot:
             raise HTTPException(status_code=503, detail="Trading bot offline")
         
-        # Import trainers
-        from ml.trainer import trainer
-        from ml.rl_trainer import rl_trainer
+        # Import trainers - TensorFlow and XGBoost only load here
+        from ml.trainer import get_trainer
+        from ml.rl_trainer import get_rl_trainer
         
         # Fetch training data
         data = await fetcher.fetch_ohlcv(
@@ -283,8 +311,8 @@ async def train_model():
             raise HTTPException(status_code=400, detail="No data available for training")
         
         # Train models
-        await trainer.train(data)
-        await rl_trainer.train(data)
+        await get_trainer().train(data)
+        await get_rl_trainer().train(data)
         
         return {
             "status": "model_trained",
@@ -295,6 +323,38 @@ async def train_model():
         logger.error(f"Training failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/train/update")
+async def update_model():
+    """Incrementally update the ML model with candles since the last training"""
+    try:
+        if not fetcher:
+            raise HTTPException(status_code=503, detail="Data fetcher offline")
+        
+        from ml.trainer import get_trainer
+        
+        data = await fetcher.fetch_ohlcv(
+            settings.TRADING["symbol"],
+            settings.TRADING["timeframe"],
+            limit=settings.ML["incremental"]["lookback_candles"]
+        )
+        
+        if not data:
+            raise HTTPException(status_code=400, detail="No data available for update")
+        
+        promoted = await get_trainer().update(data)
+        
+        return {
+            "status": "model_updated" if promoted else "update_skipped",
+            "promoted": promoted,
+            "message": "Neural-Net synced with fresh candles!" if promoted else "Current model kept"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Model update failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/predict/{symbol}")
 async def get_prediction(symbol: str):
     """Get ML/RL predictions for a symbol"""
@@ -302,8 +362,8 @@ async def get_prediction(symbol: str):
         if not bot:
             raise HTTPException(status_code=503, detail="Trading bot offline")
             
-        from ml.trainer import trainer
-        from ml.rl_trainer import rl_trainer
+        from ml.trainer import get_trainer
+        from ml.policy_inference import policy
         
         # Get latest data
         data = await fetcher.fetch_ohlcv(symbol, "1h", limit=1)
@@ -311,19 +371,9 @@ async def get_prediction(symbol: str):
         if not data:
             raise HTTPException(status_code=400, detail="No data available")
         
-        # Get predictions
-        ml_prediction = trainer.predict(data[0])
-        rl_action = rl_trainer.predict(data[0])
-        
-        # Calculate confidence
-        state = bot.prepare_state(data[0])
-        state_array = np.array(state).reshape(1, -1)
-        
-        try:
-            rl_predictions = rl_trainer.model.predict(state_array, verbose=0)
-            confidence = float(np.max(rl_predictions)) if rl_predictions.size > 0 else 0.5
-        except:
-            confidence = 0.5
+        # Get predictions - RL action and confidence come from one numpy forward pass
+        ml_prediction = get_trainer().predict(data[0])
+        rl_action, confidence = policy.predict(data[0])
         
         return {
             "symbol": symbol,
@@ -520,6 +570,15 @@ async def get_arbitrage_opportunities():
         "count": len(opportunities)
     }
 
+@app.get("/arbitrage/cycles")
+async def get_arbitrage_cycles():
+    """Get triangular and multi-hop arbitrage cycles"""
+    cycles = await arbitrage_bot.scan_cycles()
+    return {
+        "cycles": cycles,
+        "count": len(cycles)
+    }
+
 @app.post("/arbitrage/execute")
 async def execute_arbitrage(opportunity: dict):
     """Execute an arbitrage opportunity"""
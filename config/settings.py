@@ -89,12 +89,70 @@ class Settings:
                         "rsi_lower": 30
                     }
                 },
+                "risk_stats": {
+                    "window": 720,
+                    "ewma_lambda": 0.94,
+                    "min_observations": 30,
+                    "align_window": 64
+                },
+                "hedging": {
+                    "window": 251,
+                    "min_overlap": 200,
+                    "max_correlation": -0.3
+                },
+                "portfolio": {
+                    "objective": "max_sharpe",
+                    "window": 251,
+                    "frontier_points": 25,
+                    "periods_per_year": 252,
+                    "tolerance": 1e-9,
+                    "max_iterations": 10000
+                },
+                "var": {
+                    "confidence": 0.99,
+                    "horizon": 24,
+                    "window": 720,
+                    "simulations": 10000,
+                    "t_df": 5,
+                    "method": "monte_carlo",
+                    "max_var_pct": 0.05
+                },
+                "position_monitor": {
+                    "poll_interval": 1.0,
+                    "reload_interval": 60
+                },
+                "arbitrage": {
+                    "quote_aliases": {"USDT": "USD"},
+                    "max_cycle_legs": 4,
+                    "cross_exchange_cycles": True,
+                    "max_cycles": 10,
+                    "leg_timeout": 5.0,
+                    "order_book_depth": 20,
+                    "monitor": {
+                        "min_interval": 0.5,
+                        "max_interval": 30.0,
+                        "target_move": 0.0005,
+                        "rate_budget": 0.5,
+                        "burst": 5
+                    },
+                    "recorder": {
+                        "path": "data/recordings",
+                        "interval": 1.0,
+                        "book_depth": 10,
+                        "book_pairs": 10,
+                        "flush_interval": 30,
+                        "rate_budget": 0.4,
+                        "burst": 5
+                    }
+                },
                 "pair_selection": {
                     "min_volume": 1000000,
                     "min_volatility": 0.02,
                     "max_spread": 0.001,
                     "min_liquidity": 100000,
-                    "volume_spike_threshold": 0.5
+                    "volume_spike_threshold": 0.5,
+                    "concurrency_per_exchange": 4,
+                    "shortlist_size": 10
                 }
             },
             "ml": {
@@ -111,16 +169,55 @@ class Settings:
                 ],
                 "train_interval": 86400,
                 "batch_size": 1000,
-                "historical_data_years": 15
+                "historical_data_years": 15,
+                "incremental": {
+                    "update_interval": 3600,
+                    "lookback_candles": 500,
+                    "min_new_candles": 24,
+                    "holdout_candles": 48,
+                    "boost_rounds": 20,
+                    "max_logloss_increase": 0.0
+                },
+                "cross_validation": {
+                    "enabled": True,
+                    "n_splits": 5,
+                    "purge": 1,
+                    "embargo": 50,
+                    "min_train_size": 100,
+                    "max_workers": 4,
+                    "early_stopping_rounds": 10,
+                    "max_candidates": 12,
+                    "param_grid": {
+                        "max_depth": [3, 5, 7],
+                        "learning_rate": [0.05, 0.1],
+                        "n_estimators": [300]
+                    }
+                }
             },
             "rl": {
                 "model_path": "ml/rl_model.h5",
+                "policy_path": "ml/rl_policy.npz",
+                "checkpoint": {
+                    "enabled": True,
+                    "path": "ml/checkpoints/rl_checkpoint.npz",
+                    "every_episodes": 5,
+                    "memory_every_episodes": 25
+                },
                 "episodes": 100,
                 "gamma": 0.95,
                 "epsilon": 1.0,
                 "epsilon_decay": 0.995,
                 "learning_rate": 0.001,
-                "batch_size": 64
+                "batch_size": 64,
+                "memory_size": 50000,
+                "n_envs": 16,
+                "replay_every": 1,
+                "prioritized_replay": {
+                    "enabled": False,
+                    "alpha": 0.6,
+                    "beta": 0.4,
+                    "beta_increment": 0.0001
+                }
             },
             "sentiment": {
                 "api_key": os.getenv("CRYPTOPANIC_API_KEY", ""),
@@ -23,6 +23,7 @@ class DatabaseManager:
             self.db_path = os.getenv("DATABASE_URL", "sqlite:///local_trading.db").replace("sqlite:///", "")
             self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
             self.cursor = self.conn.cursor()
+            self._listeners = []
             self.init_tables()
             self.initialized = True
 
@@ -126,6 +127,7 @@ class DatabaseManager:
         # Create indexes for performance
         self.execute_query("CREATE INDEX IF NOT EXISTS idx_symbol ON historical_data(symbol)")
         self.execute_query("CREATE INDEX IF NOT EXISTS idx_timestamp ON market_data(timestamp)")
+        self.execute_query("CREATE INDEX IF NOT EXISTS idx_market_symbol_time ON market_data(symbol, timestamp)")
 
     def execute_query(self, query, params=()):
         """Execute a query with thread safety"""
@@ -151,6 +153,55 @@ class DatabaseManager:
             self.cursor.execute(query, params)
             return self.cursor.fetchone()
 
+    def add_listener(self, callback):
+        """Register callback(table, rowid, row) for writes made through this manager.
+        
+        Single-row inserts into trades, positions and portfolio pass the new
+        rowid and row; batch historical_data writes pass rowid None and the
+        list of candle rows.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, table, rowid, row):
+        for callback in list(self._listeners):
+            try:
+                callback(table, rowid, row)
+            except Exception as e:
+                print(f"Write listener flatlined: {e}")
+
+    def _insert(self, table, query, params):
+        """Insert one row and tell listeners about it"""
+        with self._lock:
+            self.cursor.execute(query, params)
+            self.conn.commit()
+            rowid = self.cursor.lastrowid
+        
+        self._notify(table, rowid, params)
+        return rowid
+
+    def record_trade(self, trade_id, symbol, side, amount, price, fee, leverage=1.0, timestamp=None):
+        """Store an executed trade"""
+        return self._insert(
+            "trades",
+            """
+            INSERT INTO trades (id, symbol, side, amount, price, fee, leverage, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (trade_id, symbol, side, amount, price, fee, leverage, timestamp or datetime.now().isoformat())
+        )
+
+    def record_position(self, position_id, symbol, side, amount, entry_price, stop_loss, take_profit, timestamp=None):
+        """Store a newly opened position"""
+        return self._insert(
+            "positions",
+            """
+            INSERT INTO positions (id, symbol, side, amount, entry_price, stop_loss, take_profit, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (position_id, symbol, side, amount, entry_price, stop_loss, take_profit,
+             timestamp or datetime.now().isoformat())
+        )
+
     def store_historical_data(self, symbol, data):
         """Store historical OHLCV data for a symbol"""
         if not data:
@@ -170,6 +221,7 @@ class DatabaseManager:
                 """,
                 rows
             )
+            self._notify("historical_data", None, rows)
 
     def store_seasonality_pattern(self, symbol, period, mean_return, volatility):
         """Store seasonality patterns for market analysis"""
@@ -185,7 +237,8 @@ class DatabaseManager:
     def update_portfolio_value(self, value):
         """Update portfolio value in Eddies"""
         try:
-            self.execute_query(
+            self._insert(
+                "portfolio",
                 "INSERT INTO portfolio (value, timestamp) VALUES (?, ?)",
                 (value, datetime.now().isoformat())
             )
@@ -655,6 +655,7 @@ class TradingApp:
         self.last_rebalance = 0
         self.last_idle_check = 0
         self.last_train = 0
+        self.last_model_update = time.time()
         self.last_data_preload = 0
         self.last_arbitrage_scan = 0
         self.last_sentiment_update = 0
@@ -2139,19 +2140,12 @@ def _update_exchange_summary(self):
     def _update_profit_display(self):
         """Update profit/loss display"""
         try:
-            portfolio_value = db.get_portfolio_value()
-            
-            # Calculate daily P&L
-            trades_today = db.fetch_all(
-                "SELECT side, amount, price, fee FROM trades WHERE timestamp >= date('now', 'start of day')"
-            )
+            from trading.risk_state import risk_state
             
-            daily_pnl = 0
-            for trade in trades_today:
-                if trade[0] == "buy":
-                    daily_pnl -= trade[1] * trade[2] + trade[3]
-                else:
-                    daily_pnl += trade[1] * trade[2] - trade[3]
+            # Pick up trades the API process recorded since the last refresh
+            risk_state.sync()
+            portfolio_value = risk_state.portfolio_value
+            daily_pnl = risk_state.daily_pnl
             
             # Calculate total P&L (simplified)
             initial_value = 1000  # Default starting value
@@ -2690,6 +2684,7 @@ def _update_exchange_summary(self):
             (self.auto_rebalance, self.last_rebalance, 7*24*3600, self.rebalance_portfolio, "last_rebalance"),
             (self.auto_idle_conversion, self.last_idle_check, 24*3600, self.convert_idle_now, "last_idle_check"),
             (self.auto_model_train, self.last_train, 7*24*3600, self.train_model, "last_train"),
+            (self.auto_model_train, self.last_model_update, settings.ML["incremental"]["update_interval"], self.update_model_now, "last_model_update"),
             (self.auto_data_preload, self.last_data_preload, 24*3600, self.preload_data_now, "last_data_preload"),
             (self.auto_arbitrage_scan, self.last_arbitrage_scan, 3600, self.scan_arbitrage, "last_arbitrage_scan"),
             (self.auto_sentiment_update, self.last_sentiment_update, 24*3600, self.view_sentiment, "last_sentiment_update"),
@@ -2773,6 +2768,24 @@ def _update_exchange_summary(self):
         from trading.trading_bot import bot
         await bot.convert_idle_funds(self.idle_target.get())
     
+    def update_model_now(self):
+        """Incrementally update the ML model with new candles (in the background)"""
+        def run_update():
+            try:
+                response = requests.post(f"{self.api_url}/train/update", timeout=120)
+                response.raise_for_status()
+                if response.json().get("promoted"):
+                    self.root.after(0, lambda: self.status_label.config(text="STATUS: Neural-Net synced with fresh candles"))
+            except Exception as e:
+                logger.error(f"Model update flatlined: {e}")
+                self.root.after(0, self._model_update_failed)
+        
+        threading.Thread(target=run_update, daemon=True).start()
+    
+    def _model_update_failed(self):
+        self.last_failed_task = "model_update"
+        self.last_error_time = time.time()
+    
     def preload_data_now(self):
         """Preload historical data"""
         try:
@@ -2854,19 +2867,12 @@ def _update_exchange_summary(self):
     def check_health_now(self):
         """Check system health"""
         try:
-            portfolio_value = db.get_portfolio_value()
-            
-            # Calculate daily P&L
-            trades_today = db.fetch_all(
-                "SELECT side, amount, price, fee FROM trades WHERE timestamp >= date('now', 'start of day')"
-            )
+            from trading.risk_state import risk_state
             
-            daily_pnl = 0
-            for trade in trades_today:
-                if trade[0] == "buy":
-                    daily_pnl -= trade[1] * trade[2] + trade[3]
-                else:
-                    daily_pnl += trade[1] * trade[2] - trade[3]
+            # Pick up trades the API process recorded since the last refresh
+            risk_state.sync()
+            portfolio_value = risk_state.portfolio_value
+            daily_pnl = risk_state.daily_pnl
             
             # Check health conditions
             if daily_pnl < -0.05 * portfolio_value:
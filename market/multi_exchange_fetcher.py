@@ -6,11 +6,13 @@ import ccxt.async_support as ccxt
 import pandas as pd
 import numpy as np
 import asyncio
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
 from config.exchange_manager import exchange_manager
 from core.database import db
+from market.price_matrix import PriceMatrix
 from utils.logger import logger
 
 class MultiExchangeFetcher:
@@ -212,65 +214,37 @@ class MultiExchangeFetcher:
         
         return all_tickers
     
-    async def find_arbitrage_opportunities(self, min_profit_percent: float = 0.5) -> List[Dict]:
-        """Find arbitrage opportunities across all exchanges"""
-        all_tickers = await self.fetch_tickers_all_exchanges()
+    async def find_arbitrage_opportunities(self, min_profit_percent: float = 0.5,
+                                           all_tickers: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+        """Find arbitrage opportunities across all exchanges (or in a given ticker snapshot)"""
+        if all_tickers is None:
+            all_tickers = await self.fetch_tickers_all_exchanges()
         opportunities = []
         
-        # Find common symbols across exchanges
-        symbol_exchanges = {}
-        for exchange, tickers in all_tickers.items():
-            for symbol in tickers:
-                if symbol not in symbol_exchanges:
-                    symbol_exchanges[symbol] = []
-                symbol_exchanges[symbol].append(exchange)
+        # Symbols quoted on at least two exchanges
+        symbol_counts = Counter(symbol for tickers in all_tickers.values() for symbol in tickers)
+        symbols = [symbol for symbol, count in symbol_counts.items() if count >= 2]
         
-        # Check for arbitrage opportunities
-        for symbol, exchanges in symbol_exchanges.items():
-            if len(exchanges) < 2:
-                continue
-            
-            prices = {}
-            for exchange in exchanges:
-                ticker = all_tickers[exchange].get(symbol)
-                if ticker and ticker.get('bid') and ticker.get('ask'):
-                    prices[exchange] = {
-                        'bid': ticker['bid'],
-                        'ask': ticker['ask'],
-                        'volume': ticker.get('quoteVolume', 0)
-                    }
-            
-            # Find best arbitrage opportunity for this symbol
-            for buy_exchange, buy_data in prices.items():
-                for sell_exchange, sell_data in prices.items():
-                    if buy_exchange == sell_exchange:
-                        continue
-                    
-                    # Calculate profit
-                    buy_price = buy_data['ask']
-                    sell_price = sell_data['bid']
-                    
-                    if buy_price > 0 and sell_price > buy_price:
-                        # Account for fees
-                        buy_fee = self._exchange_configs[buy_exchange].get('fee_taker', 0.001)
-                        sell_fee = self._exchange_configs[sell_exchange].get('fee_taker', 0.001)
-                        
-                        profit_percent = ((sell_price / buy_price) - 1 - buy_fee - sell_fee) * 100
-                        
-                        if profit_percent >= min_profit_percent:
-                            opportunities.append({
-                                'symbol': symbol,
-                                'buy_exchange': buy_exchange,
-                                'sell_exchange': sell_exchange,
-                                'buy_price': buy_price,
-                                'sell_price': sell_price,
-                                'profit_percent': profit_percent,
-                                'volume': min(buy_data['volume'], sell_data['volume'])
-                            })
+        # Pack into a (symbol x exchange) matrix and test every combination at once
+        exchanges = list(all_tickers)
+        fees = [self._exchange_configs.get(exchange, {}).get('fee_taker', 0.001) for exchange in exchanges]
+        matrix = PriceMatrix.from_tickers(all_tickers, symbols, fees=fees)
+        rows, buys, sells, profits = matrix.candidates(min_profit_percent)
         
-        # Sort by profit percentage
-        opportunities.sort(key=lambda x: x['profit_percent'], reverse=True)
+        for row, i, j, profit_percent in zip(rows, buys, sells, profits):
+            buy_price, sell_price = matrix.ask[row, i], matrix.bid[row, j]
+            if sell_price > buy_price:
+                opportunities.append({
+                    'symbol': symbols[row],
+                    'buy_exchange': exchanges[i],
+                    'sell_exchange': exchanges[j],
+                    'buy_price': float(buy_price),
+                    'sell_price': float(sell_price),
+                    'profit_percent': float(profit_percent),
+                    'volume': float(min(matrix.volume[row, i], matrix.volume[row, j]))
+                })
         
+        # Candidates come back sorted by profit percentage
         return opportunities
     
     async def execute_arbitrage(self, opportunity: Dict, amount: float) -> Tuple[bool, str]:
@@ -0,0 +1,64 @@
+# market/order_book.py
+"""
+Arasaka Depth Gauge - Order book walks for VWAP fills and size-dependent arbitrage profit
+"""
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+def _levels(side: List) -> Tuple[np.ndarray, np.ndarray]:
+    """(prices, sizes) of a ccxt book side, empty levels dropped"""
+    levels = np.array([level[:2] for level in side], dtype=float).reshape(-1, 2)
+    levels = levels[levels[:, 1] > 0]
+    return levels[:, 0], levels[:, 1]
+
+def cumulative(side: List) -> Tuple[np.ndarray, np.ndarray]:
+    """Cumulative size and quote notional at each level boundary, starting from zero"""
+    prices, sizes = _levels(side)
+    return np.r_[0.0, np.cumsum(sizes)], np.r_[0.0, np.cumsum(prices * sizes)]
+
+def fill_curve(asks: List, bids: List, buy_fee: float = 0.0, sell_fee: float = 0.0,
+               max_amount: Optional[float] = None, max_cost: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """Buy-the-asks / sell-the-bids fills at every size where either book changes price.
+    
+    Cost and revenue are piecewise linear in size with kinks at the level
+    boundaries, so profit after fees (concave in size) peaks at one of
+    those boundaries - or at the cap, when max_amount (base) or max_cost
+    (quote spent on the buy leg) cuts the walk short.
+    """
+    ask_size, ask_cost = cumulative(asks)
+    bid_size, bid_revenue = cumulative(bids)
+    
+    limit = min(ask_size[-1], bid_size[-1])
+    if max_amount is not None:
+        limit = min(limit, max_amount)
+    if max_cost is not None:
+        limit = min(limit, float(np.interp(max_cost, ask_cost, ask_size)))
+    
+    sizes = np.union1d(np.r_[ask_size, bid_size], [limit])
+    sizes = sizes[(sizes > 0) & (sizes <= limit)]
+    
+    cost = np.interp(sizes, ask_size, ask_cost)
+    revenue = np.interp(sizes, bid_size, bid_revenue)
+    buy_vwap, sell_vwap = cost / sizes, revenue / sizes
+    return {
+        'amount': sizes,
+        'buy_vwap': buy_vwap,
+        'sell_vwap': sell_vwap,
+        'net_profit_percent': (sell_vwap / buy_vwap - 1 - buy_fee - sell_fee) * 100,
+        'profit': revenue * (1 - sell_fee) - cost * (1 + buy_fee)
+    }
+
+def best_fill(asks: List, bids: List, buy_fee: float = 0.0, sell_fee: float = 0.0,
+              min_profit_percent: float = 0.0, max_amount: Optional[float] = None,
+              max_cost: Optional[float] = None) -> Optional[Dict]:
+    """Size with the most profit after fees whose average margin still clears min_profit_percent"""
+    if not asks or not bids:
+        return None
+    
+    curve = fill_curve(asks, bids, buy_fee, sell_fee, max_amount, max_cost)
+    eligible = (curve['net_profit_percent'] >= min_profit_percent) & (curve['profit'] > 0)
+    if not eligible.any():
+        return None
+    
+    k = int(np.argmax(np.where(eligible, curve['profit'], -np.inf)))
+    return {name: float(values[k]) for name, values in curve.items()}
@@ -0,0 +1,57 @@
+# market/pair_screener.py
+"""
+Arasaka Sieve - Whole-universe pair screening from one ticker snapshot per exchange
+"""
+from typing import Dict, List, Optional
+import numpy as np
+
+SCREEN_FIELDS = ("bid", "ask", "last", "high", "low", "quoteVolume", "baseVolume")
+
+def ticker_arrays(tickers: Dict[str, Dict], symbols: List[str]) -> Dict[str, np.ndarray]:
+    """SCREEN_FIELDS as float arrays aligned with symbols, NaN where a ticker leaves them out"""
+    values = np.array([[tickers[symbol].get(field) for field in SCREEN_FIELDS] for symbol in symbols],
+                      dtype=float).reshape(-1, len(SCREEN_FIELDS))
+    return dict(zip(SCREEN_FIELDS, values.T))
+
+def screen_tickers(tickers: Dict[str, Dict], min_volume: float, max_spread: float, min_volatility: float,
+                   quote: str = "USDT", markets: Optional[Dict] = None, limit: Optional[int] = None) -> List[Dict]:
+    """Spot markets in quote that clear the volume, spread and volatility floors, highest volume first.
+    
+    A ticker carries no candles, so volatility here is the 24h high-low range
+    over the last price. That range is wider than typical candle-to-candle
+    moves, which makes the floor a loose first cut - the candle-based check in
+    deep evaluation still decides. Markets missing a field fail the filter it
+    feeds. With markets given, inactive symbols are skipped.
+    """
+    symbols = [
+        symbol for symbol in tickers
+        if symbol.endswith(f"/{quote}")
+        and (markets is None or markets.get(symbol, {}).get("active", False))
+    ]
+    if not symbols:
+        return []
+    
+    t = ticker_arrays(tickers, symbols)
+    # Some venues only report base volume
+    volume = np.where(np.isnan(t["quoteVolume"]), t["baseVolume"] * t["last"], t["quoteVolume"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spread = (t["ask"] - t["bid"]) / t["bid"]
+        volatility = (t["high"] - t["low"]) / t["last"]
+    
+    passed = (
+        (volume >= min_volume)
+        & (t["bid"] > 0) & (t["ask"] >= t["bid"]) & (spread <= max_spread)
+        & (t["last"] > 0) & (volatility >= min_volatility)
+    )
+    
+    rows = np.flatnonzero(passed)
+    rows = rows[np.argsort(-volume[rows], kind="stable")][:limit]
+    return [
+        {
+            "symbol": symbols[k],
+            "volume": float(volume[k]),
+            "spread": float(spread[k]),
+            "volatility": float(volatility[k])
+        }
+        for k in rows
+    ]
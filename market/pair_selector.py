@@ -9,15 +9,25 @@ import asyncio
 
 from config.settings import settings
 from core.database import db
+from market.pair_screener import screen_tickers
 from utils.logger import logger
 
 class PairSelector:
     def __init__(self):
         self.exchanges = {}
         self._initialized = False
-        self.ml_trainer = None
-        self.rl_trainer = None
+        self.policy = None
         self.fetcher = None
+        self.concurrency = settings.TRADING.get("pair_selection", {}).get("concurrency_per_exchange", 4)
+        self.shortlist_size = settings.TRADING.get("pair_selection", {}).get("shortlist_size", 10)
+        self._semaphores = {}
+        self._semaphore_loop = None
+    
+    @property
+    def ml_trainer(self):
+        """XGBoost trainer, loaded on first evaluation rather than at startup"""
+        from ml.trainer import get_trainer
+        return get_trainer()
     
     async def initialize(self):
         """Initialize exchanges and dependencies"""
@@ -26,12 +36,10 @@ class PairSelector:
             
         try:
             # Import dependencies
-            from ml.trainer import trainer
-            from ml.rl_trainer import rl_trainer
+            from ml.policy_inference import policy
             from market.data_fetcher import fetcher
             
-            self.ml_trainer = trainer
-            self.rl_trainer = rl_trainer
+            self.policy = policy
             self.fetcher = fetcher
             
             # Initialize exchanges
@@ -69,37 +77,16 @@ class PairSelector:
             best_pair = None
             best_score = -float('inf')
             
-            for ex_name, exchange in self.exchanges.items():
-                try:
-                    # Load markets
-                    await exchange.load_markets()
-                    
-                    # Get active USDT pairs
-                    pairs = [
-                        symbol for symbol in exchange.markets.keys()
-                        if symbol.endswith("/USDT") and exchange.markets[symbol]["active"]
-                    ]
-                    
-                    # Limit to top pairs for performance
-                    top_pairs = ["BTC/USDT", "ETH/USDT", "BNB/USDT", "ADA/USDT", "SOL/USDT", 
-                                "DOGE/USDT", "XRP/USDT", "DOT/USDT", "MATIC/USDT", "SHIB/USDT"]
-                    pairs_to_check = [p for p in top_pairs if p in pairs][:10]
-                    
-                    for pair in pairs_to_check:
-                        try:
-                            score = await self._evaluate_pair(ex_name, pair, timeframe, limit)
-                            
-                            if score > best_score:
-                                best_score = score
-                                best_pair = f"{ex_name}:{pair}"
-                                
-                        except Exception as e:
-                            logger.error(f"Failed to evaluate {pair}: {e}")
-                            continue
-                            
-                except Exception as e:
-                    logger.error(f"Market loading failed for {ex_name}: {e}")
-                    continue
+            # Without a ticker snapshot, limit to top pairs for performance
+            top_pairs = ["BTC/USDT", "ETH/USDT", "BNB/USDT", "ADA/USDT", "SOL/USDT", 
+                        "DOGE/USDT", "XRP/USDT", "DOT/USDT", "MATIC/USDT", "SHIB/USDT"]
+            
+            candidates, tickers = await self._candidates(lambda pairs: [p for p in top_pairs if p in pairs][:10])
+            
+            async for ex_name, pair, score in self.evaluate_pairs(candidates, timeframe, limit, tickers):
+                if score > best_score:
+                    best_score = score
+                    best_pair = f"{ex_name}:{pair}"
             
             if best_pair:
                 logger.info(f"Selected best pair: {best_pair} (score: {best_score:.4f})")
@@ -112,22 +99,101 @@ class PairSelector:
             logger.error(f"Pair selection flatlined: {e}")
             return f"binance:{settings.TRADING['symbol']}"
     
-    async def _evaluate_pair(self, exchange_name, pair, timeframe, limit):
+    async def _candidates(self, fallback):
+        """(exchange, pair) candidates for deep evaluation, plus the tickers they were screened on.
+        
+        Every exchange is screened whole on one fetch_tickers snapshot and
+        keeps at most shortlist_size pairs. One that can't deliver a snapshot
+        falls back to fallback(active USDT pairs), tickers fetched per pair.
+        """
+        filters = settings.TRADING["pair_selection"]
+        
+        async def shortlist(ex_name, exchange):
+            try:
+                await exchange.load_markets()
+            except Exception as e:
+                logger.error(f"Market loading failed for {ex_name}: {e}")
+                return [], {}
+            
+            try:
+                tickers = await exchange.fetch_tickers()
+                screened = screen_tickers(
+                    tickers, filters["min_volume"], filters["max_spread"], filters["min_volatility"],
+                    markets=exchange.markets, limit=self.shortlist_size
+                )
+                logger.info(f"Screened {len(tickers)} {ex_name} markets down to {len(screened)}")
+                return [row["symbol"] for row in screened], tickers
+            except Exception as e:
+                logger.warning(f"Ticker screening unavailable for {ex_name}, using fallback pairs: {e}")
+                pairs = [
+                    symbol for symbol in exchange.markets.keys()
+                    if symbol.endswith("/USDT") and exchange.markets[symbol]["active"]
+                ]
+                return fallback(pairs), {}
+        
+        names = list(self.exchanges)
+        results = await asyncio.gather(*(shortlist(name, self.exchanges[name]) for name in names))
+        candidates = [(name, pair) for name, (pairs, _) in zip(names, results) for pair in pairs]
+        tickers = {name: snapshot for name, (_, snapshot) in zip(names, results)}
+        return candidates, tickers
+    
+    def _semaphore(self, exchange_name):
+        """Per-exchange cap on in-flight evaluations (semaphores belong to the running loop)"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphores = {}
+            self._semaphore_loop = loop
+        if exchange_name not in self._semaphores:
+            self._semaphores[exchange_name] = asyncio.Semaphore(self.concurrency)
+        return self._semaphores[exchange_name]
+    
+    async def evaluate_pairs(self, candidates, timeframe, limit, tickers=None):
+        """Score (exchange, pair) candidates concurrently, yielding (exchange, pair, score) as each finishes.
+        
+        tickers ({exchange: {pair: ticker}}) spares the per-pair ticker fetch for screened pairs.
+        """
+        tickers = tickers or {}
+        
+        async def evaluate(ex_name, pair):
+            async with self._semaphore(ex_name):
+                try:
+                    ticker = tickers.get(ex_name, {}).get(pair)
+                    return ex_name, pair, await self._evaluate_pair(ex_name, pair, timeframe, limit, ticker)
+                except Exception as e:
+                    logger.error(f"Failed to evaluate {pair}: {e}")
+                    return ex_name, pair, -float('inf')
+        
+        tasks = [asyncio.create_task(evaluate(ex_name, pair)) for ex_name, pair in candidates]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Consumer stopped early - don't leave requests running
+            for task in tasks:
+                task.cancel()
+    
+    async def _evaluate_pair(self, exchange_name, pair, timeframe, limit, ticker=None):
         """Evaluate a trading pair's potential"""
         try:
             exchange = self.exchanges[exchange_name]
             
-            # Get ticker data
-            ticker = await exchange.fetch_ticker(pair)
+            # Ticker, order book and candles are independent - fetch them together
+            # (a screened pair brings its ticker along)
+            requests = [
+                exchange.fetch_order_book(pair, limit=5),
+                self.fetcher.fetch_ohlcv(pair, timeframe, limit=limit, exchange=exchange_name)
+            ]
+            if ticker is None:
+                requests.append(exchange.fetch_ticker(pair))
+            book, data, *fetched = await asyncio.gather(*requests)
+            ticker = fetched[0] if fetched else ticker
             
             # Check basic requirements
             volume = ticker.get("quoteVolume", 0)
             if volume < settings.TRADING["pair_selection"]["min_volume"]:
                 return -float('inf')
             
-            # Get order book for spread calculation
-            book = await exchange.fetch_order_book(pair, limit=5)
-            
+            # Spread from the order book
             if book["bids"] and book["asks"]:
                 spread = (book["asks"][0][0] - book["bids"][0][0]) / book["bids"][0][0]
                 if spread > settings.TRADING["pair_selection"]["max_spread"]:
@@ -145,9 +211,7 @@ class PairSelector:
             if liquidity < settings.TRADING["pair_selection"]["min_liquidity"]:
                 return -float('inf')
             
-            # Get historical data for volatility
-            data = await self.fetcher.fetch_ohlcv(pair, timeframe, limit=limit, exchange=exchange_name)
-            
+            # Historical data for volatility
             if not data or len(data) < 20:
                 return -float('inf')
             
@@ -168,10 +232,10 @@ class PairSelector:
             ml_prediction = 0.5
             rl_score = 0.5
             
-            if self.ml_trainer and self.rl_trainer and data:
+            if self.ml_trainer and self.policy and data:
                 try:
                     ml_prediction = self.ml_trainer.predict(data[-1])
-                    rl_score = self.rl_trainer.predict(data[-1])
+                    rl_score, _ = self.policy.predict(data)
                 except:
                     pass
             
@@ -226,26 +290,15 @@ class PairSelector:
                         profitable_pairs[symbol] = profit
             
             # Evaluate new pairs
-            for ex_name, exchange in self.exchanges.items():
-                try:
-                    await exchange.load_markets()
-                    
-                    pairs = [
-                        symbol for symbol in exchange.markets.keys()
-                        if symbol.endswith("/USDT") and exchange.markets[symbol]["active"]
-                    ]
-                    
-                    for pair in pairs[:20]:  # Check top 20 pairs
-                        full_symbol = f"{ex_name}:{pair}"
-                        
-                        if full_symbol not in profitable_pairs:
-                            score = await self._evaluate_pair(ex_name, pair, "1h", 100)
-                            
-                            if score > 0.5:  # Minimum score threshold
-                                profitable_pairs[full_symbol] = score * 1000  # Convert to profit estimate
-                                
-                except Exception as e:
-                    logger.error(f"Failed to evaluate new pairs for {ex_name}: {e}")
+            candidates, tickers = await self._candidates(lambda pairs: pairs[:20])  # Top 20 without a snapshot
+            candidates = [
+                (ex_name, pair) for ex_name, pair in candidates
+                if f"{ex_name}:{pair}" not in profitable_pairs
+            ]
+            
+            async for ex_name, pair, score in self.evaluate_pairs(candidates, "1h", 100, tickers):
+                if score > 0.5:  # Minimum score threshold
+                    profitable_pairs[f"{ex_name}:{pair}"] = score * 1000  # Convert to profit estimate
             
             # Sort by profitability
             sorted_pairs = sorted(profitable_pairs.items(), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,159 @@
+# market/price_matrix.py
+"""
+Arasaka Price Lattice - Cross-exchange bid/ask matrix for vectorized arbitrage detection
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from config.exchange_manager import exchange_manager
+
+def taker_fees(exchanges: List[str], default: float = 0.001) -> np.ndarray:
+    """Taker fee per exchange, in matrix column order"""
+    return np.array([exchange_manager.get_exchange_config(e).get("fee_taker", default) for e in exchanges])
+
+class PriceMatrix:
+    """Top-of-book snapshot packed into (pairs x exchanges) arrays.
+    
+    Rows are pairs, columns exchanges; NaN marks a pair an exchange doesn't
+    quote (or quoted without both sides). Each exchange's column is refreshed
+    from its own ticker dict, so callers can update exchanges independently
+    and re-evaluate only the rows that moved.
+    
+    Net profit for buying on exchange i and selling on exchange j is
+    (bid_j / ask_i - 1) - fee_i - fee_j, computed for every pair and every
+    (i, j) at once by broadcasting; only rows over the threshold become dicts.
+    
+    Opportunity max_volume is 10% of the smaller 24h quote volume, as the
+    per-pair scan always reported. top_of_book_volume is the base amount
+    fillable at the quoted prices (the smaller of ask and bid size), None
+    where an exchange leaves sizes out of its tickers.
+    """
+    
+    def __init__(self, pairs: List[str], exchanges: List[str],
+                 native: Optional[Callable[[str, str], Optional[str]]] = None,
+                 fees: Optional[np.ndarray] = None):
+        self.pairs = list(pairs)
+        self.exchanges = list(exchanges)
+        self.row = {pair: i for i, pair in enumerate(self.pairs)}
+        self.column = {exchange: j for j, exchange in enumerate(self.exchanges)}
+        
+        shape = (len(self.pairs), len(self.exchanges))
+        self.bid = np.full(shape, np.nan)
+        self.ask = np.full(shape, np.nan)
+        self.volume = np.zeros(shape)
+        self.bid_size = np.full(shape, np.nan)  # Base amount at the top of book, where reported
+        self.ask_size = np.full(shape, np.nan)
+        self.fees = taker_fees(self.exchanges) if fees is None else np.asarray(fees, dtype=float)
+        
+        # Per exchange: (row, native symbol) for every pair it lists
+        native = native or (lambda exchange, pair: pair)
+        self._symbols = {}
+        for exchange in self.exchanges:
+            listed = ((i, native(exchange, pair)) for i, pair in enumerate(self.pairs))
+            self._symbols[exchange] = {i: symbol for i, symbol in listed if symbol}
+    
+    @classmethod
+    def from_tickers(cls, all_tickers: Dict[str, Dict], pairs: List[str],
+                     native: Optional[Callable[[str, str], Optional[str]]] = None,
+                     fees: Optional[np.ndarray] = None) -> "PriceMatrix":
+        matrix = cls(pairs, list(all_tickers), native, fees)
+        for exchange, tickers in all_tickers.items():
+            matrix.update(exchange, tickers)
+        return matrix
+    
+    def native_symbol(self, exchange: str, row: int) -> Optional[str]:
+        return self._symbols.get(exchange, {}).get(row)
+    
+    def symbols(self, exchange: str) -> List[str]:
+        """Native symbols an exchange lists among the matrix pairs"""
+        return list(self._symbols.get(exchange, {}).values())
+    
+    def update(self, exchange: str, tickers: Dict[str, Dict]) -> np.ndarray:
+        """Refresh one exchange's column; returns the rows whose quotes changed"""
+        j = self.column.get(exchange)
+        if j is None:
+            return np.zeros(0, dtype=int)
+        
+        listed = self._symbols[exchange]
+        rows = np.fromiter(listed, dtype=int, count=len(listed))
+        bid = np.full(len(listed), np.nan)
+        ask = np.full(len(listed), np.nan)
+        volume = np.zeros(len(listed))
+        bid_size = np.full(len(listed), np.nan)
+        ask_size = np.full(len(listed), np.nan)
+        
+        for k, symbol in enumerate(listed.values()):
+            ticker = tickers.get(symbol)
+            if ticker and ticker.get('bid') and ticker.get('ask'):
+                bid[k] = ticker['bid']
+                ask[k] = ticker['ask']
+                volume[k] = ticker.get('quoteVolume') or 0
+                bid_size[k] = ticker.get('bidVolume') or np.nan
+                ask_size[k] = ticker.get('askVolume') or np.nan
+        
+        old_bid, old_ask = self.bid[rows, j], self.ask[rows, j]
+        changed = ~((bid == old_bid) | (np.isnan(bid) & np.isnan(old_bid))) | \
+                  ~((ask == old_ask) | (np.isnan(ask) & np.isnan(old_ask)))
+        
+        self.bid[rows, j] = bid
+        self.ask[rows, j] = ask
+        self.volume[rows, j] = volume
+        self.bid_size[rows, j] = bid_size
+        self.ask_size[rows, j] = ask_size
+        return rows[changed]
+    
+    def net_profit(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(rows x buy exchange x sell exchange) net profit fraction after taker fees; NaN where not quoted"""
+        bid = self.bid if rows is None else self.bid[rows]
+        ask = self.ask if rows is None else self.ask[rows]
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gross = bid[:, None, :] / ask[:, :, None] - 1
+        net = gross - (self.fees[:, None] + self.fees[None, :])
+        idx = np.arange(len(self.exchanges))
+        net[:, idx, idx] = np.nan  # Same exchange on both legs
+        return net
+    
+    def candidates(self, min_profit_percent: float, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, ...]:
+        """(row, buy column, sell column, net profit %) arrays for every
+        combination clearing min_profit_percent, best first"""
+        rows = np.arange(len(self.pairs)) if rows is None else np.asarray(rows, dtype=int)
+        if len(rows) == 0 or len(self.exchanges) < 2:
+            empty = np.zeros(0, dtype=int)
+            return empty, empty, empty, np.zeros(0)
+        
+        net = self.net_profit(rows) * 100
+        with np.errstate(invalid="ignore"):
+            k, i, j = np.nonzero(net >= min_profit_percent)
+        nets = net[k, i, j]
+        order = np.argsort(-nets, kind="stable")
+        return rows[k[order]], i[order], j[order], nets[order]
+    
+    def opportunities(self, min_profit_percent: float, rows: Optional[np.ndarray] = None) -> List[Dict]:
+        """Materialize the candidates over min_profit_percent as opportunity dicts, best first"""
+        r, i, j, nets = self.candidates(min_profit_percent, rows)
+        buy_price, sell_price = self.ask[r, i], self.bid[r, j]
+        fees = (self.fees[i] + self.fees[j]) * 100
+        max_volume = np.minimum(self.volume[r, i], self.volume[r, j]) * 0.1  # 10% of volume
+        # Executable at the quoted prices; full sizing walks the books at execution
+        top_of_book = np.minimum(self.ask_size[r, i], self.bid_size[r, j])
+        
+        timestamp = datetime.now().isoformat()
+        opportunities = [
+            {
+                'pair': self.pairs[r[n]],
+                'buy_exchange': self.exchanges[i[n]],
+                'sell_exchange': self.exchanges[j[n]],
+                'buy_price': float(buy_price[n]),
+                'sell_price': float(sell_price[n]),
+                'gross_profit_percent': float(nets[n] + fees[n]),
+                'total_fees_percent': float(fees[n]),
+                'net_profit_percent': float(nets[n]),
+                'max_volume': float(max_volume[n]),
+                'top_of_book_volume': None if np.isnan(top_of_book[n]) else float(top_of_book[n]),
+                'timestamp': timestamp
+            }
+            for n in range(len(r))
+        ]
+        return opportunities
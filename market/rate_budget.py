@@ -0,0 +1,49 @@
+# market/rate_budget.py
+"""
+Arasaka Throttle - Token-bucket request budgets against exchange rate limits
+"""
+from config.exchange_manager import exchange_manager
+
+class TokenBucket:
+    """A share of one exchange's request allowance.
+    
+    Tokens refill at requests_per_minute / 60 per second up to burst and each
+    request spends one, so bursts spend saved tokens and an empty bucket waits
+    for the refill. The caller passes the clock in (event loop time live,
+    recorded time in replay).
+    """
+    
+    __slots__ = ("refill", "capacity", "tokens", "refilled")
+    
+    def __init__(self, requests_per_minute: float, burst: int):
+        self.refill = requests_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.refilled = None
+    
+    @classmethod
+    def for_exchange(cls, exchange: str, share: float, burst: int) -> "TokenBucket":
+        """Bucket holding a share of the exchange's configured requests per minute"""
+        limit = exchange_manager.get_exchange_config(exchange).get("rate_limit", 60)
+        return cls(limit * share, burst)
+    
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        return (1 - self.tokens) / self.refill if self.tokens < 1 else 0.0
+    
+    def spend(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+    
+    def take(self, now: float, wanted: int) -> int:
+        """Spend up to wanted whole tokens; returns how many were available"""
+        self._refill(now)
+        granted = max(0, min(wanted, int(self.tokens)))
+        self.tokens -= granted
+        return granted
+    
+    def _refill(self, now: float):
+        if self.refilled is not None and now > self.refilled:
+            self.tokens = min(self.capacity, self.tokens + (now - self.refilled) * self.refill)
+        self.refilled = now if self.refilled is None else max(self.refilled, now)
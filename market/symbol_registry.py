@@ -0,0 +1,100 @@
+# market/symbol_registry.py
+"""
+Arasaka Symbol Codex - Canonical base/quote symbols across every connected exchange
+"""
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from config.settings import settings
+from utils.logger import logger
+
+class SymbolRegistry:
+    """Two-way map between exchange-native market symbols and canonical pairs.
+
+    Built once from each exchange's loaded ccxt markets, so lookups during
+    scans and order placement are plain dict hits instead of re-parsing
+    symbol strings. A canonical pair is "BASE/QUOTE" with the quote passed
+    through the configured aliases - by default USDT counts as USD, so
+    BTC/USDT on one exchange and BTC/USD on another meet as BTC/USD.
+    Only active spot markets are registered.
+    """
+
+    def __init__(self, quote_aliases: Optional[Dict[str, str]] = None):
+        if quote_aliases is None:
+            quote_aliases = settings.TRADING.get("arbitrage", {}).get("quote_aliases", {"USDT": "USD"})
+        self.quote_aliases = dict(quote_aliases)
+
+        self._lock = threading.Lock()
+        self._canonical = {}  # (exchange, native symbol or market id) -> canonical
+        self._native = {}     # (exchange, canonical) -> native symbol
+        self._exchanges = {}  # canonical -> [exchanges listing it]
+
+    def canonical_pair(self, base: str, quote: str) -> str:
+        return f"{base}/{self.quote_aliases.get(quote, quote)}"
+
+    def register_exchange(self, exchange_name: str, markets: Dict[str, Dict]):
+        """(Re)index one exchange's ccxt markets"""
+        canonical, native = {}, {}
+        for symbol, market in markets.items():
+            if not market.get("active", True) or not market.get("spot", True):
+                continue
+            base, quote = market.get("base"), market.get("quote")
+            if not base or not quote:
+                continue
+
+            pair = self.canonical_pair(base, quote)
+            canonical[(exchange_name, symbol)] = pair
+            if market.get("id"):
+                canonical[(exchange_name, market["id"])] = pair
+
+            # Several native markets can share a canonical pair (BTC/USD and
+            # BTC/USDT); prefer the one whose quote needs no aliasing
+            key = (exchange_name, pair)
+            if key not in native or quote == pair.split("/")[1]:
+                native[key] = symbol
+
+        with self._lock:
+            self._canonical = {k: v for k, v in self._canonical.items() if k[0] != exchange_name}
+            self._native = {k: v for k, v in self._native.items() if k[0] != exchange_name}
+            self._canonical.update(canonical)
+            self._native.update(native)
+
+            exchanges = {}
+            for exchange, pair in self._native:
+                exchanges.setdefault(pair, []).append(exchange)
+            self._exchanges = exchanges
+
+        logger.info(f"Symbol registry indexed {len(native)} {exchange_name} markets")
+
+    def build(self, exchanges: Dict[str, object]):
+        """Index every exchange whose markets are loaded"""
+        for exchange_name, exchange in exchanges.items():
+            if getattr(exchange, "markets", None):
+                self.register_exchange(exchange_name, exchange.markets)
+
+    # ===== Lookups =====
+
+    def canonical(self, exchange: str, symbol: str) -> Optional[str]:
+        """Canonical pair for an exchange's native symbol or market id"""
+        return self._canonical.get((exchange, symbol))
+
+    def native(self, exchange: str, pair: str) -> Optional[str]:
+        """Exchange-native symbol for a canonical pair, or None if not listed"""
+        return self._native.get((exchange, pair))
+
+    def exchanges_for(self, pair: str) -> List[str]:
+        return self._exchanges.get(pair, [])
+
+    def common_pairs(self, min_exchanges: int = 2) -> List[str]:
+        """Canonical pairs listed on at least min_exchanges exchanges"""
+        return [pair for pair, exchanges in self._exchanges.items() if len(exchanges) >= min_exchanges]
+
+    def pairs(self, exchanges: Optional[Iterable[str]] = None) -> List[str]:
+        """All canonical pairs (optionally only those on the given exchanges)"""
+        if exchanges is None:
+            return list(self._exchanges)
+        wanted = set(exchanges)
+        return [pair for pair, listed in self._exchanges.items() if wanted.intersection(listed)]
+
+# Create singleton instance
+symbol_registry = SymbolRegistry()
@@ -0,0 +1,186 @@
+# market/tick_recorder.py
+"""
+Arasaka Black Box - Compressed, append-only ticker and order book recordings for offline replay
+"""
+import asyncio
+import gzip
+import heapq
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config.settings import settings
+from market.rate_budget import TokenBucket
+from utils.logger import logger
+
+TICKER_FIELDS = ("bid", "ask", "bidVolume", "askVolume", "last", "quoteVolume")
+
+def _hour_file(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime("%Y%m%d%H") + ".jsonl.gz"
+
+def _file_for(path: str, exchange: str, timestamp_ms: int) -> str:
+    return os.path.join(path, exchange, _hour_file(timestamp_ms))
+
+class TickRecorder:
+    """Buffers snapshots and appends them to one gzip file per exchange per UTC hour.
+    
+    Layout is {path}/{exchange}/{YYYYmmddHH}.jsonl.gz, one JSON record per
+    line: {"t": epoch ms, "k": "tickers" | "book", "d": payload}. Records
+    within a file are in time order and the hour is in the name, so a
+    reader can skip straight to a time range. Each flush appends a new gzip
+    member, so files are only ever appended to and a crash loses at most
+    the unflushed buffer.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        config = settings.TRADING.get("arbitrage", {}).get("recorder", {})
+        self.path = path or config.get("path", "data/recordings")
+        self.interval = config.get("interval", 1.0)
+        self.book_depth = config.get("book_depth", 10)
+        self.book_pairs = config.get("book_pairs", 10)
+        self.flush_interval = config.get("flush_interval", 30)
+        self.rate_budget = config.get("rate_budget", 0.4)
+        self.burst = config.get("burst", 5)
+        
+        self._buffer = {}  # file -> [encoded lines]
+        self._running = False
+    
+    def record(self, exchange: str, kind: str, data: Dict, timestamp_ms: Optional[int] = None):
+        """Queue one snapshot; written on the next flush"""
+        t = int(time.time() * 1000) if timestamp_ms is None else int(timestamp_ms)
+        line = json.dumps({"t": t, "k": kind, "d": data}, separators=(",", ":"))
+        self._buffer.setdefault(_file_for(self.path, exchange, t), []).append(line)
+    
+    def record_tickers(self, exchange: str, tickers: Dict[str, Dict], timestamp_ms: Optional[int] = None):
+        """Queue a ticker snapshot, keeping only the fields the arbitrage pipeline reads"""
+        slim = {
+            symbol: {field: ticker.get(field) for field in TICKER_FIELDS}
+            for symbol, ticker in tickers.items()
+        }
+        self.record(exchange, "tickers", slim, timestamp_ms)
+    
+    def record_book(self, exchange: str, symbol: str, book: Dict, timestamp_ms: Optional[int] = None):
+        depth = self.book_depth
+        self.record(exchange, "book", {
+            "symbol": symbol,
+            "bids": [level[:2] for level in book.get("bids", [])[:depth]],
+            "asks": [level[:2] for level in book.get("asks", [])[:depth]]
+        }, timestamp_ms)
+    
+    def flush(self):
+        """Append buffered records, one gzip member per file"""
+        buffer, self._buffer = self._buffer, {}
+        for file, lines in buffer.items():
+            try:
+                os.makedirs(os.path.dirname(file), exist_ok=True)
+                with gzip.open(file, "ab") as f:
+                    f.write(("\n".join(lines) + "\n").encode())
+            except Exception as e:
+                logger.error(f"Recording flush to {file} flatlined: {e}")
+    
+    # ===== Capture =====
+    
+    async def run(self, pairs: Optional[List[str]] = None):
+        """Record tickers from every exchange, plus order books for the given canonical pairs.
+        
+        Each exchange gets a token bucket holding rate_budget of its rate
+        limit. A cycle spends one token on tickers and fetches as many books
+        as the remaining tokens cover, concurrently, rotating through the
+        pairs so a tight budget still records every book, just less often.
+        """
+        from market.multi_exchange_fetcher import multi_fetcher
+        from market.symbol_registry import symbol_registry
+        
+        await multi_fetcher.initialize()
+        for name, exchange in multi_fetcher.exchanges.items():
+            if not exchange.markets:
+                await exchange.load_markets()
+            symbol_registry.register_exchange(name, exchange.markets)
+        if pairs is None:
+            pairs = symbol_registry.common_pairs()[:self.book_pairs]
+        
+        self._running = True
+        loop = asyncio.get_running_loop()
+        last_flush = loop.time()
+        logger.info(f"Recording {len(multi_fetcher.exchanges)} exchanges to {self.path}")
+        
+        buckets = {name: TokenBucket.for_exchange(name, self.rate_budget, self.burst)
+                   for name in multi_fetcher.exchanges}
+        books = {
+            name: [symbol for symbol in (symbol_registry.native(name, pair) for pair in pairs) if symbol]
+            for name in multi_fetcher.exchanges
+        }
+        cursors = {name: 0 for name in multi_fetcher.exchanges}
+        
+        async def capture(name, exchange):
+            bucket, symbols = buckets[name], books[name]
+            now = loop.time()
+            if bucket.take(now, 1):
+                try:
+                    self.record_tickers(name, await exchange.fetch_tickers())
+                except Exception as e:
+                    logger.error(f"Recording tickers from {name} flatlined: {e}")
+            
+            count = bucket.take(now, len(symbols))
+            if not count:
+                return
+            batch = [symbols[(cursors[name] + k) % len(symbols)] for k in range(count)]
+            cursors[name] = (cursors[name] + count) % len(symbols)
+            results = await asyncio.gather(
+                *(exchange.fetch_order_book(symbol, self.book_depth) for symbol in batch),
+                return_exceptions=True
+            )
+            for symbol, book in zip(batch, results):
+                if isinstance(book, Exception):
+                    logger.error(f"Recording {symbol} book from {name} flatlined: {book}")
+                else:
+                    self.record_book(name, symbol, book)
+        
+        try:
+            while self._running:
+                started = loop.time()
+                await asyncio.gather(*(capture(name, ex) for name, ex in multi_fetcher.exchanges.items()))
+                if loop.time() - last_flush >= self.flush_interval:
+                    self.flush()
+                    last_flush = loop.time()
+                await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+        finally:
+            self.flush()
+    
+    def stop(self):
+        self._running = False
+
+def read_recording(path: str, exchanges: Optional[List[str]] = None, start_ms: Optional[int] = None,
+                   end_ms: Optional[int] = None) -> Iterator[Tuple[int, str, str, Dict]]:
+    """(timestamp ms, exchange, kind, payload) across exchanges, merged in time order"""
+    if exchanges is None:
+        exchanges = sorted(name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name))) \
+            if os.path.isdir(path) else []
+    
+    first_file = _hour_file(start_ms) if start_ms is not None else None
+    last_file = _hour_file(end_ms) if end_ms is not None else None
+    
+    def stream(exchange):
+        folder = os.path.join(path, exchange)
+        if not os.path.isdir(folder):
+            return
+        for name in sorted(os.listdir(folder)):
+            # Hour-named files: skip whole hours outside the range
+            if not name.endswith(".jsonl.gz"):
+                continue
+            if (first_file and name < first_file) or (last_file and name > last_file):
+                continue
+            with gzip.open(os.path.join(folder, name), "rt") as f:
+                for line in f:
+                    record = json.loads(line)
+                    t = record["t"]
+                    if (start_ms is not None and t < start_ms) or (end_ms is not None and t > end_ms):
+                        continue
+                    yield t, exchange, record["k"], record["d"]
+    
+    return heapq.merge(*(stream(exchange) for exchange in exchanges), key=lambda record: record[0])
+
+# Create singleton instance
+tick_recorder = TickRecorder()
@@ -0,0 +1,172 @@
+# ml/policy_inference.py
+"""
+Arasaka Reflex Chip - TensorFlow-free DQN policy inference on exported weights
+"""
+import os
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from utils.logger import logger
+
+# Continuous action values used across the bot: Buy = 0.0, Sell = 1.0, Hold = 0.5
+ACTION_VALUES = np.array([0.0, 1.0, 0.5])
+
+_ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x))
+}
+
+def calculate_indicators(df):
+    """Calculate technical indicators for RL features"""
+    try:
+        # Simple Moving Averages
+        df["sma_20"] = df["close"].rolling(window=20, min_periods=1).mean()
+        df["sma_50"] = df["close"].rolling(window=50, min_periods=1).mean()
+        
+        # RSI
+        delta = df["close"].diff()
+        gain = delta.where(delta > 0, 0).rolling(window=14, min_periods=1).mean()
+        loss = -delta.where(delta < 0, 0).rolling(window=14, min_periods=1).mean()
+        rs = gain / (loss + 1e-10)
+        df["rsi_14"] = 100 - (100 / (1 + rs))
+        
+        # Bollinger Bands
+        df["std_20"] = df["close"].rolling(window=20, min_periods=1).std()
+        df["bollinger_upper"] = df["sma_20"] + 2 * df["std_20"]
+        df["bollinger_lower"] = df["sma_20"] - 2 * df["std_20"]
+        
+        # MACD
+        ema12 = df["close"].ewm(span=12, adjust=False, min_periods=1).mean()
+        ema26 = df["close"].ewm(span=26, adjust=False, min_periods=1).mean()
+        df["macd"] = ema12 - ema26
+        
+        # Additional features
+        df["sentiment_score"] = 0.0
+        df["whale_ratio"] = 0.0
+        
+        # Fill NaN values
+        df = df.ffill().fillna(0)
+        
+        return df
+    
+    except Exception as e:
+        logger.error(f"RL indicator calculation flatlined: {e}")
+        return df
+
+def candles_to_states(data):
+    """Feature rows for one candle or a list of candles, oldest first"""
+    if isinstance(data, dict):
+        df = pd.DataFrame([data])
+    elif len(data) and isinstance(data[0], (list, tuple)):
+        df = pd.DataFrame(data, columns=["timestamp", "open", "high", "low", "close", "volume"])
+    else:
+        df = pd.DataFrame([data], columns=["timestamp", "open", "high", "low", "close", "volume"])
+    
+    df = calculate_indicators(df)
+    return df[settings.ML["features"]].values.astype(np.float32)
+
+def export_policy(model, path):
+    """Write the Dense layers of a Keras DQN to an .npz file.
+    
+    Dropout layers are identity at inference time and are skipped. The file is
+    written next to its destination and renamed into place, so readers in
+    other processes never see a half-written policy.
+    """
+    arrays = {}
+    activations = []
+    
+    for layer in model.layers:
+        weights = layer.get_weights()
+        if not weights:
+            continue
+        
+        kernel, bias = weights
+        i = len(activations)
+        arrays[f"kernel_{i}"] = kernel.astype(np.float32)
+        arrays[f"bias_{i}"] = bias.astype(np.float32)
+        activations.append(layer.get_config().get("activation", "linear"))
+    
+    arrays["activations"] = np.array(activations)
+    
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    
+    logger.info(f"RL policy exported to {path} ({len(activations)} layers)")
+
+class PolicyInference:
+    """Greedy DQN policy evaluated as plain numpy matmuls.
+    
+    Weights come from the file written by export_policy and are reloaded when
+    its modification time changes, so trading and API processes pick up a
+    retrained model without importing TensorFlow.
+    """
+    
+    def __init__(self, path=None):
+        self.path = path or settings.RL.get("policy_path", "ml/rl_policy.npz")
+        self.layers = []
+        self._mtime = None
+    
+    @property
+    def ready(self):
+        return bool(self.layers)
+    
+    def refresh(self):
+        """Reload weights if the exported policy changed on disk"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self.ready
+        
+        if mtime == self._mtime:
+            return True
+        
+        try:
+            with np.load(self.path, allow_pickle=False) as policy:
+                activations = [str(a) for a in policy["activations"]]
+                self.layers = [
+                    (policy[f"kernel_{i}"], policy[f"bias_{i}"], _ACTIVATIONS[activation])
+                    for i, activation in enumerate(activations)
+                ]
+            self._mtime = mtime
+            logger.info(f"RL policy loaded from {self.path}")
+        except Exception as e:
+            logger.error(f"RL policy load flatlined: {e}")
+        
+        return self.ready
+    
+    def q_values(self, states):
+        """Q-values for a (batch, state_size) array of states"""
+        x = np.asarray(states, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            x = activation(x @ kernel + bias)
+        return x
+    
+    def act(self, state):
+        """Greedy action and Q-values for one state, in one forward pass"""
+        if not self.refresh():
+            return 2, np.zeros(len(ACTION_VALUES), dtype=np.float32)
+        
+        q_values = self.q_values(np.reshape(state, (1, -1)))[0]
+        return int(np.argmax(q_values)), q_values
+    
+    def predict(self, data):
+        """Continuous action (0 = buy, 1 = sell, 0.5 = hold) and confidence for candles.
+        
+        Confidence is the top Q-value, or 0.5 when no policy has been exported yet.
+        """
+        try:
+            action, q_values = self.act(candles_to_states(data)[-1])
+            confidence = float(np.max(q_values)) if self.ready else 0.5
+            return float(ACTION_VALUES[action]), confidence
+        
+        except Exception as e:
+            logger.error(f"RL policy inference flatlined: {e}")
+            return 0.5, 0.5  # Neutral on error
+
+# Create singleton instance
+policy = PolicyInference()
@@ -0,0 +1,233 @@
+# ml/replay_buffer.py
+"""
+Arasaka Replay Memory - Preallocated circular experience buffer for the DQN
+"""
+import numpy as np
+
+class ReplayBuffer:
+    """Fixed-capacity circular buffer backed by contiguous numpy arrays.
+    
+    Memory use is capacity x (2 x state_size + 3) values, allocated once up
+    front. Sampling draws random indices and gathers whole batches with fancy
+    indexing, so no Python tuples are built per transition.
+    """
+    
+    def __init__(self, capacity, state_size, seed=None):
+        self.capacity = int(capacity)
+        self.state_size = state_size
+        
+        self.states = np.zeros((self.capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(self.capacity, dtype=np.int32)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.next_states = np.zeros((self.capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=np.float32)
+        
+        self.position = 0
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+    
+    def __len__(self):
+        return self.size
+    
+    def add(self, state, action, reward, next_state, done):
+        """Store a single transition, overwriting the oldest when full"""
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+    
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Store a batch of transitions with vectorized writes"""
+        n = len(actions)
+        idx = (self.position + np.arange(n)) % self.capacity
+        
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        
+        self.position = int((self.position + n) % self.capacity)
+        self.size = min(self.size + n, self.capacity)
+        return idx
+    
+    def sample(self, batch_size):
+        """Uniformly sample a batch as (states, actions, rewards, next_states, dones)"""
+        idx = self.rng.integers(0, self.size, size=batch_size)
+        return self.gather(idx)
+    
+    def gather(self, idx):
+        """Return the transitions at the given buffer indices"""
+        return (
+            self.states[idx],
+            self.actions[idx],
+            self.rewards[idx],
+            self.next_states[idx],
+            self.dones[idx]
+        )
+    
+    def _chronological(self):
+        """Buffer indices of stored transitions, oldest first"""
+        if self.size < self.capacity:
+            return np.arange(self.size)
+        return (self.position + np.arange(self.capacity)) % self.capacity
+    
+    def state_dict(self):
+        """Filled rows in storage order plus the write pointer, for checkpointing.
+        
+        Each array is one contiguous slice copy of the filled prefix - no
+        reordering gather on the training thread.
+        """
+        n = self.size
+        return {
+            "states": self.states[:n].copy(),
+            "actions": self.actions[:n].copy(),
+            "rewards": self.rewards[:n].copy(),
+            "next_states": self.next_states[:n].copy(),
+            "dones": self.dones[:n].copy(),
+            "position": np.array(self.position)
+        }
+    
+    @staticmethod
+    def _saved_order(state):
+        """Rows of a state_dict() oldest first (older checkpoints were saved that way)"""
+        n = len(state["actions"])
+        return np.roll(np.arange(n), -int(state.get("position", 0)) if n else 0)
+    
+    def load_state_dict(self, state):
+        """Refill from state_dict(), keeping the newest rows if capacity shrank"""
+        self.position = 0
+        self.size = 0
+        
+        keep = self._saved_order(state)[-self.capacity:]
+        return self.add_batch(
+            state["states"][keep],
+            state["actions"][keep],
+            state["rewards"][keep],
+            state["next_states"][keep],
+            state["dones"][keep]
+        )
+
+class SumTree:
+    """Array-backed binary sum tree over leaf priorities.
+    
+    Node i has children 2i and 2i+1, and leaves start at index `leaf_start`.
+    Batched updates and batched prefix-sum lookups walk all requested paths one
+    tree level at a time, so both cost O(batch x log n) in vectorized numpy.
+    """
+    
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.leaf_start = 1 << max(int(np.ceil(np.log2(max(self.capacity, 2)))), 1)
+        self.depth = int(np.log2(self.leaf_start))
+        self.tree = np.zeros(2 * self.leaf_start, dtype=np.float64)
+    
+    @property
+    def total(self):
+        return self.tree[1]
+    
+    def leaves(self, idx):
+        """Priorities stored at the given data indices"""
+        return self.tree[self.leaf_start + np.asarray(idx)]
+    
+    def update(self, idx, priorities):
+        """Set priorities at data indices and refresh the sums above them"""
+        nodes = self.leaf_start + np.asarray(idx, dtype=np.int64)
+        self.tree[nodes] = priorities
+        
+        for _ in range(self.depth):
+            nodes = np.unique(nodes >> 1)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+    
+    def find(self, values):
+        """Map prefix-sum values in [0, total) to data indices"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values >= left_sum
+            values -= left_sum * go_right
+            nodes = left + go_right
+        
+        return nodes - self.leaf_start
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """Proportional prioritized replay on top of the circular array buffer.
+    
+    Transitions are sampled with probability p_i^alpha / sum(p^alpha) via a
+    sum tree, and importance-sampling weights (N x P(i))^-beta correct the bias.
+    New transitions enter at the current max priority so each is seen at least
+    once before its TD error is known.
+    """
+    
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4,
+                 beta_increment=1e-4, epsilon=1e-6, seed=None):
+        super().__init__(capacity, state_size, seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+        self.tree = SumTree(self.capacity)
+    
+    def add(self, state, action, reward, next_state, done):
+        """Store a transition at max priority"""
+        i = self.position
+        super().add(state, action, reward, next_state, done)
+        self.tree.update([i], [self.max_priority ** self.alpha])
+    
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Store a batch of transitions at max priority"""
+        idx = super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(idx, np.full(len(idx), self.max_priority ** self.alpha))
+        return idx
+    
+    def sample(self, batch_size):
+        """Stratified proportional sample.
+        
+        Returns (states, actions, rewards, next_states, dones, weights, idx).
+        """
+        segment = self.tree.total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        idx = np.minimum(self.tree.find(values), self.size - 1)
+        
+        probabilities = self.tree.leaves(idx) / self.tree.total
+        weights = (self.size * probabilities) ** -self.beta
+        weights = (weights / weights.max()).astype(np.float32)
+        
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        
+        return self.gather(idx) + (weights, idx)
+    
+    def state_dict(self):
+        """Buffer arrays plus leaf priorities and annealing state"""
+        state = super().state_dict()
+        state["priorities"] = self.tree.leaves(np.arange(self.size))
+        state["beta"] = np.array(self.beta)
+        state["max_priority"] = np.array(self.max_priority)
+        return state
+    
+    def load_state_dict(self, state):
+        """Restore from state_dict(); uniform checkpoints restart at max priority"""
+        if "max_priority" in state:
+            self.max_priority = float(state["max_priority"])
+            self.beta = float(state["beta"])
+        
+        self.tree = SumTree(self.capacity)
+        idx = super().load_state_dict(state)
+        if "priorities" in state:
+            self.tree.update(idx, state["priorities"][self._saved_order(state)[-self.capacity:]])
+        return idx
+    
+    def update_priorities(self, idx, td_errors):
+        """Re-prioritize sampled transitions from their absolute TD errors"""
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
@@ -0,0 +1,133 @@
+# ml/rl_checkpoint.py
+"""
+Arasaka Cold Storage - Background checkpointing of resumable RL training runs
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from utils.logger import logger
+
+def snapshot(trainer, episode, memory=True):
+    """Copy everything needed to resume training into a flat dict of arrays.
+    
+    Runs on the training thread and only copies memory, so the expensive part
+    - serializing and writing - can happen in the background while the next
+    episode trains on the live objects. The replay buffer is most of that
+    copy; with memory=False it is left out and the writer reuses the last one.
+    """
+    arrays = {
+        "episode": np.array(episode),
+        "epsilon": np.array(trainer.epsilon)
+    }
+    
+    for prefix, weights in [
+        ("model", trainer.model.get_weights()),
+        ("target", trainer.target_model.get_weights()),
+        ("optimizer", [v.numpy() for v in trainer.model.optimizer.variables])
+    ]:
+        arrays[f"{prefix}_count"] = np.array(len(weights))
+        for i, w in enumerate(weights):
+            arrays[f"{prefix}_{i}"] = np.array(w)
+    
+    if memory:
+        for key, value in trainer.memory.state_dict().items():
+            arrays[f"memory_{key}"] = value
+    
+    return arrays
+
+def _unpack(arrays, prefix):
+    return [arrays[f"{prefix}_{i}"] for i in range(int(arrays[f"{prefix}_count"]))]
+
+def restore(trainer, arrays):
+    """Load a snapshot back into a trainer; returns the episode to resume from"""
+    trainer.model.set_weights(_unpack(arrays, "model"))
+    trainer.target_model.set_weights(_unpack(arrays, "target"))
+    
+    # Optimizer slots only exist once built against the model's variables
+    optimizer = trainer.model.optimizer
+    if not optimizer.built:
+        optimizer.build(trainer.model.trainable_variables)
+    for variable, value in zip(optimizer.variables, _unpack(arrays, "optimizer")):
+        variable.assign(value)
+    
+    trainer.epsilon = float(arrays["epsilon"])
+    
+    memory = {key[len("memory_"):]: arrays[key] for key in arrays if key.startswith("memory_")}
+    trainer.memory.load_state_dict(memory)
+    
+    return int(arrays["episode"]) + 1
+
+class CheckpointWriter:
+    """Writes training snapshots to one compressed .npz file on a single background thread.
+    
+    At most one write is in flight: a new save waits for the previous one, so
+    a slow disk can't queue up copies of the replay buffer. Snapshots taken
+    without the buffer are written with the last one saved. Files are written
+    beside the target and renamed into place, so a crash mid-write leaves the
+    previous checkpoint intact.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rl-checkpoint")
+        self._pending = None
+        self._memory = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def has_memory(self):
+        """Whether a replay buffer snapshot is held for buffer-less saves"""
+        return bool(self._memory)
+    
+    def exists(self):
+        return os.path.exists(self.path)
+    
+    def _write(self, arrays):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp.npz"
+            # Compression runs on the writer thread, off the training loop
+            np.savez_compressed(tmp_path, **arrays)
+            os.replace(tmp_path, self.path)
+            logger.info(f"RL checkpoint saved at episode {int(arrays['episode'])}")
+        except Exception as e:
+            logger.error(f"RL checkpoint write flatlined: {e}")
+    
+    def save(self, arrays):
+        """Queue a snapshot for writing and return immediately"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.result()
+            memory = {key: value for key, value in arrays.items() if key.startswith("memory_")}
+            if memory:
+                self._memory = memory
+            else:
+                arrays = {**arrays, **self._memory}
+            self._pending = self._executor.submit(self._write, arrays)
+    
+    def flush(self):
+        """Block until the last queued checkpoint is on disk"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.result()
+                self._pending = None
+    
+    def load(self):
+        """Read the checkpoint into memory, or None if there is none"""
+        if not self.exists():
+            return None
+        try:
+            with np.load(self.path, allow_pickle=False) as checkpoint:
+                return {key: checkpoint[key] for key in checkpoint.files}
+        except Exception as e:
+            logger.error(f"RL checkpoint load flatlined: {e}")
+            return None
+    
+    def clear(self):
+        """Remove the checkpoint once its run has finished"""
+        self.flush()
+        self._memory = {}
+        if self.exists():
+            os.remove(self.path)
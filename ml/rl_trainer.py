@@ -8,11 +8,14 @@ import tensorflow as tf
 from tensorflow.keras.models import Sequential, load_model
 from tensorflow.keras.layers import Dense, Dropout
 from tensorflow.keras.optimizers import Adam
-from collections import deque
 import random
 import os
 
 from config.settings import settings
+from ml.policy_inference import calculate_indicators, export_policy, policy
+from ml.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from ml.rl_checkpoint import CheckpointWriter, snapshot, restore
+from ml.trading_env import VectorTradingEnv
 from utils.logger import logger
 
 class RLTrainer:
@@ -21,6 +24,7 @@ class RLTrainer:
         self.state_size = len(settings.ML["features"])
         self.action_size = 3  # Buy, Sell, Hold
         self.model_path = settings.RL["model_path"]
+        self.policy_path = settings.RL.get("policy_path", "ml/rl_policy.npz")
         
         # Training parameters
         self.gamma = settings.RL["gamma"]
@@ -31,7 +35,29 @@ class RLTrainer:
         self.batch_size = settings.RL["batch_size"]
         
         # Memory for experience replay
-        self.memory = deque(maxlen=2000)
+        memory_size = settings.RL.get("memory_size", 2000)
+        per = settings.RL.get("prioritized_replay", {})
+        self.prioritized = per.get("enabled", False)
+        
+        if self.prioritized:
+            self.memory = PrioritizedReplayBuffer(
+                memory_size,
+                self.state_size,
+                alpha=per.get("alpha", 0.6),
+                beta=per.get("beta", 0.4),
+                beta_increment=per.get("beta_increment", 1e-4)
+            )
+        else:
+            self.memory = ReplayBuffer(memory_size, self.state_size)
+        
+        # Periodic checkpoints so interrupted runs can resume
+        checkpoint = settings.RL.get("checkpoint", {})
+        self.checkpoint_every = checkpoint.get("every_episodes", 5)
+        self.memory_checkpoint_every = checkpoint.get("memory_every_episodes", 25)
+        self.checkpoints = (
+            CheckpointWriter(checkpoint.get("path", "ml/checkpoints/rl_checkpoint.npz"))
+            if checkpoint.get("enabled", True) else None
+        )
         
         # GPU configuration
         self.gpu_available = len(tf.config.list_physical_devices('GPU')) > 0
@@ -45,6 +71,11 @@ class RLTrainer:
         self.model = self._load_or_create_model()
         self.target_model = self._load_or_create_model()
         self.update_target_model()
+        self._train_step = self._build_train_step()
+        
+        # Models trained before the numpy policy existed still need an export
+        if os.path.exists(self.model_path) and not os.path.exists(self.policy_path):
+            self.export_policy()
     
     def _load_or_create_model(self):
         """Load existing model or create new one"""
@@ -76,61 +107,123 @@ class RLTrainer:
         
         return model
     
+    def save_model(self):
+        """Save the Keras model and refresh the exported numpy policy"""
+        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        self.model.save(self.model_path)
+        logger.info(f"RL model saved to {self.model_path}")
+        self.export_policy()
+    
+    def export_policy(self):
+        """Export weights for TensorFlow-free inference in the bot and API"""
+        try:
+            export_policy(self.model, self.policy_path)
+            if policy.path == self.policy_path:
+                policy.refresh()
+        except Exception as e:
+            logger.error(f"RL policy export flatlined: {e}")
+    
+    def resume_from_checkpoint(self):
+        """Restore the last checkpoint if there is one; returns the next episode"""
+        if not self.checkpoints:
+            return 0
+        
+        arrays = self.checkpoints.load()
+        if arrays is None:
+            return 0
+        
+        try:
+            start_episode = restore(self, arrays)
+            logger.info(f"RL training resumed at episode {start_episode} "
+                       f"({len(self.memory)} replay transitions, epsilon {self.epsilon:.3f})")
+            return start_episode
+        except Exception as e:
+            logger.error(f"RL checkpoint restore flatlined, starting fresh: {e}")
+            return 0
+    
     def update_target_model(self):
         """Copy weights from main model to target model"""
         self.target_model.set_weights(self.model.get_weights())
     
     def remember(self, state, action, reward, next_state, done):
         """Store experience in replay buffer"""
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
     
     def act(self, state):
         """Choose action using epsilon-greedy policy"""
         if np.random.rand() <= self.epsilon:
             return random.randrange(self.action_size)
         
-        # Reshape state for prediction
-        state = np.array(state).reshape(1, -1)
+        # Direct model call - skips the per-call data pipeline that predict() builds
+        state = np.asarray(state, dtype=np.float32).reshape(1, -1)
+        act_values = self.model(state, training=False).numpy()
+        
+        return int(np.argmax(act_values[0]))
+    
+    def act_batch(self, states):
+        """Epsilon-greedy actions for a batch of states from one forward pass"""
+        q_values = self.model(np.asarray(states, dtype=np.float32), training=False).numpy()
+        actions = np.argmax(q_values, axis=1)
+        
+        explore = np.random.rand(len(actions)) <= self.epsilon
+        actions[explore] = np.random.randint(0, self.action_size, size=int(explore.sum()))
+        
+        return actions
+    
+    def _build_train_step(self):
+        """Compile one DQN update as a single TensorFlow graph.
+        
+        Bellman targets come from one batched target-network pass, and only
+        the Q-value of the taken action is regressed. Dividing by action_size
+        keeps the loss scale of the old full-vector MSE, where the other
+        actions contributed zero error. Per-sample weights carry importance
+        sampling corrections, and the TD errors are returned for re-prioritizing.
+        """
+        model = self.model
+        target_model = self.target_model
+        
+        # Models restored without optimizer state still need one to train
+        if model.optimizer is None:
+            model.compile(loss="mse", optimizer=Adam(learning_rate=self.learning_rate))
+        optimizer = model.optimizer
+        gamma = tf.constant(self.gamma, dtype=tf.float32)
+        action_size = self.action_size
         
-        # Use GPU if available
-        with tf.device('/GPU:0' if self.gpu_available else '/CPU:0'):
-            act_values = self.model.predict(state, verbose=0)
+        @tf.function
+        def train_step(states, actions, rewards, next_states, dones, weights):
+            next_q = target_model(next_states, training=False)
+            targets = rewards + gamma * tf.reduce_max(next_q, axis=1) * (1.0 - dones)
+            
+            with tf.GradientTape() as tape:
+                q_values = model(states, training=True)
+                q_taken = tf.reduce_sum(q_values * tf.one_hot(actions, action_size), axis=1)
+                td_errors = targets - q_taken
+                loss = tf.reduce_mean(weights * tf.square(td_errors)) / action_size
+            
+            gradients = tape.gradient(loss, model.trainable_variables)
+            optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+            return td_errors
         
-        return np.argmax(act_values[0])
+        return train_step
     
     def replay(self):
         """Train model on batch of experiences"""
         if len(self.memory) < self.batch_size:
             return
         
-        # Sample batch from memory
-        minibatch = random.sample(self.memory, self.batch_size)
-        
-        # Prepare batch data
-        states = np.array([experience[0] for experience in minibatch])
-        actions = np.array([experience[1] for experience in minibatch])
-        rewards = np.array([experience[2] for experience in minibatch])
-        next_states = np.array([experience[3] for experience in minibatch])
-        dones = np.array([experience[4] for experience in minibatch])
-        
-        # Use GPU if available
-        with tf.device('/GPU:0' if self.gpu_available else '/CPU:0'):
-            # Predict Q-values for starting states
-            current_q_values = self.model.predict(states, verbose=0)
-            
-            # Predict Q-values for next states
-            next_q_values = self.target_model.predict(next_states, verbose=0)
+        # Sample batch arrays from memory
+        if self.prioritized:
+            states, actions, rewards, next_states, dones, weights, idx = self.memory.sample(self.batch_size)
+        else:
+            states, actions, rewards, next_states, dones = self.memory.sample(self.batch_size)
+            weights = np.ones(self.batch_size, dtype=np.float32)
         
-        # Update Q-values with Bellman equation
-        for i in range(self.batch_size):
-            if dones[i]:
-                current_q_values[i][actions[i]] = rewards[i]
-            else:
-                current_q_values[i][actions[i]] = rewards[i] + self.gamma * np.max(next_q_values[i])
+        # One compiled step: vectorized targets, forward, backward and update
+        td_errors = self._train_step(states, actions, rewards, next_states, dones, weights)
         
-        # Train model
-        with tf.device('/GPU:0' if self.gpu_available else '/CPU:0'):
-            self.model.fit(states, current_q_values, epochs=1, verbose=0, batch_size=self.batch_size)
+        # Batched priority refresh from this step's TD errors
+        if self.prioritized:
+            self.memory.update_priorities(idx, td_errors.numpy())
         
         # Decay epsilon
         if self.epsilon > self.epsilon_min:
@@ -138,40 +231,7 @@ class RLTrainer:
     
     def calculate_indicators(self, df):
         """Calculate technical indicators for RL features"""
-        try:
-            # Simple Moving Averages
-            df["sma_20"] = df["close"].rolling(window=20, min_periods=1).mean()
-            df["sma_50"] = df["close"].rolling(window=50, min_periods=1).mean()
-            
-            # RSI
-            delta = df["close"].diff()
-            gain = delta.where(delta > 0, 0).rolling(window=14, min_periods=1).mean()
-            loss = -delta.where(delta < 0, 0).rolling(window=14, min_periods=1).mean()
-            rs = gain / (loss + 1e-10)
-            df["rsi_14"] = 100 - (100 / (1 + rs))
-            
-            # Bollinger Bands
-            df["std_20"] = df["close"].rolling(window=20, min_periods=1).std()
-            df["bollinger_upper"] = df["sma_20"] + 2 * df["std_20"]
-            df["bollinger_lower"] = df["sma_20"] - 2 * df["std_20"]
-            
-            # MACD
-            ema12 = df["close"].ewm(span=12, adjust=False, min_periods=1).mean()
-            ema26 = df["close"].ewm(span=26, adjust=False, min_periods=1).mean()
-            df["macd"] = ema12 - ema26
-            
-            # Additional features
-            df["sentiment_score"] = 0.0
-            df["whale_ratio"] = 0.0
-            
-            # Fill NaN values
-            df = df.fillna(method='ffill').fillna(0)
-            
-            return df
-            
-        except Exception as e:
-            logger.error(f"RL indicator calculation flatlined: {e}")
-            return df
+        return calculate_indicators(df)
     
     def calculate_reward(self, price_data, action, fee_rate=0.001):
         """Calculate reward for an action"""
@@ -189,71 +249,88 @@ class RLTrainer:
             logger.error(f"Reward calculation flatlined: {e}")
             return 0
     
-    async def train(self, data):
-        """Train the RL model"""
+    def _prepare_series(self, data):
+        """Turn raw candles into (states, opens, closes) arrays for the simulator"""
+        df = pd.DataFrame(
+            data,
+            columns=["timestamp", "open", "high", "low", "close", "volume"]
+        )
+        
+        # Calculate indicators
+        df = self.calculate_indicators(df)
+        
+        return (
+            df[settings.ML["features"]].values,
+            df["open"].values,
+            df["close"].values
+        )
+    
+    async def train(self, data, resume=True):
+        """Train the RL model.
+        
+        `data` is a list of candles for one symbol, or a dict of symbol -> candles
+        to draw episodes from several symbols. With `resume`, an interrupted run
+        continues from its last checkpoint instead of starting over.
+        """
         try:
             logger.info("Starting RL model training...")
             
-            # Convert to DataFrame
-            df = pd.DataFrame(
-                data,
-                columns=["timestamp", "open", "high", "low", "close", "volume"]
-            )
-            
-            # Calculate indicators
-            df = self.calculate_indicators(df)
-            
-            # Extract features
-            states = df[settings.ML["features"]].values
+            candle_sets = data.values() if isinstance(data, dict) else [data]
+            series = [self._prepare_series(candles) for candles in candle_sets]
             
             # Check if we have enough data
-            if len(states) < 10:
+            if max(len(states) for states, _, _ in series) < 10:
                 raise ValueError("Insufficient data for RL training")
             
+            # K parallel episodes with precomputed rewards
+            env = VectorTradingEnv(
+                series,
+                n_envs=settings.RL.get("n_envs", 16),
+                episode_length=1000,  # Limit sequence length
+                fee_rate=settings.TRADING["fees"]["taker"]
+            )
+            replay_every = settings.RL.get("replay_every", 1)
+            
             # Training loop
             episodes = min(settings.RL["episodes"], 100)  # Cap episodes for performance
+            start_episode = self.resume_from_checkpoint() if resume else 0
+            states = env.reset()
             
-            for episode in range(episodes):
-                # Reset for new episode
-                total_reward = 0
-                done = False
-                
-                # Train on sequences
-                sequence_length = min(len(states) - 1, 1000)  # Limit sequence length
-                
-                for t in range(sequence_length):
-                    # Get current state
-                    current_state = states[t]
-                    
-                    # Choose action
-                    action = self.act(current_state)
+            for episode in range(start_episode, episodes):
+                for t in range(env.episode_length):
+                    # One forward pass picks actions for all environments
+                    actions = self.act_batch(states)
+                    states_next, rewards, dones, next_states = env.step(actions)
                     
-                    # Get next state
-                    next_state = states[t + 1] if t < len(states) - 1 else states[t]
-                    
-                    # Calculate reward
-                    reward = self.calculate_reward(df.iloc[t], action)
-                    total_reward += reward
-                    
-                    # Check if done
-                    done = t == sequence_length - 1
-                    
-                    # Store experience
-                    self.remember(current_state, action, reward, next_state, done)
+                    # Store K experiences at once
+                    self.memory.add_batch(states, actions, rewards, next_states, dones)
+                    states = states_next
                     
                     # Train on experience replay
-                    if len(self.memory) > self.batch_size:
+                    if len(self.memory) > self.batch_size and t % replay_every == 0:
                         self.replay()
                 
                 # Update target model periodically
                 if episode % 10 == 0:
                     self.update_target_model()
-                    logger.info(f"RL Episode {episode}/{episodes} - Total Reward: {total_reward:.4f}, Epsilon: {self.epsilon:.3f}")
+                    finished = env.pop_finished_rewards()
+                    mean_reward = np.mean(finished) if finished else 0.0
+                    logger.info(f"RL Episode {episode}/{episodes} - Mean Reward: {mean_reward:.4f} "
+                               f"({len(finished)} runs x {env.n_envs} envs), Epsilon: {self.epsilon:.3f}")
+                
+                # Snapshot in memory here, write to disk in the background
+                if self.checkpoints and (episode + 1) % self.checkpoint_every == 0:
+                    # The replay buffer dwarfs the weights - copy it less often
+                    with_memory = (not self.checkpoints.has_memory
+                                   or (episode + 1) % self.memory_checkpoint_every == 0)
+                    self.checkpoints.save(snapshot(self, episode, memory=with_memory))
             
-            # Save model
-            os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-            self.model.save(self.model_path)
-            logger.info(f"RL model saved to {self.model_path}")
+            # Save model and the numpy policy served to live trading
+            self.save_model()
+            
+            # The finished run no longer needs its checkpoint
+            if self.checkpoints:
+                self.checkpoints.clear()
             
         except Exception as e:
             logger.error(f"RL training flatlined: {e}")
@@ -290,5 +367,18 @@ class RLTrainer:
             logger.error(f"RL prediction flatlined: {e}")
             return 0.5  # Return neutral on error
 
-# Create singleton instance
-rl_trainer = RLTrainer()
+# Shared instance, created on first use - building it probes GPUs and two Keras models
+_rl_trainer = None
+
+def get_rl_trainer():
+    """Return the shared RLTrainer, creating it on first call"""
+    global _rl_trainer
+    if _rl_trainer is None:
+        _rl_trainer = RLTrainer()
+    return _rl_trainer
+
+def __getattr__(name):
+    # Keeps `from ml.rl_trainer import rl_trainer` working without an import-time build
+    if name == "rl_trainer":
+        return get_rl_trainer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,108 @@
+# ml/trading_env.py
+"""
+Arasaka Training Grounds - Vectorized multi-episode trading simulator for the DQN
+"""
+import numpy as np
+
+def reward_table(opens, closes, fee_rate=0.001):
+    """Precompute per-candle rewards for (buy, sell, hold) as a (T, 3) array.
+    
+    Matches RLTrainer.calculate_reward: the candle's open-to-close move, less
+    the fee for buys and sells, and zero for holds.
+    """
+    price_change = (closes - opens) / opens
+    return np.column_stack([
+        price_change - fee_rate,
+        -price_change - fee_rate,
+        np.zeros_like(price_change)
+    ]).astype(np.float32)
+
+class VectorTradingEnv:
+    """Steps K independent trading episodes in lockstep as numpy arrays.
+    
+    All symbols' feature and reward arrays are concatenated once, and each
+    environment is just an index into them, so a step is a handful of
+    vectorized gathers regardless of K. Finished episodes restart on a random
+    symbol at a random offset.
+    """
+    
+    def __init__(self, series, n_envs=16, episode_length=1000, fee_rate=0.001, seed=None):
+        """series: list of (states, opens, closes) arrays, one entry per symbol"""
+        lengths = []
+        states, rewards = [], []
+        for symbol_states, opens, closes in series:
+            if len(symbol_states) < 2:
+                continue
+            states.append(np.asarray(symbol_states, dtype=np.float32))
+            rewards.append(reward_table(np.asarray(opens, dtype=np.float64),
+                                        np.asarray(closes, dtype=np.float64), fee_rate))
+            lengths.append(len(symbol_states))
+        
+        if not lengths:
+            raise ValueError("No symbol has enough candles for an episode")
+        
+        self.states = np.concatenate(states)
+        self.rewards = np.concatenate(rewards)
+        self.lengths = np.array(lengths)
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)[:-1]])
+        
+        self.n_envs = n_envs
+        self.episode_length = min(episode_length, int(self.lengths.max()) - 1)
+        self.rng = np.random.default_rng(seed)
+        
+        self.symbol = np.zeros(n_envs, dtype=np.int64)
+        self.cursor = np.zeros(n_envs, dtype=np.int64)
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+        self.episode_rewards = np.zeros(n_envs, dtype=np.float64)
+        self.finished_rewards = []
+    
+    @property
+    def state_size(self):
+        return self.states.shape[1]
+    
+    def _restart(self, envs):
+        """Put the given environments at a random symbol and start offset"""
+        n = len(envs)
+        symbol = self.rng.integers(0, len(self.lengths), size=n)
+        # Leave room for a full episode where the symbol's history allows it
+        room = np.maximum(self.lengths[symbol] - 1 - self.episode_length, 0)
+        start = (self.rng.random(n) * (room + 1)).astype(np.int64)
+        
+        self.symbol[envs] = symbol
+        self.cursor[envs] = self.offsets[symbol] + start
+        self.steps[envs] = 0
+        self.episode_rewards[envs] = 0.0
+    
+    def reset(self):
+        """Start fresh episodes in every environment and return their states"""
+        self._restart(np.arange(self.n_envs))
+        return self.states[self.cursor]
+    
+    def step(self, actions):
+        """Apply one action per environment.
+        
+        Returns (observations, rewards, dones, next_states). next_states are the
+        true successors for the replay buffer; observations are what the agent
+        acts on next, with finished environments already restarted.
+        """
+        rewards = self.rewards[self.cursor, actions]
+        next_cursor = self.cursor + 1
+        next_states = self.states[next_cursor]
+        
+        self.steps += 1
+        self.episode_rewards += rewards
+        symbol_end = self.offsets[self.symbol] + self.lengths[self.symbol] - 1
+        dones = (self.steps >= self.episode_length) | (next_cursor >= symbol_end)
+        
+        self.cursor = next_cursor
+        finished = np.flatnonzero(dones)
+        if len(finished):
+            self.finished_rewards.extend(self.episode_rewards[finished].tolist())
+            self._restart(finished)
+        
+        return self.states[self.cursor], rewards, dones.astype(np.float32), next_states
+    
+    def pop_finished_rewards(self):
+        """Total rewards of episodes completed since the last call"""
+        finished, self.finished_rewards = self.finished_rewards, []
+        return finished
@@ -2,24 +2,30 @@
 """
 Arasaka ML Training Core - XGBoost-powered predictions for maximum Eddies
 """
+import asyncio
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-import xgboost as xgb
 import joblib
+import json
 import os
+from datetime import datetime
 
 from config.settings import settings
 from core.database import db
 from utils.logger import logger
 
+# XGBoost and scikit-learn are imported inside the methods that need them,
+# so importing this module doesn't pay for either stack
+
 class MLTrainer:
     def __init__(self):
         self.model_path = settings.ML["model_path"]
         self.features = settings.ML["features"]
-        self.scaler = StandardScaler()
+        self.scaler_path = self.model_path.replace('.pkl', '_scaler.pkl')
+        self.meta_path = self.model_path.replace('.pkl', '_meta.json')
+        self.scaler = None  # Fitted on the training split in train or loaded from disk
         self.model = None
+        self.last_trained_timestamp = None
         self._load_model()
     
     def _load_model(self):
@@ -28,10 +34,34 @@ class MLTrainer:
             if os.path.exists(self.model_path):
                 self.model = joblib.load(self.model_path)
                 logger.info("ML model loaded from disk")
+            
+            if os.path.exists(self.meta_path):
+                with open(self.meta_path, "r") as f:
+                    self.last_trained_timestamp = json.load(f).get("last_timestamp")
         except Exception as e:
             logger.error(f"Model load failed: {e}")
             self.model = None
     
+    def _load_scaler(self):
+        """Load the fitted scaler from disk if it isn't in memory yet"""
+        if os.path.exists(self.scaler_path) and not hasattr(self.scaler, 'mean_'):
+            self.scaler = joblib.load(self.scaler_path)
+    
+    def _save_model(self, last_timestamp):
+        """Persist model, scaler and the newest candle timestamp it has seen"""
+        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        joblib.dump(self.model, self.model_path)
+        joblib.dump(self.scaler, self.scaler_path)
+        
+        self.last_trained_timestamp = last_timestamp
+        with open(self.meta_path, "w") as f:
+            json.dump({
+                "last_timestamp": last_timestamp,
+                "saved_at": datetime.now().isoformat()
+            }, f)
+        
+        logger.info(f"Model saved to {self.model_path}")
+    
     def calculate_indicators(self, df):
         """Calculate technical indicators for ML features"""
         try:
@@ -121,29 +151,33 @@ class MLTrainer:
         except Exception as e:
             logger.error(f"Seasonality analysis flatlined: {e}")
     
+    def _build_frame(self, data):
+        """Convert raw candles to an indicator frame with next-candle targets"""
+        # Convert to DataFrame
+        if isinstance(data, list):
+            df = pd.DataFrame(
+                data, 
+                columns=["timestamp", "open", "high", "low", "close", "volume"]
+            )
+        else:
+            df = data.copy()
+        
+        # Calculate indicators
+        df = self.calculate_indicators(df)
+        
+        # Create target variable (1 if price goes up, 0 if down)
+        df["target"] = (df["close"].shift(-1) > df["close"]).astype(int)
+        
+        # Remove last row (no target)
+        df = df[:-1]
+        
+        # Remove any rows with NaN
+        return df.dropna()
+    
     def prepare_data(self, data):
-        """Prepare data for training"""
+        """Unscaled features and targets - scalers are fitted on training rows only"""
         try:
-            # Convert to DataFrame
-            if isinstance(data, list):
-                df = pd.DataFrame(
-                    data, 
-                    columns=["timestamp", "open", "high", "low", "close", "volume"]
-                )
-            else:
-                df = data.copy()
-            
-            # Calculate indicators
-            df = self.calculate_indicators(df)
-            
-            # Create target variable (1 if price goes up, 0 if down)
-            df["target"] = (df["close"].shift(-1) > df["close"]).astype(int)
-            
-            # Remove last row (no target)
-            df = df[:-1]
-            
-            # Remove any rows with NaN
-            df = df.dropna()
+            df = self._build_frame(data)
             
             if len(df) < 100:
                 raise ValueError("Insufficient data for training")
@@ -152,10 +186,7 @@ class MLTrainer:
             X = df[self.features].values
             y = df["target"].values
             
-            # Scale features
-            X_scaled = self.scaler.fit_transform(X)
-            
-            return X_scaled, y
+            return X, y
             
         except Exception as e:
             logger.error(f"Data preparation flatlined: {e}")
@@ -163,35 +194,50 @@ class MLTrainer:
     
     async def train(self, data):
         """Train the XGBoost model"""
+        import xgboost as xgb
+        from sklearn.preprocessing import StandardScaler
+        from ml.cross_validation import WalkForwardValidator
+        
         try:
             logger.info("Starting ML model training...")
             
             # Prepare data
             X, y = self.prepare_data(data)
             
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42
-            )
+            # Chronological split - shuffling would leak future candles into training
+            cv_settings = settings.ML.get("cross_validation", {})
+            gap = cv_settings.get("purge", 1) + cv_settings.get("embargo", 0)
+            split = int(len(X) * 0.8)
+            X_train, y_train = X[:max(split - gap, 1)], y[:max(split - gap, 1)]
+            X_test, y_test = X[split:], y[split:]
+            
+            params = dict(settings.ML.get("xgboost", {
+                "n_estimators": 100,
+                "learning_rate": 0.1,
+                "max_depth": 5,
+                "subsample": 0.8,
+                "colsample_bytree": 0.8
+            }))
+            params["random_state"] = 42
+            
+            # Walk-forward hyperparameter search on the training window only
+            # (each fold fits its own scaler)
+            if cv_settings.get("enabled", True):
+                try:
+                    params, _ = await asyncio.to_thread(
+                        WalkForwardValidator(cv_settings).search, X_train, y_train, params
+                    )
+                except ValueError as e:
+                    logger.warning(f"Walk-forward CV skipped: {e}")
             
-            # Train model
-            self.model = xgb.XGBClassifier(
-                n_estimators=100,
-                learning_rate=0.1,
-                max_depth=5,
-                subsample=0.8,
-                colsample_bytree=0.8,
-                random_state=42,
-                use_label_encoder=False,
-                eval_metric='logloss'
-            )
+            # Scale with training-window statistics only
+            self.scaler = StandardScaler().fit(X_train)
+            X_train = self.scaler.transform(X_train)
+            X_test = self.scaler.transform(X_test)
             
-            self.model.fit(
-                X_train, y_train,
-                eval_set=[(X_test, y_test)],
-                early_stopping_rounds=10,
-                verbose=False
-            )
+            # Train model
+            self.model = xgb.XGBClassifier(**params, eval_metric="logloss")
+            self.model.fit(X_train, y_train, verbose=False)
             
             # Evaluate model
             train_score = self.model.score(X_train, y_train)
@@ -199,15 +245,8 @@ class MLTrainer:
             
             logger.info(f"Model training complete - Train: {train_score:.3f}, Test: {test_score:.3f}")
             
-            # Save model
-            os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-            joblib.dump(self.model, self.model_path)
-            
-            # Save scaler
-            scaler_path = self.model_path.replace('.pkl', '_scaler.pkl')
-            joblib.dump(self.scaler, scaler_path)
-            
-            logger.info(f"Model saved to {self.model_path}")
+            # Save model, scaler and training watermark
+            self._save_model(self._last_labelled_timestamp(data))
             
             # Analyze seasonality for the symbol
             if len(data) > 0 and isinstance(data[0], (list, tuple)) and len(data[0]) > 0:
@@ -220,6 +259,79 @@ class MLTrainer:
             logger.error(f"Model training flatlined: {e}")
             raise
     
+    async def update(self, data):
+        """Continue boosting the current model on candles newer than the last training run.
+        
+        `data` should include enough look-back before the new candles for the
+        rolling indicators. The most recent candles are held out, and the update
+        is only promoted if it doesn't degrade log loss on that holdout.
+        """
+        import xgboost as xgb
+        from sklearn.metrics import log_loss
+        
+        try:
+            if self.model is None or self.last_trained_timestamp is None:
+                logger.info("No trained model to update - running full training")
+                await self.train(data)
+                return True
+            
+            inc = settings.ML.get("incremental", {})
+            holdout_size = inc.get("holdout_candles", 48)
+            
+            self._load_scaler()
+            df = self._build_frame(data)
+            new_rows = df[df["timestamp"] > self.last_trained_timestamp]
+            
+            if len(new_rows) < inc.get("min_new_candles", 24) + holdout_size:
+                logger.info(f"Only {len(new_rows)} new candles - skipping incremental update")
+                return False
+            
+            # Train on new candles, validate on the most recent ones (purged by one candle)
+            train_rows = new_rows.iloc[:-(holdout_size + 1)]
+            holdout_rows = new_rows.iloc[-holdout_size:]
+            
+            X_train = self.scaler.transform(train_rows[self.features].values)
+            y_train = train_rows["target"].values
+            X_holdout = self.scaler.transform(holdout_rows[self.features].values)
+            y_holdout = holdout_rows["target"].values
+            
+            params = self.model.get_params()
+            params["n_estimators"] = inc.get("boost_rounds", 20)
+            params["early_stopping_rounds"] = None
+            
+            candidate = xgb.XGBClassifier(**params)
+            candidate.fit(X_train, y_train, xgb_model=self.model.get_booster(), verbose=False)
+            
+            # Promotion gate on the recent holdout
+            current_loss = log_loss(y_holdout, self.model.predict_proba(X_holdout)[:, 1], labels=[0, 1])
+            candidate_loss = log_loss(y_holdout, candidate.predict_proba(X_holdout)[:, 1], labels=[0, 1])
+            
+            if candidate_loss > current_loss + inc.get("max_logloss_increase", 0.0):
+                logger.warning(
+                    f"Incremental update rejected - holdout logloss {candidate_loss:.4f} "
+                    f"vs current {current_loss:.4f}"
+                )
+                return False
+            
+            self.model = candidate
+            self._save_model(int(train_rows["timestamp"].iloc[-1]))
+            
+            logger.info(
+                f"Incremental update promoted on {len(train_rows)} candles - "
+                f"holdout logloss {current_loss:.4f} -> {candidate_loss:.4f}"
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(f"Incremental update flatlined: {e}")
+            raise
+    
+    def _last_labelled_timestamp(self, data):
+        """Timestamp of the newest candle that has a next-candle target"""
+        if isinstance(data, list):
+            return int(data[-2][0])
+        return int(data["timestamp"].iloc[-2])
+    
     def predict(self, data):
         """Make prediction on new data"""
         try:
@@ -242,9 +354,7 @@ class MLTrainer:
             X = df[self.features].values
             
             # Load scaler if needed
-            scaler_path = self.model_path.replace('.pkl', '_scaler.pkl')
-            if os.path.exists(scaler_path) and not hasattr(self.scaler, 'mean_'):
-                self.scaler = joblib.load(scaler_path)
+            self._load_scaler()
             
             # Scale features
             if hasattr(self.scaler, 'mean_'):
@@ -265,5 +375,18 @@ class MLTrainer:
             # Return neutral prediction on error
             return 0
 
-# Create singleton instance
-trainer = MLTrainer()
+# Shared instance, created on first use - loading a saved model pulls in XGBoost
+_trainer = None
+
+def get_trainer():
+    """Return the shared MLTrainer, creating it on first call"""
+    global _trainer
+    if _trainer is None:
+        _trainer = MLTrainer()
+    return _trainer
+
+def __getattr__(name):
+    # Keeps `from ml.trainer import trainer` working without an import-time load
+    if name == "trainer":
+        return get_trainer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
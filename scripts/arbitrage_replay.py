@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Record live tickers/order books, or replay a recording through the arbitrage pipeline"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market.tick_recorder import tick_recorder
+from trading.arbitrage_replay import ArbitrageReplay
+
+async def record(args):
+    if args.path:
+        tick_recorder.path = args.path
+    try:
+        await tick_recorder.run(args.pairs or None)
+    finally:
+        from market.multi_exchange_fetcher import multi_fetcher
+        await multi_fetcher.close_all()
+
+async def replay(args):
+    replayer = ArbitrageReplay(args.path, args.min_profit)
+    report = await replayer.run(args.exchanges or None, args.start, args.end, args.speed, args.full_scan)
+    if not report:
+        return
+    
+    print(f"Exchanges: {', '.join(report['exchanges'])} ({report['pairs']} shared pairs)")
+    print(f"Replayed {report['span_seconds']:.0f}s in {report['wall_seconds']:.2f}s ({report['speedup']:.0f}x real time)")
+    print(f"Ticker updates: {report['ticker_updates']}, book snapshots: {report['book_snapshots']}")
+    for name in ("update_latency_ms", "full_scan_latency_ms"):
+        if report.get(name):
+            stats = report[name]
+            print(f"{name}: mean {stats['mean']:.3f} p50 {stats['p50']:.3f} p99 {stats['p99']:.3f} max {stats['max']:.3f}")
+    
+    print(f"Opportunities: {len(report['opportunities'])}")
+    for opp in sorted(report['opportunities'], key=lambda o: o['net_profit_percent'], reverse=True)[:args.top]:
+        print(f"  {opp['timestamp']} {opp['pair']}: {opp['buy_exchange']} -> {opp['sell_exchange']} "
+              f"{opp['net_profit_percent']:.2f}% size {opp.get('max_volume')}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    rec = commands.add_parser("record", help="Record snapshots until interrupted")
+    rec.add_argument("--path", help="Recording directory (default from config)")
+    rec.add_argument("--pairs", nargs="*", help="Canonical pairs whose order books are recorded")
+    
+    rep = commands.add_parser("replay", help="Replay a recording")
+    rep.add_argument("--path", help="Recording directory (default from config)")
+    rep.add_argument("--exchanges", nargs="*")
+    rep.add_argument("--start", type=int, help="Start time, epoch ms")
+    rep.add_argument("--end", type=int, help="End time, epoch ms")
+    rep.add_argument("--speed", type=float, help="Multiple of real time (default: as fast as possible)")
+    rep.add_argument("--min-profit", type=float, default=0.5, help="Minimum net profit percent")
+    rep.add_argument("--full-scan", action="store_true", help="Also time a full snapshot scan per update")
+    rep.add_argument("--top", type=int, default=10)
+    
+    args = parser.parse_args()
+    asyncio.run(record(args) if args.command == "record" else replay(args))
+
+if __name__ == "__main__":
+    main()
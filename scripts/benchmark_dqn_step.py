@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Benchmark the compiled DQN update against the original predict/loop/fit step"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+
+def eager_replay_step(model, target_model, states, actions, rewards, next_states, dones, gamma):
+    """The replay step before compilation: two predict() calls, a per-sample Bellman loop, then fit().
+    
+    Returns the Q-target matrix it regressed on and the training loss.
+    """
+    current_q_values = model.predict(states, verbose=0)
+    next_q_values = target_model.predict(next_states, verbose=0)
+    
+    for i in range(len(states)):
+        if dones[i]:
+            current_q_values[i][actions[i]] = rewards[i]
+        else:
+            current_q_values[i][actions[i]] = rewards[i] + gamma * np.max(next_q_values[i])
+    
+    history = model.fit(states, current_q_values, epochs=1, verbose=0, batch_size=len(states))
+    return current_q_values, history.history["loss"][0]
+
+def fill_memory(trainer, n, seed):
+    rng = np.random.default_rng(seed)
+    trainer.memory.add_batch(
+        rng.normal(size=(n, trainer.state_size)), rng.integers(0, trainer.action_size, n),
+        rng.normal(size=n), rng.normal(size=(n, trainer.state_size)), rng.random(n) < 0.05
+    )
+
+def benchmark_step(steps, seed):
+    """Replay steps per second, original vs compiled"""
+    from ml.rl_trainer import RLTrainer
+    import tensorflow as tf
+    
+    tf.random.set_seed(seed)
+    settings.RL["model_path"] = os.path.join(tempfile.mkdtemp(), "bench_rl.h5")
+    settings.RL["prioritized_replay"]["enabled"] = False
+    
+    trainer = RLTrainer()
+    fill_memory(trainer, max(10 * trainer.batch_size, 10000), seed)
+    
+    # Warm up both paths (graph tracing, Keras predict/fit functions)
+    trainer.replay()
+    eager_replay_step(trainer.model, trainer.target_model, *trainer.memory.sample(trainer.batch_size), trainer.gamma)
+    
+    start = time.perf_counter()
+    for _ in range(steps):
+        batch = trainer.memory.sample(trainer.batch_size)
+        eager_replay_step(trainer.model, trainer.target_model, *batch, trainer.gamma)
+    eager = steps / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    for _ in range(steps):
+        trainer.replay()
+    compiled = steps / (time.perf_counter() - start)
+    
+    print(f"{'eager':>10}: {eager:8.1f} steps/s (predict x2, Python loop, fit)")
+    print(f"{'compiled':>10}: {compiled:8.1f} steps/s (one tf.function)")
+    print(f"{'speedup':>10}: {compiled / eager:8.1f}x at batch size {trainer.batch_size}")
+    return {"eager": eager, "compiled": compiled}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    print("=== DQN replay step ===")
+    benchmark_step(args.steps, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Benchmark uniform vs prioritized experience replay for the DQN"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+from ml.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from ml.trading_env import VectorTradingEnv, reward_table
+
+def benchmark_sampling(capacity, state_size, batch_size, rounds):
+    """Time batch sampling (and priority updates) on a full buffer"""
+    results = {}
+    
+    for name, buffer in [
+        ("uniform", ReplayBuffer(capacity, state_size, seed=0)),
+        ("prioritized", PrioritizedReplayBuffer(capacity, state_size, seed=0))
+    ]:
+        # Fill in chunks to keep peak memory flat
+        chunk = 100000
+        for start in range(0, capacity, chunk):
+            n = min(chunk, capacity - start)
+            buffer.add_batch(
+                np.random.rand(n, state_size), np.random.randint(0, 3, n),
+                np.random.rand(n), np.random.rand(n, state_size), np.zeros(n)
+            )
+        
+        start = time.perf_counter()
+        for _ in range(rounds):
+            batch = buffer.sample(batch_size)
+            if name == "prioritized":
+                buffer.update_priorities(batch[-1], np.random.rand(batch_size))
+        elapsed = (time.perf_counter() - start) / rounds
+        
+        results[name] = elapsed
+        print(f"{name:>12}: {elapsed * 1e6:8.1f} us per sample+update of {batch_size} at capacity {capacity:,}")
+    
+    return results
+
+def synthetic_series(n, state_size, signal_rate, seed):
+    """Candles whose move is only predictable on a small fraction of rows"""
+    rng = np.random.default_rng(seed)
+    states = rng.normal(size=(n, state_size)).astype(np.float32)
+    signal = np.abs(states[:, 0]) > np.quantile(np.abs(states[:, 0]), 1 - signal_rate)
+    
+    change = rng.normal(0, 0.001, n) + signal * np.sign(states[:, 0]) * 0.02
+    opens = np.full(n, 100.0)
+    closes = opens * (1 + change)
+    return states, opens, closes
+
+def greedy_score(trainer, states, opens, closes, fee_rate):
+    """Fraction of the best achievable reward captured by the greedy policy"""
+    from ml.trading_env import reward_table
+    
+    table = reward_table(opens, closes, fee_rate)
+    actions = np.argmax(trainer.model(states, training=False).numpy(), axis=1)
+    achieved = table[np.arange(len(actions)), actions].sum()
+    return achieved / table.max(axis=1).sum()
+
+def benchmark_convergence(replay_steps, eval_every, seed):
+    """Greedy-policy quality over replay steps for both replay modes"""
+    from ml.rl_trainer import RLTrainer
+    import tensorflow as tf
+    
+    fee_rate = settings.TRADING["fees"]["taker"]
+    series = synthetic_series(20000, len(settings.ML["features"]), 0.05, seed)
+    settings.RL["model_path"] = os.path.join(tempfile.mkdtemp(), "bench_rl.h5")
+    
+    curves = {}
+    for name, enabled in [("uniform", False), ("prioritized", True)]:
+        np.random.seed(seed)
+        tf.random.set_seed(seed)
+        settings.RL["prioritized_replay"]["enabled"] = enabled
+        
+        trainer = RLTrainer()
+        env = VectorTradingEnv([series], n_envs=settings.RL.get("n_envs", 16), seed=seed)
+        states = env.reset()
+        curve = []
+        
+        for step in range(1, replay_steps + 1):
+            actions = trainer.act_batch(states)
+            observations, rewards, dones, next_states = env.step(actions)
+            trainer.memory.add_batch(states, actions, rewards, next_states, dones)
+            states = observations
+            
+            trainer.replay()
+            if step % 100 == 0:
+                trainer.update_target_model()
+            if step % eval_every == 0:
+                curve.append(greedy_score(trainer, *series, fee_rate))
+        
+        curves[name] = curve
+    
+    print(f"\n{'replay steps':>12} {'uniform':>10} {'prioritized':>12}")
+    for i, (u, p) in enumerate(zip(curves["uniform"], curves["prioritized"])):
+        print(f"{(i + 1) * eval_every:>12} {u:>10.3f} {p:>12.3f}")
+    
+    return curves
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--capacity", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=settings.RL["batch_size"])
+    parser.add_argument("--rounds", type=int, default=1000)
+    parser.add_argument("--replay-steps", type=int, default=3000)
+    parser.add_argument("--eval-every", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip-convergence", action="store_true")
+    args = parser.parse_args()
+    
+    print("=== Sampling cost ===")
+    benchmark_sampling(args.capacity, len(settings.ML["features"]), args.batch_size, args.rounds)
+    
+    if not args.skip_convergence:
+        print("\n=== Convergence (share of optimal reward, greedy policy) ===")
+        benchmark_convergence(args.replay_steps, args.eval_every, args.seed)
+
+if __name__ == "__main__":
+    main()
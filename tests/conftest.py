@@ -0,0 +1,126 @@
+# tests/conftest.py
+"""
+Shared test setup - the suite runs against a throwaway database, and market
+and trading tests share one in-memory exchange stand-in
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# core.database opens its singleton at import, so this has to be set before any test module loads
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="arasaka-tests-"), "test_trading.db")
+
+class FakeExchange:
+    """The slice of a ccxt async exchange the Matrix calls, served from memory.
+    
+    Tickers, books and candles come from dicts keyed by symbol; a symbol with
+    no book gets one level at bid/ask. Every call is logged in `calls` as
+    (method, args) and can be slowed by `delay` (seconds, or a dict of seconds
+    per method), with `peak` recording the most calls in flight at once. Market orders are accepted into `placed`
+    before the (possibly delayed) reply, like an exchange that takes an order
+    whose response is then lost; `fail` rejects one side outright, `status`
+    is the state fetch_orders reports and `lookup=False` makes it unsupported.
+    `on_call(exchange, method, args)` runs before each call.
+    """
+    
+    def __init__(self, name="fake", markets=None, tickers=None, books=None, candles=None, bid=100.0, ask=100.05,
+                 size=10.0, delay=0.0, fail=None, status="closed", lookup=True, on_call=None):
+        self.name = name
+        self._markets = markets or {}
+        self.markets = {}
+        self.tickers = tickers or {}
+        self.books = books or {}
+        self.candles = candles or {}
+        self.bid, self.ask, self.size = bid, ask, size
+        self.delay, self.fail, self.status, self.lookup = delay, fail, status, lookup
+        self.on_call = on_call
+        
+        self.calls = []
+        self.placed = []
+        self.in_flight = 0
+        self.peak = 0
+    
+    def called(self, method):
+        """Argument tuples of every call to method, in order"""
+        return [args for name, args in self.calls if name == method]
+    
+    @property
+    def orders(self):
+        """(side, amount) of every order the exchange accepted"""
+        return [(order["side"], order["amount"]) for order in self.placed]
+    
+    async def _call(self, method, *args):
+        self.calls.append((method, args))
+        if self.on_call:
+            self.on_call(self, method, args)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay.get(method, 0.0) if isinstance(self.delay, dict) else self.delay)
+        finally:
+            self.in_flight -= 1
+    
+    async def load_markets(self):
+        self.markets = self._markets
+        return self.markets
+    
+    async def fetch_tickers(self, symbols=None):
+        await self._call("fetch_tickers", symbols)
+        return {s: t for s, t in self.tickers.items() if symbols is None or s in symbols}
+    
+    async def fetch_ticker(self, symbol):
+        await self._call("fetch_ticker", symbol)
+        return self.tickers[symbol]
+    
+    async def fetch_order_book(self, symbol, limit=None):
+        await self._call("fetch_order_book", symbol, limit)
+        return self.books.get(symbol) or {"bids": [[self.bid, self.size]], "asks": [[self.ask, self.size]]}
+    
+    async def fetch_ohlcv(self, symbol, timeframe="1h", since=None, limit=None):
+        await self._call("fetch_ohlcv", symbol, timeframe, limit)
+        return self.candles.get(symbol, [])
+    
+    async def create_market_order(self, symbol, side, amount, params=None):
+        if self.fail == side:
+            raise RuntimeError(f"{side} rejected")
+        price = self.ask if side == "buy" else self.bid
+        filled = amount if self.status == "closed" else 0.0
+        order = {"id": f"{side}{len(self.placed) + 1}", "clientOrderId": (params or {}).get("clientOrderId"),
+                 "symbol": symbol, "side": side, "status": self.status, "amount": amount, "filled": filled,
+                 "price": price, "cost": price * filled}
+        self.placed.append(order)
+        await self._call("create_market_order", symbol, side, amount)
+        return order
+    
+    async def create_market_buy_order(self, symbol, amount, params=None):
+        return await self.create_market_order(symbol, "buy", amount, params)
+    
+    async def create_market_sell_order(self, symbol, amount, params=None):
+        return await self.create_market_order(symbol, "sell", amount, params)
+    
+    async def fetch_orders(self, symbol=None, since=None):
+        if not self.lookup:
+            raise RuntimeError("fetchOrders not supported")
+        return [order for order in self.placed if symbol is None or order["symbol"] == symbol]
+
+class FakeFetcher:
+    """Stands in for multi_fetcher and the candle fetcher over a set of FakeExchanges"""
+    
+    def __init__(self, exchanges):
+        self.exchanges = exchanges
+    
+    async def initialize(self):
+        pass
+    
+    async def fetch_ohlcv(self, pair, timeframe, limit=100, exchange="binance"):
+        return await self.exchanges[exchange].fetch_ohlcv(pair, timeframe, limit=limit)
+
+@pytest.fixture
+def fake_exchange():
+    return FakeExchange
+
+@pytest.fixture
+def fake_fetcher():
+    return FakeFetcher
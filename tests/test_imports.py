@@ -0,0 +1,66 @@
+# tests/test_imports.py
+"""
+Import-time profile for the Matrix entry points
+Fails if TensorFlow, XGBoost or scikit-learn creep back onto the startup path
+Run with `pytest -s` to see the report
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the API, GUI and trading processes import at startup
+ENTRY_POINTS = [
+    "api.app",
+    "trading.trading_bot",
+    "trading.risk_manager",
+    "trading.arbitrage_bot",
+    "market.pair_selector",
+    "ml.trainer",
+    "ml.policy_inference",
+]
+
+# Stacks that may only load once a model is actually trained or queried
+HEAVY_PACKAGES = {"tensorflow", "keras", "xgboost", "sklearn"}
+
+def profile_imports(modules):
+    """Run `python -X importtime` in a fresh interpreter.
+    
+    Returns {top-level package: cumulative microseconds} for everything imported.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=300
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not cumulative.isdigit():
+            continue  # Header row
+        
+        # Submodules roll up into their package; keep its largest cumulative time
+        package = name.split(".")[0]
+        packages[package] = max(packages.get(package, 0), int(cumulative))
+    
+    return packages
+
+def format_report(packages, top=15):
+    lines = ["Import-time profile (cumulative ms, top-level packages):"]
+    for package, us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {package:<28} {us / 1000:8.1f}")
+    return "\n".join(lines)
+
+def test_entry_points_skip_heavy_ml_imports():
+    packages = profile_imports(ENTRY_POINTS)
+    report = format_report(packages)
+    print("\n" + report)
+    
+    loaded = HEAVY_PACKAGES & set(packages)
+    assert not loaded, f"Heavy ML stacks imported at startup: {sorted(loaded)}\n{report}"
@@ -0,0 +1,443 @@
+# tests/test_market.py
+import asyncio
+
+def test_symbol_registry_maps_native_symbols_both_ways():
+    from market.symbol_registry import SymbolRegistry
+    
+    def market(symbol, market_id, base, quote, spot=True):
+        return symbol, {"symbol": symbol, "id": market_id, "base": base, "quote": quote, "active": True, "spot": spot}
+    
+    registry = SymbolRegistry(quote_aliases={"USDT": "USD"})
+    registry.register_exchange("coinbase", dict([market("BTC/USD", "BTC-USD", "BTC", "USD")]))
+    registry.register_exchange("bybit", dict([
+        market("BTC/USDT", "BTCUSDT", "BTC", "USDT"),
+        market("BTC/USDT:USDT", "BTCUSDT", "BTC", "USDT", spot=False),
+        market("ETH/USDT", "ETHUSDT", "ETH", "USDT")
+    ]))
+    registry.register_exchange("kraken", dict([
+        market("BTC/USDT", "XBTUSDT", "BTC", "USDT"),
+        market("BTC/USD", "XXBTZUSD", "BTC", "USD")
+    ]))
+    
+    assert registry.canonical("bybit", "BTCUSDT") == "BTC/USD"
+    assert registry.native("coinbase", "BTC/USD") == "BTC/USD"
+    assert registry.native("bybit", "BTC/USD") == "BTC/USDT"
+    assert registry.native("kraken", "BTC/USD") == "BTC/USD"  # Exact quote wins over an alias
+    assert registry.common_pairs() == ["BTC/USD"]
+    assert sorted(registry.exchanges_for("BTC/USD")) == ["bybit", "coinbase", "kraken"]
+    
+    strict = SymbolRegistry(quote_aliases={})
+    strict.register_exchange("bybit", dict([market("BTC/USDT", "BTCUSDT", "BTC", "USDT")]))
+    assert strict.native("bybit", "BTC/USD") is None
+
+def test_price_matrix_matches_pairwise_scan():
+    import numpy as np
+    from market.price_matrix import PriceMatrix
+    
+    rng = np.random.default_rng(7)
+    exchanges = ["binance", "kraken", "coinbase", "bybit"]
+    fees = np.array([0.001, 0.0026, 0.005, 0.001])
+    pairs = [f"P{k}/USD" for k in range(200)]
+    all_tickers = {}
+    for exchange in exchanges:
+        tickers = {}
+        for pair in pairs:
+            if rng.random() < 0.2:
+                continue  # Not listed here
+            mid = 100 * (1 + rng.normal(0, 0.01))
+            tickers[pair] = {"bid": mid * 0.9995, "ask": mid * 1.0005, "quoteVolume": 1000.0}
+        all_tickers[exchange] = tickers
+    
+    matrix = PriceMatrix.from_tickers(all_tickers, pairs, fees=fees)
+    found = {(o["pair"], o["buy_exchange"], o["sell_exchange"]): o["net_profit_percent"]
+             for o in matrix.opportunities(0.5)}
+    
+    expected = {}
+    for pair in pairs:
+        for i, buy in enumerate(exchanges):
+            for j, sell in enumerate(exchanges):
+                a, b = all_tickers[buy].get(pair), all_tickers[sell].get(pair)
+                if i != j and a and b:
+                    net = (b["bid"] / a["ask"] - 1 - fees[i] - fees[j]) * 100
+                    if net >= 0.5:
+                        expected[(pair, buy, sell)] = net
+    
+    assert expected and found.keys() == expected.keys()
+    assert all(abs(found[k] - expected[k]) < 1e-9 for k in expected)
+    profits = [o["net_profit_percent"] for o in matrix.opportunities(0.5)]
+    assert profits == sorted(profits, reverse=True)
+    
+    # max_volume keeps the 10%-of-volume cap; sizes are only known where tickers carry them
+    assert all(o["max_volume"] == 100.0 and o["top_of_book_volume"] is None for o in matrix.opportunities(0.5))
+    pair, buy, sell = next(iter(expected))
+    all_tickers[buy][pair].update(askVolume=0.4)
+    all_tickers[sell][pair].update(bidVolume=2.0)
+    for exchange in (buy, sell):
+        matrix.update(exchange, all_tickers[exchange])
+    sized = [o for o in matrix.opportunities(0.5) if (o["pair"], o["buy_exchange"], o["sell_exchange"]) == (pair, buy, sell)]
+    assert sized[0]["top_of_book_volume"] == 0.4
+    
+    # Re-quoting one exchange reports only the rows that moved
+    all_tickers["kraken"]["P3/USD"] = {"bid": 150.0, "ask": 150.1, "quoteVolume": 1.0}
+    changed = matrix.update("kraken", all_tickers["kraken"])
+    assert [pairs[r] for r in changed] == ["P3/USD"]
+    assert {o["sell_exchange"] for o in matrix.opportunities(0.5, rows=changed)} == {"kraken"}
+
+def test_cycle_detector_finds_triangles_and_cross_exchange_loops():
+    from trading.cycle_detector import CycleDetector, find_negative_cycles
+    import numpy as np
+    
+    # Plain Bellman-Ford check: 0 -> 1 -> 2 -> 0 is the only negative loop
+    src, dst = np.array([0, 1, 2, 2, 3]), np.array([1, 2, 0, 3, 0])
+    weight = np.array([-1.0, 0.5, 0.2, 1.0, 1.0])
+    assert [sorted(c) for c in find_negative_cycles(4, src, dst, weight)] == [[0, 1, 2]]
+    assert find_negative_cycles(4, src, dst, weight + 1) == []
+    
+    detector = CycleDetector()
+    detector.cross_exchange = False
+    fair = {"binance": {
+        "BTC/USDT": {"bid": 59990.0, "ask": 60000.0},
+        "ETH/BTC": {"bid": 0.04999, "ask": 0.05},
+        "ETH/USDT": {"bid": 2999.0, "ask": 3000.0}
+    }}
+    assert detector.find_cycles(fair) == []
+    
+    # ETH too rich in USDT: USDT -> BTC -> ETH -> USDT pays ~3% before fees
+    rich = {"binance": dict(fair["binance"], **{"ETH/USDT": {"bid": 3100.0, "ask": 3101.0}})}
+    cycles = detector.find_cycles(rich, min_profit_percent=0.5)
+    assert len(cycles) == 1
+    assert {(leg["symbol"], leg["side"]) for leg in cycles[0]["legs"]} == {
+        ("BTC/USDT", "buy"), ("ETH/BTC", "buy"), ("ETH/USDT", "sell")
+    }
+    growth = (1 / 60000.0) * (1 / 0.05) * 3100.0 * (1 - 0.001) ** 3
+    assert abs(cycles[0]["profit_percent"] - (growth - 1) * 100) < 1e-9
+    
+    # Same market priced apart on two exchanges, joined by transfer edges
+    detector.cross_exchange = True
+    split = {
+        "binance": {"SOL/USDT": {"bid": 99.9, "ask": 100.0}},
+        "kraken": {"SOL/USDT": {"bid": 102.0, "ask": 102.1}}
+    }
+    cycles = detector.find_cycles(split, min_profit_percent=0.5)
+    assert cycles and cycles[0]["exchanges"] == ["binance", "kraken"]
+    assert {(leg["exchange"], leg["side"]) for leg in cycles[0]["legs"] if leg["side"] != "transfer"} == {
+        ("binance", "buy"), ("kraken", "sell")
+    }
+
+def test_arbitrage_execution_submits_legs_together_and_unwinds(monkeypatch, fake_exchange):
+    import uuid
+    from core.database import db
+    from market.multi_exchange_fetcher import multi_fetcher
+    from trading.arbitrage_bot import arbitrage_bot
+    from trading.risk_manager import risk_manager
+    
+    pair = f"TEST:{uuid.uuid4().hex[:8]}/USDT"
+    opportunity = {"pair": pair, "buy_exchange": "fake_a", "sell_exchange": "fake_b", "max_volume": 100.0}
+    monkeypatch.setattr(risk_manager, "adjust_position_size", lambda symbol, amount: amount)
+    monkeypatch.setattr(arbitrage_bot, "leg_timeout", 0.2)
+    
+    hang = {"create_market_order": 1.0}  # Order replies outlive the leg timeout
+    
+    def run(buyer, seller):
+        monkeypatch.setattr(multi_fetcher, "exchanges", {"fake_a": buyer, "fake_b": seller})
+        return asyncio.run(arbitrage_bot.execute_opportunity(opportunity, amount=1.0))
+    
+    try:
+        # Both legs fill; sells 1% above the buy clear fees and the threshold
+        buyer, seller = fake_exchange(bid=99.9, ask=100.0), fake_exchange(bid=101.0, ask=101.1)
+        success, _ = run(buyer, seller)
+        assert success and buyer.orders == [("buy", 1.0)] and seller.orders == [("sell", 1.0)]
+        
+        # Books no longer cross - nothing is submitted
+        buyer, seller = fake_exchange(bid=99.9, ask=100.0), fake_exchange(bid=100.0, ask=100.1)
+        success, message = run(buyer, seller)
+        assert not success and "Profit too low" in message and not buyer.orders and not seller.orders
+        
+        # Sell leg rejected: the bought leg is sold back where it was bought
+        buyer, seller = fake_exchange(bid=99.9, ask=100.0), fake_exchange(bid=101.0, ask=101.1, fail="sell")
+        success, message = run(buyer, seller)
+        assert not success and "unwound" in message
+        assert buyer.orders == [("buy", 1.0), ("sell", 1.0)]
+        
+        # Sell leg hangs past the timeout but the exchange shows it filled: hedged, nothing to unwind
+        buyer, seller = fake_exchange(bid=99.9, ask=100.0), fake_exchange(bid=101.0, ask=101.1, delay=hang)
+        success, _ = run(buyer, seller)
+        assert success and buyer.orders == [("buy", 1.0)]
+        
+        # Hangs and can't be looked up: the buy is left alone rather than unwound blind
+        buyer, seller = fake_exchange(bid=99.9, ask=100.0), fake_exchange(bid=101.0, ask=101.1, delay=hang, lookup=False)
+        success, message = run(buyer, seller)
+        assert not success and "state unknown" in message and buyer.orders == [("buy", 1.0)]
+        
+        # Hangs and the exchange shows it cancelled unfilled: the buy is unwound
+        buyer, seller = fake_exchange(bid=99.9, ask=100.0), fake_exchange(bid=101.0, ask=101.1, delay=hang, status="canceled")
+        success, message = run(buyer, seller)
+        assert not success and "unwound" in message and buyer.orders == [("buy", 1.0), ("sell", 1.0)]
+        
+        rows = db.fetch_all(
+            "SELECT status, validate_ms, total_ms FROM arbitrage_executions WHERE pair = ? ORDER BY id", (pair,)
+        )
+        assert [row[0] for row in rows] == ["filled", "stale", "unwound", "filled", "unknown", "unwound"]
+        assert all(total >= validate >= 0 for _, validate, total in rows)
+    finally:
+        db.execute_query("DELETE FROM arbitrage_executions WHERE pair = ?", (pair,))
+        db.execute_query("DELETE FROM arbitrage_trades WHERE pair = ?", (pair,))
+
+def test_depth_sizing_maximizes_profit_after_fees():
+    import numpy as np
+    from market.order_book import best_fill, fill_curve
+    
+    asks = [[100.0, 1.0], [100.5, 2.0], [101.5, 5.0]]
+    bids = [[102.0, 0.5], [101.8, 1.5], [101.0, 4.0, 3]]  # Extra ccxt fields are ignored
+    fee = 0.001
+    
+    # Brute force: profit on a fine size grid, same book walk done level by level
+    def walk(levels, size):
+        total, left = 0.0, size
+        for price, amount, *_ in levels:
+            take = min(left, amount)
+            total, left = total + take * price, left - take
+        return total
+    
+    grid = np.linspace(0.001, 7.0, 7000)
+    profit = [walk(bids, x) * (1 - fee) - walk(asks, x) * (1 + fee) for x in grid]
+    fill = best_fill(asks, bids, fee, fee)
+    assert fill["amount"] == 3.0  # Where the ask steps to 101.5, above the 101.0 bid after fees
+    assert fill["profit"] >= max(profit) - 1e-9
+    assert abs(fill["buy_vwap"] - (100.0 + 2 * 100.5) / 3) < 1e-12
+    
+    # Average margin gate and caps both shrink the fill
+    assert best_fill(asks, bids, fee, fee, min_profit_percent=1.5)["amount"] == 1.0
+    assert best_fill(asks, bids, fee, fee, max_amount=0.75)["amount"] == 0.75
+    assert abs(best_fill(asks, bids, fee, fee, max_cost=50.0)["amount"] - 0.5) < 1e-12
+    assert best_fill(asks, [[99.0, 1.0]], fee, fee) is None
+    
+    curve = fill_curve(asks, bids, fee, fee)
+    assert np.all(np.diff(curve["net_profit_percent"]) <= 1e-12)  # Margin only falls with size
+
+def test_arbitrage_monitor_reevaluates_moved_pairs_and_paces_polls():
+    from trading.arbitrage_monitor import ArbitrageMonitor, _PollSchedule
+    
+    monitor = ArbitrageMonitor()
+    pairs = [f"P{k}/USD" for k in range(50)]
+    monitor.reset(pairs, ["binance", "kraken"], 0.5, native=lambda exchange, pair: pair)
+    fired = []
+    monitor.add_listener(fired.extend)
+    
+    def quotes(mids):
+        return {pair: {"bid": mid * 0.9999, "ask": mid * 1.0001} for pair, mid in mids.items()}
+    
+    flat = {pair: 100.0 for pair in pairs}
+    assert monitor.apply("binance", quotes(flat), now=0.0) == []
+    assert monitor.apply("kraken", quotes(flat), now=0.0) == []
+    
+    # One pair re-prices on kraken: only that row is evaluated and reported
+    fresh = monitor.apply("kraken", quotes(dict(flat, **{"P3/USD": 102.0})), now=1.0)
+    assert [(o["pair"], o["buy_exchange"], o["sell_exchange"]) for o in fresh] == [("P3/USD", "binance", "kraken")]
+    assert fired == fresh and monitor.current() == fresh
+    
+    # It closes again on the next update and leaves the live set
+    assert monitor.apply("kraken", quotes(flat), now=2.0) == []
+    assert monitor.current() == []
+    
+    # Quiet binance drifts to the slowest poll, moving kraken polls faster
+    for t in range(3, 10):
+        monitor.apply("binance", quotes(flat), now=float(t))
+        monitor.apply("kraken", quotes({p: 100.0 * (1 + 0.001 * (t % 2)) for p in pairs}), now=float(t))
+    assert monitor.schedules["binance"].interval == monitor.max_interval
+    assert monitor.schedules["kraken"].interval < 1.0
+    
+    # Token bucket: a burst of two, then wait for the 1 request/second refill
+    schedule = _PollSchedule(0.1, 10.0, 0.0005, requests_per_minute=60, burst=2)
+    schedule.spend(0.0)
+    schedule.spend(0.0)
+    assert abs(schedule.delay(0.0) - 1.0) < 1e-9
+    assert abs(schedule.delay(0.5) - 0.5) < 1e-9
+
+def test_tick_recording_replays_through_arbitrage_pipeline(tmp_path):
+    import gzip
+    import os
+    from market.tick_recorder import TickRecorder, read_recording
+    from trading.arbitrage_replay import ArbitrageReplay
+    
+    recorder = TickRecorder(path=str(tmp_path))
+    pairs = [f"P{k}/USD" for k in range(20)]
+    hour = 1_700_000_000_000 - 1_700_000_000_000 % 3_600_000
+    
+    def quotes(mids):
+        return {pair: {"bid": mid * 0.9999, "ask": mid * 1.0001, "quoteVolume": 1e6} for pair, mid in mids.items()}
+    
+    # Two minutes either side of an hour boundary, one snapshot per exchange per second
+    for second in range(-120, 120):
+        t = hour + second * 1000
+        kraken = {pair: 100.0 for pair in pairs}
+        if 30 <= second < 35:
+            kraken["P7/USD"] = 101.5  # Five seconds of a 1.5% gap
+        recorder.record_tickers("binance", quotes({pair: 100.0 for pair in pairs}), t)
+        recorder.record_tickers("kraken", quotes(kraken), t + 1)
+        if second == 0:
+            recorder.record_book("binance", "P7/USD", {"bids": [[99.99, 1.0]], "asks": [[100.01, 0.4], [100.2, 5.0]]}, t)
+            recorder.record_book("kraken", "P7/USD", {"bids": [[101.48, 2.0]], "asks": [[101.52, 1.0]]}, t + 1)
+        if second % 60 == 0:
+            recorder.flush()  # Appends a new gzip member
+    recorder.flush()
+    
+    files = sorted(os.listdir(tmp_path / "kraken"))
+    assert len(files) == 2 and all(name.endswith(".jsonl.gz") for name in files)
+    with gzip.open(tmp_path / "kraken" / files[0], "rt") as f:
+        assert sum(1 for _ in f) == 120
+    
+    times = [t for t, *_ in read_recording(str(tmp_path))]
+    assert times == sorted(times) and len(times) == 482
+    assert all(t >= hour for t, *_ in read_recording(str(tmp_path), start_ms=hour))
+    
+    report = asyncio.run(ArbitrageReplay(str(tmp_path), min_profit_percent=0.5).run())
+    assert report["pairs"] == 20 and report["ticker_updates"] == 480
+    assert report["speedup"] > 1
+    
+    # The gap is reported once when it opens; books size it to the deeper ask level
+    opportunities = report["opportunities"]
+    assert [(o["pair"], o["buy_exchange"], o["sell_exchange"]) for o in opportunities] == [("P7/USD", "binance", "kraken")]
+    assert opportunities[0]["max_volume"] == 2.0
+
+def test_replay_resolves_recorded_symbols_through_quote_aliases(tmp_path):
+    from market.tick_recorder import TickRecorder
+    from trading.arbitrage_replay import ArbitrageReplay
+    
+    recorder = TickRecorder(path=str(tmp_path))
+    t = 1_700_000_000_000
+    # Same coin quoted in USDT on one exchange and USD on the other
+    recorder.record_tickers("binance", {"X/USDT": {"bid": 99.99, "ask": 100.01}, "X/USDT:USDT": {"bid": 90.0, "ask": 90.1}}, t)
+    recorder.record_book("binance", "X/USDT", {"bids": [[99.99, 1.0]], "asks": [[100.01, 0.3]]}, t)
+    recorder.record_book("kraken", "X/USD", {"bids": [[101.5, 1.0]], "asks": [[101.6, 1.0]]}, t + 1)
+    recorder.record_tickers("kraken", {"X/USD": {"bid": 101.5, "ask": 101.6}}, t + 2)
+    recorder.flush()
+    
+    report = asyncio.run(ArbitrageReplay(str(tmp_path), min_profit_percent=0.5).run())
+    assert report["pairs"] == 1
+    opportunities = report["opportunities"]
+    assert [(o["pair"], o["buy_exchange"], o["sell_exchange"]) for o in opportunities] == [("X/USD", "binance", "kraken")]
+    assert opportunities[0]["max_volume"] == 0.3  # Sized on the native-symbol books
+
+def test_recorder_gathers_books_within_rate_budget(tmp_path, monkeypatch, fake_exchange, fake_fetcher):
+    import market.multi_exchange_fetcher as multi_exchange_fetcher
+    import market.symbol_registry as symbol_registry
+    from market.symbol_registry import SymbolRegistry
+    from market.tick_recorder import TickRecorder, read_recording
+    
+    pairs = [f"P{k}/USDT" for k in range(6)]
+    
+    def stop_after_two_cycles(exchange, method, args):
+        if method == "fetch_tickers" and len(exchange.called("fetch_tickers")) == 2:
+            recorder.stop()
+    
+    exchange = fake_exchange(
+        "testex",
+        markets={pair: {"base": pair.split("/")[0], "quote": "USDT", "active": True, "spot": True} for pair in pairs},
+        tickers={pair: {"bid": 1.0, "ask": 1.01} for pair in pairs},
+        delay={"fetch_order_book": 0.02},
+        on_call=stop_after_two_cycles
+    )
+    monkeypatch.setattr(multi_exchange_fetcher, "multi_fetcher", fake_fetcher({"testex": exchange}))
+    monkeypatch.setattr(symbol_registry, "symbol_registry", SymbolRegistry())
+    recorder = TickRecorder(path=str(tmp_path))
+    recorder.interval = 0.1
+    recorder.rate_budget = 100  # 100 x the default 60/min: refills past the burst every cycle
+    recorder.burst = 4
+    asyncio.run(recorder.run([pair.replace("USDT", "USD") for pair in pairs]))  # Canonical pairs
+    
+    # Each cycle spends one token on tickers and three on books fetched together,
+    # rotating so two cycles cover all six pairs
+    methods = [method for method, _ in exchange.calls]
+    assert methods == (["fetch_tickers"] + ["fetch_order_book"] * 3) * 2
+    assert exchange.peak == 3
+    assert sorted(symbol for symbol, _ in exchange.called("fetch_order_book")) == pairs
+    assert sum(1 for *_, kind, _ in read_recording(str(tmp_path)) if kind == "book") == 6
+
+def test_pair_selector_evaluates_pairs_concurrently(monkeypatch, fake_exchange, fake_fetcher):
+    import time
+    from market.pair_selector import PairSelector
+    
+    delay = 0.05
+    pairs = ["BTC/USDT", "ETH/USDT", "SOL/USDT", "XRP/USDT", "DOT/USDT", "ADA/USDT"]
+    
+    def venue(name):
+        # SOL on kraken swings hardest and should score best
+        def candles(pair):
+            swing = 0.1 if (name, pair) == ("kraken", "SOL/USDT") else 0.03
+            return [[k, c, c, c, c, 1e5] for k, c in enumerate(100.0 * (1 + swing * (k % 2)) for k in range(30))]
+        
+        return fake_exchange(
+            name, markets={pair: {"active": True} for pair in pairs},
+            tickers={pair: {"bid": 100.0, "ask": 100.05, "last": 100.0, "high": 110.0, "low": 100.0,
+                            "quoteVolume": 5e6} for pair in pairs},
+            candles={pair: candles(pair) for pair in pairs},
+            bid=100.0, ask=100.05, size=1000.0, delay=delay
+        )
+    
+    monkeypatch.setattr(PairSelector, "ml_trainer", None)
+    selector = PairSelector()
+    selector._initialized = True
+    selector.concurrency = 2
+    selector.exchanges = {"binance": venue("binance"), "kraken": venue("kraken")}
+    selector.fetcher = fake_fetcher(selector.exchanges)
+    
+    async def stream():
+        candidates = [(ex_name, pair) for ex_name in selector.exchanges for pair in pairs]
+        return [result async for result in selector.evaluate_pairs(candidates, "1h", 30)]
+    
+    started = time.perf_counter()
+    results = asyncio.run(stream())
+    elapsed = time.perf_counter() - started
+    
+    # Serially that is 36 round trips; two evaluations per exchange at once, each
+    # with its three calls in parallel, takes three rounds
+    assert len(results) == 12 and all(score > 0 for _, _, score in results)
+    assert elapsed < 12 * delay
+    assert {name: exchange.peak for name, exchange in selector.exchanges.items()} == {"binance": 6, "kraken": 6}
+    
+    assert asyncio.run(selector.select_best_pair("1h", 30)) == "kraken:SOL/USDT"
+
+def test_pair_screener_shortlists_universe_from_one_snapshot(monkeypatch, fake_exchange, fake_fetcher):
+    from market.pair_screener import screen_tickers
+    from market.pair_selector import PairSelector
+    
+    def ticker(volume, spread, day_range, last=100.0):
+        return {"bid": last, "ask": last * (1 + spread), "last": last, "high": last * (1 + day_range),
+                "low": last, "quoteVolume": volume}
+    
+    tickers = {f"C{k}/USDT": ticker(2e6 + k * 1e5, 0.0005, 0.05) for k in range(200)}
+    tickers.update({
+        "THIN/USDT": ticker(5e5, 0.0005, 0.05),        # Volume floor
+        "WIDE/USDT": ticker(5e7, 0.01, 0.05),          # Spread ceiling
+        "FLAT/USDT": ticker(5e7, 0.0005, 0.001),       # Volatility floor
+        "GAP/USDT": {"bid": None, "ask": 101.0, "last": 100.0, "quoteVolume": 5e7},
+        "BASE/USDT": dict(ticker(None, 0.0005, 0.05), baseVolume=1e9),  # Base volume only
+        "OFF/USDT": ticker(5e7, 0.0005, 0.05),
+        "C1/BTC": ticker(5e7, 0.0005, 0.05),
+        "C1/USDT:USDT": ticker(5e7, 0.0005, 0.05)
+    })
+    markets = {symbol: {"active": symbol != "OFF/USDT"} for symbol in tickers}
+    
+    screened = screen_tickers(tickers, min_volume=1e6, max_spread=0.001, min_volatility=0.02, markets=markets, limit=3)
+    assert [row["symbol"] for row in screened] == ["BASE/USDT", "C199/USDT", "C198/USDT"]
+    assert abs(screened[0]["volume"] - 1e11) < 1 and abs(screened[1]["volatility"] - 0.05) < 1e-12
+    assert len(screen_tickers(tickers, 1e6, 0.001, 0.02, markets=markets)) == 201
+    
+    candles = {symbol: [[k, 0, 0, 0, 100.0 * (1 + (0.1 if symbol == "C150/USDT" else 0.03) * (k % 2)), 1e5]
+                        for k in range(30)] for symbol in tickers}
+    exchange = fake_exchange("binance", markets=markets, tickers=tickers, candles=candles,
+                             bid=100.0, ask=100.05, size=1000.0)
+    
+    monkeypatch.setattr(PairSelector, "ml_trainer", None)
+    selector = PairSelector()
+    selector._initialized = True
+    selector.shortlist_size = 60
+    selector.exchanges = {"binance": exchange}
+    selector.fetcher = fake_fetcher(selector.exchanges)
+    
+    # One snapshot covers the universe; only the shortlist gets books, and no single tickers are fetched
+    assert asyncio.run(selector.select_best_pair("1h", 30)) == "binance:C150/USDT"
+    books = [symbol for symbol, _ in exchange.called("fetch_order_book")]
+    assert len(exchange.called("fetch_tickers")) == 1 and not exchange.called("fetch_ticker")
+    assert len(books) == 60 and "THIN/USDT" not in books
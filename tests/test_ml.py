@@ -0,0 +1,269 @@
+# tests/test_ml.py
+import numpy as np
+from ml.cross_validation import PurgedWalkForwardCV
+
+def test_walk_forward_splits_are_purged():
+    cv = PurgedWalkForwardCV(n_splits=4, purge=1, embargo=5, min_train_size=10)
+    splits = list(cv.split(500))
+    
+    assert len(splits) == 4
+    for train, test in splits:
+        # Training always ends before the test block, separated by the gap
+        assert train.max() + 1 + 6 <= test.min()
+    
+    # Last fold runs to the end of the data
+    assert splits[-1][1].max() == 499
+
+def test_walk_forward_skips_short_folds():
+    cv = PurgedWalkForwardCV(n_splits=5, purge=1, embargo=50, min_train_size=100)
+    assert all(len(train) >= 100 for train, _ in cv.split(600))
+    assert list(PurgedWalkForwardCV(n_splits=5).split(3)) == []
+
+def test_replay_buffer_wraps_and_samples_arrays():
+    from ml.replay_buffer import ReplayBuffer
+    
+    buffer = ReplayBuffer(capacity=5, state_size=3, seed=0)
+    for i in range(7):
+        buffer.add(np.full(3, i), i % 3, float(i), np.full(3, i + 1), i == 6)
+    
+    assert len(buffer) == 5
+    # Oldest two transitions were overwritten
+    assert sorted(buffer.rewards.tolist()) == [2.0, 3.0, 4.0, 5.0, 6.0]
+    
+    states, actions, rewards, next_states, dones = buffer.sample(8)
+    assert states.shape == (8, 3) and next_states.shape == (8, 3)
+    assert np.all(states[:, 0] == rewards)
+
+def test_vector_env_rewards_match_candles():
+    from ml.trading_env import VectorTradingEnv
+    
+    closes = np.linspace(100, 110, 50)
+    opens = closes - 1
+    states = np.arange(50, dtype=np.float32).reshape(-1, 1)
+    env = VectorTradingEnv([(states, opens, closes)], n_envs=4, episode_length=10, fee_rate=0.0, seed=1)
+    
+    observations = env.reset()
+    cursor = observations[:, 0].astype(int)
+    _, rewards, dones, next_states = env.step(np.zeros(4, dtype=int))
+    
+    assert np.allclose(rewards, (closes[cursor] - opens[cursor]) / opens[cursor])
+    assert np.all(next_states[:, 0] == cursor + 1)
+    assert not dones.any()
+
+def test_prioritized_replay_follows_priorities():
+    from ml.replay_buffer import PrioritizedReplayBuffer
+    
+    buffer = PrioritizedReplayBuffer(capacity=6, state_size=2, alpha=1.0, beta=1.0, seed=0)
+    buffer.add_batch(np.zeros((6, 2)), np.zeros(6), np.arange(6.0), np.zeros((6, 2)), np.zeros(6))
+    assert np.isclose(buffer.tree.total, 6.0)
+    
+    # Only transition 4 keeps a meaningful TD error
+    buffer.update_priorities(np.arange(6), np.array([0, 0, 0, 0, 5.0, 0]))
+    *_, weights, idx = buffer.sample(32)
+    
+    assert np.all(idx == 4)
+    assert np.allclose(weights, 1.0)
+
+def test_numpy_policy_matches_keras_model(tmp_path):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Dropout
+    from ml.policy_inference import PolicyInference, export_policy
+    
+    model = Sequential([
+        Dense(16, input_dim=8, activation="relu"),
+        Dropout(0.2),
+        Dense(3, activation="linear")
+    ])
+    path = str(tmp_path / "policy.npz")
+    export_policy(model, path)
+    
+    policy = PolicyInference(path)
+    states = np.random.default_rng(0).normal(size=(5, 8)).astype(np.float32)
+    
+    assert policy.refresh()
+    assert np.allclose(policy.q_values(states), model(states, training=False).numpy(), atol=1e-5)
+    
+    action, q_values = policy.act(states[0])
+    assert action == int(np.argmax(model(states[:1], training=False).numpy()))
+    assert q_values.shape == (3,)
+
+def test_rl_checkpoint_round_trip(tmp_path, monkeypatch):
+    from config.settings import settings
+    from ml.rl_checkpoint import CheckpointWriter, snapshot
+    from ml.rl_trainer import RLTrainer
+    
+    monkeypatch.setitem(settings.RL, "model_path", str(tmp_path / "rl_model.h5"))
+    monkeypatch.setitem(settings.RL, "memory_size", 100)
+    monkeypatch.setitem(settings.RL, "checkpoint", {"path": str(tmp_path / "ckpt.npz")})
+    
+    trainer = RLTrainer()
+    rng = np.random.default_rng(0)
+    for _ in range(3):
+        trainer.memory.add_batch(rng.normal(size=(50, 8)), rng.integers(0, 3, 50),
+                                 rng.normal(size=50), rng.normal(size=(50, 8)), np.zeros(50))
+        trainer.replay()
+    
+    trainer.checkpoints.save(snapshot(trainer, episode=3))
+    # A later save without the buffer is written with the one already copied
+    trainer.checkpoints.save(snapshot(trainer, episode=4, memory=False))
+    trainer.checkpoints.flush()
+    
+    resumed = RLTrainer()
+    assert resumed.resume_from_checkpoint() == 5
+    assert resumed.epsilon == trainer.epsilon
+    assert all(np.array_equal(a, b) for a, b in zip(resumed.model.get_weights(), trainer.model.get_weights()))
+    assert all(np.array_equal(a.numpy(), b.numpy())
+               for a, b in zip(resumed.model.optimizer.variables, trainer.model.optimizer.variables))
+    # Wrapped ring buffer comes back oldest-first with the same contents
+    assert len(resumed.memory) == 100
+    oldest_first = [memory.gather(memory._chronological())[2] for memory in (resumed.memory, trainer.memory)]
+    assert np.array_equal(*oldest_first)
+    
+    trainer.checkpoints.clear()
+    assert not CheckpointWriter(str(tmp_path / "ckpt.npz")).exists()
+
+def _candles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return [[1_600_000_000_000 + k * 3_600_000, c, c * 1.01, c * 0.99, c, 1000.0] for k, c in enumerate(close)]
+
+def test_scalers_only_see_training_rows(tmp_path, monkeypatch):
+    import asyncio
+    import ml.cross_validation as cross_validation
+    from config.settings import settings
+    from ml.trainer import MLTrainer
+    
+    monkeypatch.setitem(settings.ML, "model_path", str(tmp_path / "model.pkl"))
+    monkeypatch.setitem(settings.ML, "cross_validation", {"enabled": False, "purge": 1, "embargo": 50})
+    
+    trainer = MLTrainer()
+    candles = _candles(400)
+    asyncio.run(trainer.train(candles))
+    
+    # Final scaler: fitted on the purged training window, not the test split
+    X, _ = trainer.prepare_data(candles)
+    train_end = int(len(X) * 0.8) - 51
+    assert np.allclose(trainer.scaler.mean_, X[:train_end].mean(axis=0))
+    
+    # Walk-forward folds: one scaler per fold, fitted on that fold's training rows
+    fitted = []
+    
+    class SpyScaler(cross_validation.StandardScaler):
+        def fit(self, X, y=None):
+            fitted.append(len(X))
+            return super().fit(X, y)
+    
+    monkeypatch.setattr(cross_validation, "StandardScaler", SpyScaler)
+    validator = cross_validation.WalkForwardValidator({"n_splits": 3, "purge": 1, "embargo": 5, "min_train_size": 50})
+    X, y = trainer.prepare_data(candles)
+    validator.evaluate({"n_estimators": 5, "max_depth": 2}, X, y)
+    assert fitted == [len(train) for train, _ in validator.cv.split(len(X))]
+
+def _sine_candles(start, end):
+    # Hourly candles on a 20-hour cycle - direction is learnable from the indicators
+    closes = 100 + 10 * np.sin(2 * np.pi * np.arange(start, end) / 20)
+    return [[1_600_000_000_000 + k * 3_600_000, c, c * 1.001, c * 0.999, c, 1000.0]
+            for k, c in zip(range(start, end), closes)]
+
+def test_incremental_update_gates_on_holdout_and_watermark(tmp_path, monkeypatch):
+    import asyncio
+    import xgboost as xgb
+    from config.settings import settings
+    from ml.trainer import MLTrainer
+    
+    monkeypatch.setitem(settings.ML, "model_path", str(tmp_path / "model.pkl"))
+    monkeypatch.setitem(settings.ML, "cross_validation", {"enabled": False, "purge": 1, "embargo": 50})
+    monkeypatch.setitem(settings.ML, "xgboost", {"n_estimators": 3, "max_depth": 2, "learning_rate": 0.1})
+    monkeypatch.setitem(settings.ML, "incremental", {
+        "min_new_candles": 24, "holdout_candles": 48, "boost_rounds": 20, "max_logloss_increase": 0.0
+    })
+    
+    trainer = MLTrainer()
+    asyncio.run(trainer.train(_sine_candles(0, 400)))
+    watermark = trainer.last_trained_timestamp
+    assert watermark == _sine_candles(398, 399)[0][0]
+    
+    fitted = []
+    fit = xgb.XGBClassifier.fit
+    
+    def spy_fit(self, X, y, **kwargs):
+        if kwargs.get("xgb_model") is not None:
+            fitted.append(len(X))
+        return fit(self, X, y, **kwargs)
+    
+    monkeypatch.setattr(xgb.XGBClassifier, "fit", spy_fit)
+    probe = trainer.scaler.transform(trainer.prepare_data(_sine_candles(0, 400))[0][-50:])
+    before = trainer.model.predict_proba(probe)
+    
+    # (a) Boosting on inverted labels makes the holdout worse: rejected, live model untouched
+    build_frame = trainer._build_frame
+    
+    def inverted(data):
+        df = build_frame(data).copy()
+        df.iloc[:-48, df.columns.get_loc("target")] = 1 - df["target"].iloc[:-48]
+        return df
+    
+    monkeypatch.setattr(trainer, "_build_frame", inverted)
+    assert asyncio.run(trainer.update(_sine_candles(200, 600))) is False
+    assert trainer.model.get_booster().num_boosted_rounds() == 3
+    assert np.array_equal(trainer.model.predict_proba(probe), before)
+    assert trainer.last_trained_timestamp == watermark
+    assert MLTrainer().model.get_booster().num_boosted_rounds() == 3
+    
+    # (b) The honest update improves the holdout and is promoted
+    monkeypatch.setattr(trainer, "_build_frame", build_frame)
+    assert asyncio.run(trainer.update(_sine_candles(200, 600))) is True
+    assert trainer.model.get_booster().num_boosted_rounds() == 23
+    
+    # (c) Only candles past the watermark were boosted on: 399..598 labelled, the last 48
+    # held out and one purged, so 151 rows ending at candle 549 - the new watermark
+    assert fitted == [151, 151]
+    assert trainer.last_trained_timestamp == _sine_candles(549, 550)[0][0]
+    
+    # Too few candles left past the new watermark - skipped
+    assert asyncio.run(trainer.update(_sine_candles(200, 600))) is False
+
+def test_compiled_dqn_step_matches_eager_update(tmp_path, monkeypatch):
+    import tensorflow as tf
+    from tensorflow.keras.layers import Dense
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.optimizers import Adam
+    from config.settings import settings
+    from ml.rl_trainer import RLTrainer
+    from scripts.benchmark_dqn_step import eager_replay_step
+    
+    monkeypatch.setitem(settings.RL, "model_path", str(tmp_path / "rl_model.h5"))
+    monkeypatch.setitem(settings.RL, "memory_size", 100)
+    trainer = RLTrainer()
+    
+    def network():
+        # Dropout-free, so both paths see the same forward pass
+        model = Sequential([Dense(16, input_dim=trainer.state_size, activation="relu"),
+                            Dense(trainer.action_size, activation="linear")])
+        model.compile(loss="mse", optimizer=Adam(learning_rate=trainer.learning_rate))
+        return model
+    
+    tf.random.set_seed(0)
+    compiled, eager, target = network(), network(), network()
+    eager.set_weights(compiled.get_weights())
+    initial = compiled.get_weights()
+    trainer.model, trainer.target_model = compiled, target
+    trainer._train_step = trainer._build_train_step()
+    
+    rng = np.random.default_rng(0)
+    n = 32
+    states = rng.normal(size=(n, trainer.state_size)).astype(np.float32)
+    next_states = rng.normal(size=(n, trainer.state_size)).astype(np.float32)
+    actions = rng.integers(0, trainer.action_size, n)
+    rewards = rng.normal(size=n).astype(np.float32)
+    dones = (np.arange(n) % 4 == 0).astype(np.float32)
+    
+    q_before = compiled(states, training=False).numpy()[np.arange(n), actions]
+    td_errors = trainer._train_step(states, actions, rewards, next_states, dones, np.ones(n, dtype=np.float32)).numpy()
+    expected_q, expected_loss = eager_replay_step(eager, target, states, actions, rewards, next_states, dones, trainer.gamma)
+    
+    # Same Bellman targets, same loss, and the same optimizer step
+    assert np.allclose(td_errors + q_before, expected_q[np.arange(n), actions], atol=1e-5)
+    assert np.isclose(np.mean(td_errors ** 2) / trainer.action_size, expected_loss, rtol=1e-4)
+    assert all(np.allclose(a, b, atol=1e-6) for a, b in zip(compiled.get_weights(), eager.get_weights()))
+    assert not np.allclose(compiled.get_weights()[0], initial[0], atol=1e-6)
@@ -23,3 +23,336 @@ async def test_pair_selection():
         assert pair in ["BTC/USDT", "ETH/USDT", "BNB/USDT"]
     except Exception as e:
         print(f"Pair selection test failed: {e}")
+
+def test_risk_state_tracks_writes_incrementally():
+    import uuid
+    from core.database import db
+    from trading.risk_state import RiskState
+    
+    state = RiskState()
+    pnl, gross = state.daily_pnl, state.gross_exposure
+    symbol = f"TEST:{uuid.uuid4().hex[:8]}/USDT"
+    ids = [str(uuid.uuid4()) for _ in range(3)]
+    
+    try:
+        db.record_trade(ids[0], symbol, "buy", 2.0, 100.0, 0.2)
+        db.record_trade(ids[1], symbol, "sell", 1.0, 110.0, 0.1)
+        db.record_position(ids[2], symbol, "buy", 1.0, 100.0, 95.0, 110.0)
+        
+        assert abs(state.daily_pnl - (pnl - 200.2 + 109.9)) < 1e-9
+        assert state.symbol_exposure(symbol) == (100.0, 100.0)
+        assert abs(state.gross_exposure - (gross + 100.0)) < 1e-9
+        
+        # A fresh ledger rebuilt from the database agrees with the incremental one
+        rebuilt = RiskState()
+        assert abs(rebuilt.daily_pnl - state.daily_pnl) < 1e-9
+        assert rebuilt.symbol_exposure(symbol) == state.symbol_exposure(symbol)
+    finally:
+        db.execute_query("DELETE FROM trades WHERE id IN (?, ?)", (ids[0], ids[1]))
+        db.execute_query("DELETE FROM positions WHERE id = ?", (ids[2],))
+
+def test_risk_state_reconciles_positions_changed_elsewhere():
+    import uuid
+    from core.database import db
+    from trading.risk_state import RiskState
+    
+    state = RiskState()
+    gross = state.gross_exposure
+    symbol = f"TEST:{uuid.uuid4().hex[:8]}/USDT"
+    ids = [str(uuid.uuid4()) for _ in range(2)]
+    
+    try:
+        db.record_position(ids[0], symbol, "buy", 1.0, 100.0, 95.0, 110.0)
+        db.record_position(ids[1], symbol, "sell", 2.0, 100.0, 105.0, 90.0)
+        assert state.symbol_exposure(symbol) == (300.0, -100.0)
+        
+        # Another process shrinks one position and deletes the other - no listener fires
+        db.execute_query("UPDATE positions SET amount = 0.5 WHERE id = ?", (ids[0],))
+        db.execute_query("DELETE FROM positions WHERE id = ?", (ids[1],))
+        assert state.symbol_exposure(symbol) == (300.0, -100.0)
+        
+        state.sync()
+        assert state.symbol_exposure(symbol) == (50.0, 50.0)
+        assert abs(state.gross_exposure - (gross + 50.0)) < 1e-9
+    finally:
+        db.execute_query("DELETE FROM positions WHERE id IN (?, ?)", tuple(ids))
+
+def test_risk_state_counts_position_that_reuses_a_closed_rowid():
+    import uuid
+    from core.database import db
+    from trading.risk_state import RiskState
+    
+    state = RiskState()
+    symbol = f"TEST:{uuid.uuid4().hex[:8]}/USDT"
+    ids = [str(uuid.uuid4()) for _ in range(2)]
+    
+    try:
+        first = db.record_position(ids[0], symbol, "buy", 1.0, 100.0, 95.0, 110.0)
+        db.execute_query("DELETE FROM positions WHERE id = ?", (ids[0],))
+        state.close_position(ids[0])
+        assert state.symbol_exposure(symbol) == (0.0, 0.0)
+        
+        # SQLite hands the deleted max rowid to the next position
+        assert db.record_position(ids[1], symbol, "sell", 2.0, 50.0, 55.0, 45.0) == first
+        assert state.symbol_exposure(symbol) == (100.0, -100.0)
+        assert state.positions[ids[1]] == (symbol, "sell", 2.0, 50.0)
+    finally:
+        db.execute_query("DELETE FROM positions WHERE id IN (?, ?)", tuple(ids))
+
+def test_risk_stats_cache_updates_from_stored_candles():
+    import uuid
+    import numpy as np
+    from core.database import db
+    from trading.risk_stats import RiskStatsCache
+    
+    cache = RiskStatsCache()
+    cache.stats("warm-up")  # Load before writing so the listener path is exercised
+    
+    rng = np.random.default_rng(3)
+    common = rng.normal(0, 0.01, 300)
+    tag = uuid.uuid4().hex[:8]
+    a, b = f"TEST:{tag}A/USDT", f"TEST:{tag}B/USDT"
+    closes_a = 100 * np.cumprod(1 + common)
+    closes_b = 50 * np.cumprod(1 - common + rng.normal(0, 0.001, 300))
+    
+    try:
+        for symbol, closes in [(a, closes_a), (b, closes_b)]:
+            candles = [[1_000_000 + t * 3600_000, c, c, c, c, 1.0] for t, c in enumerate(closes)]
+            # Overlapping batches like the fetchers store them
+            db.store_historical_data(symbol, candles[:200])
+            db.store_historical_data(symbol, candles[150:])
+        
+        returns_a = np.diff(closes_a) / closes_a[:-1]
+        mean, variance, count = cache.stats(a, window=99)
+        assert count == 99
+        assert np.isclose(mean, returns_a[-99:].mean()) and np.isclose(variance, returns_a[-99:].var())
+        
+        assert cache.correlations(a)[b] < -0.9
+        valid, means, cov = cache.covariance([a, b], min_count=200)
+        assert valid == [a, b] and cov.shape == (2, 2) and cov[0, 1] < 0
+    finally:
+        db.execute_query("DELETE FROM historical_data WHERE symbol IN (?, ?)", (a, b))
+
+def test_hedge_engine_matches_pairwise_correlation():
+    import numpy as np
+    import pandas as pd
+    from trading.hedge_engine import pairwise_correlation
+    
+    rng = np.random.default_rng(5)
+    returns = rng.normal(0, 0.01, (300, 6))
+    returns[:, 1] = -returns[:, 0] + rng.normal(0, 0.002, 300)
+    returns[rng.random(returns.shape) < 0.1] = np.nan  # Gaps where candles are missing
+    
+    corr, overlap = pairwise_correlation(returns, min_overlap=50)
+    expected = pd.DataFrame(returns).corr(min_periods=50).to_numpy()
+    np.fill_diagonal(expected, np.nan)
+    
+    assert np.allclose(corr, expected, equal_nan=True)
+    assert overlap[0, 1] == np.sum(~np.isnan(returns[:, 0]) & ~np.isnan(returns[:, 1]))
+    
+    corr_row = np.where(np.isnan(corr[0]), np.inf, corr[0])
+    assert corr_row.argmin() == 1 and corr[0, 1] < -0.9
+
+def test_portfolio_optimizer_objectives_and_frontier():
+    import uuid
+    import numpy as np
+    from trading.portfolio_optimizer import PortfolioOptimizer
+    
+    rng = np.random.default_rng(11)
+    returns = rng.normal(0, 0.01, (400, 8)) + rng.normal(0, 0.01, (400, 1))
+    mu = returns.mean(axis=0) + np.linspace(0, 0.001, 8)
+    cov = np.cov(returns.T)
+    top = np.linalg.eigvalsh(cov)[-1]
+    optimizer = PortfolioOptimizer()
+    
+    def sharpe(w):
+        return mu @ w / np.sqrt(w @ cov @ w)
+    
+    # Brute-force check against random long-only portfolios
+    candidates = rng.dirichlet(np.ones(8), 20000)
+    w = optimizer.max_sharpe(mu, cov, top)
+    assert np.isclose(w.sum(), 1) and w.min() >= 0
+    assert sharpe(w) >= max(sharpe(c) for c in candidates[:2000]) - 1e-9
+    
+    w = optimizer.min_variance(cov, top)
+    assert w @ cov @ w <= np.einsum("ij,jk,ik->i", candidates, cov, candidates).min() + 1e-12
+    
+    w = optimizer.risk_parity(cov)
+    contributions = w * (cov @ w)
+    assert np.allclose(contributions, contributions.mean(), rtol=1e-4)
+    
+    W = optimizer.efficient_frontier(mu, cov, top, 10)
+    frontier_returns = W @ mu
+    assert np.all(np.diff(frontier_returns) >= -1e-12)
+    assert np.isclose(frontier_returns[-1], mu.max())
+    
+    # Symbols with no candles at all share the book equally
+    unknown = [f"TEST:{uuid.uuid4().hex[:8]}/USDT" for _ in range(3)]
+    assert optimizer.optimize("max_sharpe", unknown) == {symbol: 1 / 3 for symbol in unknown}
+
+def test_var_engine_methods_agree_on_normal_returns():
+    import uuid
+    import numpy as np
+    from core.database import db
+    from trading.risk_stats import risk_stats
+    from trading.var_engine import VaREngine
+    
+    rng = np.random.default_rng(17)
+    tag = uuid.uuid4().hex[:8]
+    symbols = [f"TEST:{tag}{i}/USDT" for i in range(4)]
+    common = rng.normal(0, 0.01, 721)
+    
+    try:
+        for symbol in symbols:
+            closes = 100 * np.cumprod(1 + common + rng.normal(0, 0.01, 721))
+            db.store_historical_data(symbol, [[1_000_000 + t * 3600_000, c, c, c, c, 1.0] for t, c in enumerate(closes)])
+        
+        engine = VaREngine()
+        engine.t_df = 0  # Normal shocks, so Monte Carlo should match the closed form
+        result = engine.calculate({symbol: 1000.0 for symbol in symbols})
+        
+        assert result["coverage"] == 1.0
+        parametric = result["parametric"]["var"]
+        assert parametric > 0 and result["parametric"]["cvar"] > parametric
+        assert abs(result["monte_carlo"]["var"] - parametric) / parametric < 0.1
+        assert abs(result["historical"]["var"] - parametric) / parametric < 0.5
+        
+        # Cached until the book or the candles change
+        assert engine.calculate({symbol: 1000.0 for symbol in symbols}) is result
+        hedged = engine.calculate({symbols[0]: 1000.0, symbols[1]: -1000.0})
+        assert hedged["parametric"]["var"] < parametric
+        
+        # Over the horizon the mean scales linearly and sigma by its square root
+        from statistics import NormalDist
+        z = NormalDist().inv_cdf(1 - engine.confidence)
+        tail = NormalDist().pdf(z) / (1 - engine.confidence)
+        horizon, engine.horizon, engine._key = engine.horizon, 1, None
+        one = engine.calculate({symbol: 1000.0 for symbol in symbols})["parametric"]
+        sigma = (one["cvar"] - one["var"]) / (tail + z)
+        mean = -one["var"] - z * sigma
+        assert abs(parametric - (-(mean * horizon + z * sigma * horizon ** 0.5))) < 1e-6 * parametric
+    finally:
+        db.execute_query(f"DELETE FROM historical_data WHERE symbol LIKE 'TEST:{tag}%'")
+        risk_stats.invalidate()
+
+def test_flash_crash_scan_batches_windows_and_stop_updates():
+    import uuid
+    import numpy as np
+    from core.database import db
+    from trading.risk_manager import risk_manager
+    
+    rng = np.random.default_rng(23)
+    tag = uuid.uuid4().hex[:8]
+    symbols = [f"TEST:{tag}{i}/USDT" for i in range(6)]
+    ids = [str(uuid.uuid4()) for _ in symbols]
+    
+    try:
+        for k, symbol in enumerate(symbols):
+            closes = 100 * np.cumprod(1 + rng.normal(0, 0.001, 10 + k))
+            if k % 2 == 0:
+                closes[-3:] *= 0.8  # Crash over the last few candles
+            rows = [(symbol, t, c, c * 1.01, c * 0.98, c, 1.0) for t, c in enumerate(closes)]
+            db.executemany("INSERT INTO market_data VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            db.execute_query(
+                "INSERT INTO positions VALUES (?, ?, 'buy', 1.0, 100.0, NULL, NULL, '')", (ids[k], symbol)
+            )
+        
+        # Batch ATR matches the per-symbol calculation, including short windows
+        highs, lows, closes, counts = risk_manager._load_market_windows(symbols, 14)
+        atr = risk_manager._atr_batch(highs, lows, closes, counts)
+        for i, symbol in enumerate(symbols):
+            market_data = db.fetch_all(
+                "SELECT high, low, close FROM market_data WHERE symbol = ? ORDER BY timestamp DESC LIMIT 14",
+                (symbol,)
+            )
+            assert counts[i] == len(market_data)
+            assert np.isclose(atr[i], risk_manager._calculate_atr_from_data(market_data))
+        
+        risk_manager.flash_crash_protection()
+        stops = dict(db.fetch_all(
+            f"SELECT symbol, stop_loss FROM positions WHERE id IN ({', '.join('?' * len(ids))})", ids
+        ))
+        crashed = symbols[::2]
+        assert all(stops[symbol] is not None for symbol in crashed)
+        assert all(stops[symbol] is None for symbol in symbols if symbol not in crashed)
+    finally:
+        db.execute_query(f"DELETE FROM market_data WHERE symbol LIKE 'TEST:{tag}%'")
+        db.execute_query(f"DELETE FROM positions WHERE symbol LIKE 'TEST:{tag}%'")
+
+def test_position_monitor_fires_nearest_triggers():
+    from trading.position_monitor import PositionMonitor
+    
+    monitor = PositionMonitor()
+    monitor.positions, monitor._books = {}, {}
+    fired = []
+    monitor.add_exit_listener(fired.append)
+    
+    symbol = "TEST:monitor/USDT"
+    for k in range(100):
+        # Longs with stops 90..99 and targets 110..119, shorts mirrored
+        monitor.track(f"long{k}", symbol, "buy", 1.0, 100.0, 90.0 + k % 10, 110.0 + k % 10)
+        monitor.track(f"short{k}", symbol, "sell", 2.0, 100.0, 110.0 + k % 10, 90.0 + k % 10)
+    
+    assert monitor.on_tick(symbol, 100.0) == []
+    
+    exits = monitor.on_tick(symbol, 98.5)
+    assert len(exits) == 20  # Long stops at 99 and short targets at 99
+    assert {e["trigger"] for e in exits if e["side"] == "sell"} == {"stop_loss"}
+    assert {e["trigger"] for e in exits if e["side"] == "buy"} == {"take_profit"}
+    assert fired == exits
+    
+    # A moved stop fires at its new level, not the old one
+    monitor.update_levels("long0", stop_loss=105.0)
+    assert [e["position_id"] for e in monitor.on_tick(symbol, 104.0)] == ["long0"]
+    assert monitor.on_tick(symbol, 97.9) and "long0" not in monitor.positions
+    
+    exits = monitor.on_tick(symbol, 130.0)
+    assert len(monitor.positions) == 0
+    assert all(e["side"] == "buy" and e["trigger"] == "stop_loss" for e in exits if e["position_id"].startswith("short"))
+
+def test_fired_exits_are_not_rearmed_or_faked(monkeypatch, fake_exchange):
+    import uuid
+    from core.database import db
+    from market.multi_exchange_fetcher import multi_fetcher
+    from trading.position_monitor import PositionMonitor
+    from trading.trading_bot import TradingBot
+    
+    monitor = PositionMonitor()
+    fired = []
+    monitor.add_exit_listener(fired.append)
+    symbol = f"TEST:{uuid.uuid4().hex[:8]}/USDT"
+    position_id = str(uuid.uuid4())
+    
+    try:
+        db.record_position(position_id, symbol, "buy", 1.0, 100.0, 95.0, 110.0)
+        assert position_id in monitor.positions
+        assert len(monitor.on_tick(symbol, 94.0)) == 1
+        
+        # Exit in flight: a reload must not arm it again
+        monitor.reload()
+        assert position_id not in monitor.positions
+        assert monitor.on_tick(symbol, 94.0) == []
+        
+        # No TEST venue connected: nothing is recorded, the position stays on
+        # the books and stays fired, so reloads don't re-fire it every tick
+        monkeypatch.setattr(multi_fetcher, "exchanges", {})
+        bot = TradingBot()
+        bot.position_monitor = monitor
+        asyncio.run(bot.close_position(fired[0]))
+        assert db.fetch_one("SELECT COUNT(*) FROM trades WHERE symbol = ?", (symbol,))[0] == 0
+        assert db.fetch_one("SELECT COUNT(*) FROM positions WHERE id = ?", (position_id,))[0] == 1
+        monitor.reload()
+        assert position_id not in monitor.positions
+        
+        # With the venue connected the market order goes out and the position is closed
+        exchange = fake_exchange("TEST", bid=94.5)
+        monkeypatch.setattr(multi_fetcher, "exchanges", {"TEST": exchange})
+        asyncio.run(bot.close_position(fired[0]))
+        assert exchange.called("create_market_order") == [(symbol.split(":", 1)[1], "sell", 1.0)]
+        assert db.fetch_one("SELECT side, amount, price FROM trades WHERE symbol = ?", (symbol,)) == ("sell", 1.0, 94.5)
+        assert db.fetch_one("SELECT COUNT(*) FROM positions WHERE id = ?", (position_id,))[0] == 0
+        monitor.reload()
+        assert position_id not in monitor.positions and position_id not in monitor._exiting
+    finally:
+        db.execute_query("DELETE FROM positions WHERE symbol = ?", (symbol,))
+        db.execute_query("DELETE FROM trades WHERE symbol = ?", (symbol,))
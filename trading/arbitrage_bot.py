@@ -3,13 +3,20 @@
 Arasaka Cross-Exchange Arbitrage Bot - Finds and executes profitable trades across exchanges
 """
 import asyncio
+import time
+import uuid
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import numpy as np
 
 from market.multi_exchange_fetcher import multi_fetcher
+from market.order_book import best_fill
+from market.price_matrix import PriceMatrix, taker_fees
+from market.symbol_registry import symbol_registry
+from trading.arbitrage_monitor import arbitrage_monitor
+from trading.cycle_detector import cycle_detector
 from trading.risk_manager import risk_manager
-from config.exchange_manager import exchange_manager
+from config.settings import settings
 from core.database import db
 from utils.logger import logger
 
@@ -18,8 +25,12 @@ class ArbitrageBot:
         self.active = False
         self.min_profit_percent = 0.5  # Minimum 0.5% profit after fees
         self.max_position_size = 0.1  # Max 10% of portfolio per trade
-        self.execution_delay = 0.1  # Seconds between orders
         self.monitored_pairs = []
+        self.price_matrix = None
+        
+        config = settings.TRADING.get("arbitrage", {})
+        self.leg_timeout = config.get("leg_timeout", 5.0)  # Seconds to wait on books and order legs
+        self.order_book_depth = config.get("order_book_depth", 20)
         
     async def initialize(self):
         """Initialize arbitrage bot"""
@@ -37,31 +48,19 @@ class ArbitrageBot:
     
     async def _get_common_pairs(self) -> List[str]:
         """Get trading pairs available on multiple exchanges"""
-        exchange_pairs = {}
-        
         for exchange_name, exchange in multi_fetcher.exchanges.items():
             try:
                 if not exchange.markets:
                     await exchange.load_markets()
                 
-                # Get active pairs
-                pairs = [symbol for symbol, market in exchange.markets.items() 
-                        if market['active']]
-                exchange_pairs[exchange_name] = set(pairs)
+                # Index native symbols under their canonical pair once
+                symbol_registry.register_exchange(exchange_name, exchange.markets)
                 
             except Exception as e:
                 logger.error(f"Failed to get pairs from {exchange_name}: {e}")
         
         # Find pairs available on at least 2 exchanges
-        all_pairs = set()
-        for pairs in exchange_pairs.values():
-            all_pairs.update(pairs)
-        
-        common_pairs = []
-        for pair in all_pairs:
-            exchanges_with_pair = sum(1 for pairs in exchange_pairs.values() if pair in pairs)
-            if exchanges_with_pair >= 2:
-                common_pairs.append(pair)
+        common_pairs = symbol_registry.common_pairs(min_exchanges=2)
         
         # Prioritize major pairs
         priority_bases = ['BTC', 'ETH', 'SOL', 'ADA', 'MATIC']
@@ -70,192 +69,137 @@ class ArbitrageBot:
         
         return common_pairs[:50]  # Limit to top 50 pairs
     
-    async def scan_opportunities(self) -> List[Dict]:
-        """Scan for arbitrage opportunities"""
+    async def scan_opportunities(self, all_tickers: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+        """Scan for arbitrage opportunities (live, or in a given ticker snapshot)"""
         opportunities = []
         
         try:
             # Get tickers from all exchanges
-            all_tickers = await multi_fetcher.fetch_tickers_all_exchanges()
+            if all_tickers is None:
+                all_tickers = await multi_fetcher.fetch_tickers_all_exchanges()
             
-            for pair in self.monitored_pairs:
-                # Normalize pair format for different exchanges
-                pair_variants = self._get_pair_variants(pair)
-                
-                prices = {}
-                for exchange, tickers in all_tickers.items():
-                    for variant in pair_variants:
-                        if variant in tickers:
-                            ticker = tickers[variant]
-                            if ticker.get('bid') and ticker.get('ask'):
-                                prices[exchange] = {
-                                    'pair': variant,
-                                    'bid': ticker['bid'],
-                                    'ask': ticker['ask'],
-                                    'volume': ticker.get('quoteVolume', 0)
-                                }
-                            break
-                
-                # Find arbitrage opportunities for this pair
-                pair_opportunities = self._find_pair_opportunities(pair, prices)
-                opportunities.extend(pair_opportunities)
+            matrix = self._get_price_matrix(list(all_tickers))
+            for exchange, tickers in all_tickers.items():
+                matrix.update(exchange, tickers)
+            
+            # Every pair and buy/sell combination at once; only winners become dicts
+            opportunities = matrix.opportunities(self.min_profit_percent)
         
         except Exception as e:
             logger.error(f"Arbitrage scan failed: {e}")
         
-        # Sort by profit
-        opportunities.sort(key=lambda x: x['net_profit_percent'], reverse=True)
-        
         return opportunities
     
-    def _get_pair_variants(self, pair: str) -> List[str]:
-        """Get different format variants of a trading pair"""
-        variants = [pair]
-        
-        # Handle different formats
-        if '/' in pair:
-            base, quote = pair.split('/')
-            variants.extend([
-                f"{base}-{quote}",      # Coinbase format
-                f"{base}{quote}",       # Bybit format
-                f"{base}_{quote}",      # Some exchanges
-                pair.replace('/', '')   # No separator
-            ])
-        elif '-' in pair:
-            base, quote = pair.split('-')
-            variants.extend([
-                f"{base}/{quote}",
-                f"{base}{quote}",
-                f"{base}_{quote}"
-            ])
-        
-        # Handle USDT/USD variations
-        if 'USDT' in pair:
-            for variant in list(variants):
-                variants.append(variant.replace('USDT', 'USD'))
-        elif 'USD' in pair and 'USDT' not in pair:
-            for variant in list(variants):
-                variants.append(variant.replace('USD', 'USDT'))
-        
-        return variants
-    
-    def _find_pair_opportunities(self, pair: str, prices: Dict) -> List[Dict]:
-        """Find arbitrage opportunities for a specific pair"""
-        opportunities = []
+    async def scan_cycles(self, all_tickers: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+        """Scan for triangular and multi-hop cycles across every quoted market"""
+        try:
+            if all_tickers is None:
+                all_tickers = await multi_fetcher.fetch_tickers_all_exchanges()
+            
+            # Graph search is CPU-bound; keep it off the event loop
+            return await asyncio.to_thread(cycle_detector.find_cycles, all_tickers, self.min_profit_percent)
         
-        exchanges = list(prices.keys())
-        for i, buy_exchange in enumerate(exchanges):
-            for sell_exchange in exchanges[i+1:]:
-                buy_data = prices[buy_exchange]
-                sell_data = prices[sell_exchange]
-                
-                # Calculate potential profit
-                opportunity = self._calculate_opportunity(
-                    pair, buy_exchange, sell_exchange, buy_data, sell_data
-                )
-                
-                if opportunity['net_profit_percent'] >= self.min_profit_percent:
-                    opportunities.append(opportunity)
-                
-                # Check reverse direction
-                reverse_opportunity = self._calculate_opportunity(
-                    pair, sell_exchange, buy_exchange, sell_data, buy_data
-                )
-                
-                if reverse_opportunity['net_profit_percent'] >= self.min_profit_percent:
-                    opportunities.append(reverse_opportunity)
+        except Exception as e:
+            logger.error(f"Cycle scan failed: {e}")
+            return []
+
+    def _get_price_matrix(self, exchanges: List[str]) -> PriceMatrix:
+        """Price matrix over the monitored pairs, rebuilt only when pairs or exchanges change"""
+        matrix = self.price_matrix
+        if matrix is None or matrix.pairs != self.monitored_pairs or matrix.exchanges != exchanges:
+            # Registry maps each canonical pair to the exchange's native symbol
+            matrix = PriceMatrix(self.monitored_pairs, exchanges, symbol_registry.native)
+            self.price_matrix = matrix
+        return matrix
+
+    async def execute_opportunity(self, opportunity: Dict, amount: Optional[float] = None) -> Tuple[bool, str]:
+        """Execute an arbitrage opportunity"""
+        started = time.perf_counter()
+        latency = {}
+        status, success, message = 'failed', False, ''
         
-        return opportunities
+        try:
+            status, success, message = await self._execute(opportunity, amount, started, latency)
+        
+        except Exception as e:
+            logger.error(f"Arbitrage execution failed: {e}")
+            message = str(e)
+        
+        # End-to-end latency is recorded for every attempt, filled or not
+        latency['total_ms'] = (time.perf_counter() - started) * 1000
+        self._record_execution(opportunity, status, latency, message)
+        return success, message
     
-    def _calculate_opportunity(self, pair: str, buy_exchange: str, sell_exchange: str,
-                              buy_data: Dict, sell_data: Dict) -> Dict:
-        """Calculate arbitrage opportunity details"""
-        buy_price = buy_data['ask']
-        sell_price = sell_data['bid']
+    async def _execute(self, opportunity: Dict, amount: Optional[float], started: float,
+                       latency: Dict) -> Tuple[str, bool, str]:
+        buy_exchange = multi_fetcher.exchanges[opportunity['buy_exchange']]
+        sell_exchange = multi_fetcher.exchanges[opportunity['sell_exchange']]
+        buy_pair = self._get_exchange_pair_format(opportunity['pair'], opportunity['buy_exchange'])
+        sell_pair = self._get_exchange_pair_format(opportunity['pair'], opportunity['sell_exchange'])
         
-        # Get exchange fees
-        buy_config = exchange_manager.get_exchange_config(buy_exchange)
-        sell_config = exchange_manager.get_exchange_config(sell_exchange)
+        # Cap the buy leg by the caller's amount, or by portfolio share
+        max_cost = None
+        if not amount:
+            max_cost = db.get_portfolio_value() * self.max_position_size
         
-        buy_fee = buy_config.get('fee_taker', 0.001)
-        sell_fee = sell_config.get('fee_taker', 0.001)
+        # Re-validate and size against just the two books involved
+        current_opp = await self._revalidate(opportunity, buy_exchange, sell_exchange, buy_pair, sell_pair,
+                                             max_amount=amount, max_cost=max_cost)
+        latency['validate_ms'] = (time.perf_counter() - started) * 1000
         
-        # Calculate profit
-        gross_profit_percent = ((sell_price / buy_price) - 1) * 100
-        total_fees_percent = (buy_fee + sell_fee) * 100
-        net_profit_percent = gross_profit_percent - total_fees_percent
-        
-        # Estimate max tradeable volume (conservative)
-        max_volume = min(buy_data['volume'], sell_data['volume']) * 0.1  # 10% of volume
-        
-        return {
-            'pair': pair,
-            'buy_exchange': buy_exchange,
-            'sell_exchange': sell_exchange,
-            'buy_price': buy_price,
-            'sell_price': sell_price,
-            'gross_profit_percent': gross_profit_percent,
-            'total_fees_percent': total_fees_percent,
-            'net_profit_percent': net_profit_percent,
-            'max_volume': max_volume,
-            'timestamp': datetime.now().isoformat()
+        if not current_opp:
+            return 'stale', False, "Opportunity no longer available"
+        
+        if current_opp['net_profit_percent'] < self.min_profit_percent:
+            return 'stale', False, f"Profit too low: {current_opp['net_profit_percent']:.2f}%"
+        
+        # Adjust the depth-optimal size for risk
+        amount = risk_manager.adjust_position_size(opportunity['pair'], current_opp['max_volume'])
+        
+        if amount <= 0:
+            return 'rejected', False, "Position size too small after risk adjustment"
+        
+        logger.info(f"Executing arbitrage: Buy {amount} {opportunity['pair']} on {opportunity['buy_exchange']}, "
+                   f"sell on {opportunity['sell_exchange']}")
+        
+        # Both legs go out together so neither waits on the other's fill; client
+        # order ids let a leg that times out be looked up on the exchange
+        submitted = time.perf_counter()
+        since = int((time.time() - 60) * 1000)
+        client_ids = {side: uuid.uuid4().hex[:20] for side in ('buy', 'sell')}
+        legs = {
+            'buy': asyncio.create_task(buy_exchange.create_market_buy_order(
+                buy_pair, amount, {'clientOrderId': client_ids['buy']})),
+            'sell': asyncio.create_task(sell_exchange.create_market_sell_order(
+                sell_pair, amount, {'clientOrderId': client_ids['sell']}))
         }
-    
-    async def execute_opportunity(self, opportunity: Dict, amount: Optional[float] = None) -> Tuple[bool, str]:
-        """Execute an arbitrage opportunity"""
-        try:
-            # Validate opportunity is still valid
-            current_opps = await self.scan_opportunities()
-            
-            # Find matching opportunity
-            current_opp = None
-            for opp in current_opps:
-                if (opp['pair'] == opportunity['pair'] and
-                    opp['buy_exchange'] == opportunity['buy_exchange'] and
-                    opp['sell_exchange'] == opportunity['sell_exchange']):
-                    current_opp = opp
-                    break
-            
-            if not current_opp:
-                return False, "Opportunity no longer available"
-            
-            if current_opp['net_profit_percent'] < self.min_profit_percent:
-                return False, f"Profit too low: {current_opp['net_profit_percent']:.2f}%"
-            
-            # Calculate position size
-            if not amount:
-                portfolio_value = db.get_portfolio_value()
-                max_position = portfolio_value * self.max_position_size
-                amount = min(max_position / current_opp['buy_price'], current_opp['max_volume'])
-            
-            # Adjust amount for risk
-            amount = risk_manager.adjust_position_size(opportunity['pair'], amount)
-            
-            if amount <= 0:
-                return False, "Position size too small after risk adjustment"
-            
-            # Execute trades
-            logger.info(f"Executing arbitrage: Buy {amount} {opportunity['pair']} on {opportunity['buy_exchange']}, "
-                       f"sell on {opportunity['sell_exchange']}")
-            
-            # Get exchanges
-            buy_exchange = multi_fetcher.exchanges[opportunity['buy_exchange']]
-            sell_exchange = multi_fetcher.exchanges[opportunity['sell_exchange']]
-            
-            # Execute buy order first
-            buy_pair = self._get_exchange_pair_format(opportunity['pair'], opportunity['buy_exchange'])
-            buy_order = await buy_exchange.create_market_buy_order(buy_pair, amount)
-            
-            logger.info(f"Buy order executed: {buy_order['id']}")
-            
-            # Small delay to ensure order is filled
-            await asyncio.sleep(self.execution_delay)
-            
-            # Execute sell order
-            sell_pair = self._get_exchange_pair_format(opportunity['pair'], opportunity['sell_exchange'])
-            sell_order = await sell_exchange.create_market_sell_order(sell_pair, amount)
-            
-            logger.info(f"Sell order executed: {sell_order['id']}")
+        done, pending = await asyncio.wait(legs.values(), timeout=self.leg_timeout)
+        latency['submit_ms'] = (time.perf_counter() - submitted) * 1000
+        
+        for task in pending:
+            task.cancel()
+        
+        orders, errors, unknown = {}, {}, {}
+        for side, task in legs.items():
+            if task in pending:
+                # Cancelling the task doesn't cancel an order the exchange already accepted
+                exchange, leg_pair = (buy_exchange, buy_pair) if side == 'buy' else (sell_exchange, sell_pair)
+                order = await self._find_leg(exchange, leg_pair, client_ids[side], since)
+                if order is None:
+                    unknown[side] = f"timed out after {self.leg_timeout}s (order state unknown)"
+                    logger.warning(f"Arbitrage {side} leg on {opportunity[side + '_exchange']} timed out - check for a stray fill")
+                elif order.get('filled'):
+                    orders[side] = order
+                else:
+                    errors[side] = f"timed out after {self.leg_timeout}s ({order.get('status')}, unfilled)"
+            elif task.exception():
+                errors[side] = str(task.exception())
+            else:
+                orders[side] = task.result()
+        
+        if len(orders) == 2:
+            buy_order, sell_order = orders['buy'], orders['sell']
+            logger.info(f"Arbitrage legs filled: buy {buy_order['id']}, sell {sell_order['id']}")
             
             # Calculate actual profit
             buy_cost = buy_order.get('cost', buy_order.get('price', 0) * amount)
@@ -265,41 +209,146 @@ class ArbitrageBot:
             # Store arbitrage trade
             self._store_arbitrage_trade(opportunity, buy_order, sell_order, actual_profit)
             
-            return True, f"Arbitrage executed! Profit: ${actual_profit:.2f} ({actual_profit/buy_cost*100:.2f}%)"
-            
-        except Exception as e:
-            logger.error(f"Arbitrage execution failed: {e}")
-            return False, str(e)
+            return 'filled', True, f"Arbitrage executed! Profit: ${actual_profit:.2f} ({actual_profit/buy_cost*100:.2f}%)"
+        
+        failures = "; ".join(f"{side} leg {error}" for side, error in {**errors, **unknown}.items())
+        if unknown:
+            # Unwinding the other leg blind could turn a hedged fill into an open position
+            filled = "; ".join(f"{side} leg {order.get('id')} filled" for side, order in orders.items())
+            logger.critical(f"Arbitrage on {opportunity['pair']}: {'; '.join(filter(None, [failures, filled]))} - "
+                            f"not unwound, reconcile by hand")
+            return 'unknown', False, f"{failures.capitalize()}; not unwound - reconcile by hand"
+        
+        if not orders:
+            logger.error(f"Arbitrage legs failed: {failures}")
+            return 'rejected', False, f"Both legs failed: {failures}"
+        
+        # One leg filled alone - flatten it on the exchange it filled on
+        side, order = next(iter(orders.items()))
+        unwound = await self._unwind(side, order, amount, buy_exchange if side == 'buy' else sell_exchange,
+                                     buy_pair if side == 'buy' else sell_pair)
+        if unwound:
+            return 'unwound', False, f"{failures.capitalize()}; {side} leg unwound"
+        return 'unwind_failed', False, f"{failures.capitalize()}; {side} leg unwind failed - position left open"
     
-    def _get_exchange_pair_format(self, pair: str, exchange: str) -> str:
-        """Convert pair to exchange-specific format"""
-        config = exchange_manager.get_exchange_config(exchange)
-        format_example = config.get('pairs_format', '')
+    async def _revalidate(self, opportunity: Dict, buy_exchange, sell_exchange, buy_pair: str, sell_pair: str,
+                          max_amount: Optional[float] = None, max_cost: Optional[float] = None) -> Optional[Dict]:
+        """Re-price and size an opportunity by walking fresh buy-side asks and sell-side bids.
         
-        if '/' in pair:
-            base, quote = pair.split('/')
-        elif '-' in pair:
-            base, quote = pair.split('-')
+        max_volume becomes the fill size with the most profit after fees whose
+        average margin still clears min_profit_percent; buy and sell prices
+        are that fill's VWAPs. With no such size, prices are top of book and
+        max_volume is zero.
+        """
+        try:
+            buy_book, sell_book = await asyncio.wait_for(asyncio.gather(
+                buy_exchange.fetch_order_book(buy_pair, self.order_book_depth),
+                sell_exchange.fetch_order_book(sell_pair, self.order_book_depth)
+            ), timeout=self.leg_timeout)
+        except Exception as e:
+            logger.error(f"Arbitrage re-validation failed: {e}")
+            return None
+        
+        if not buy_book.get('asks') or not sell_book.get('bids'):
+            return None
+        
+        buy_fee, sell_fee = taker_fees([opportunity['buy_exchange'], opportunity['sell_exchange']])
+        fill = best_fill(buy_book['asks'], sell_book['bids'], buy_fee, sell_fee,
+                         self.min_profit_percent, max_amount, max_cost)
+        
+        if fill:
+            buy_price, sell_price, volume = fill['buy_vwap'], fill['sell_vwap'], fill['amount']
         else:
-            # Try to parse concatenated format
-            for i in range(1, len(pair)):
-                if pair[i:] in ['USD', 'USDT', 'EUR', 'GBP', 'BTC', 'ETH']:
-                    base = pair[:i]
-                    quote = pair[i:]
-                    break
+            buy_price, sell_price, volume = buy_book['asks'][0][0], sell_book['bids'][0][0], 0.0
+        
+        gross_profit_percent = ((sell_price / buy_price) - 1) * 100
+        total_fees_percent = (buy_fee + sell_fee) * 100
+        return dict(
+            opportunity,
+            buy_price=buy_price,
+            sell_price=sell_price,
+            gross_profit_percent=gross_profit_percent,
+            total_fees_percent=total_fees_percent,
+            net_profit_percent=gross_profit_percent - total_fees_percent,
+            max_volume=volume,
+            expected_profit=fill['profit'] if fill else 0.0,
+            timestamp=datetime.now().isoformat()
+        )
+    
+    async def _find_leg(self, exchange, pair: str, client_id: str, since: int) -> Optional[Dict]:
+        """A timed-out leg's final order state, looked up by client order id.
+        
+        None while it's still unknown - the lookup failed, the exchange doesn't
+        list the order (the request may still be in flight), or it is open.
+        """
+        try:
+            found = await asyncio.wait_for(exchange.fetch_orders(pair, since), timeout=self.leg_timeout)
+        except Exception as e:
+            logger.error(f"Arbitrage leg lookup on {pair} failed: {e}")
+            return None
+        
+        order = next((o for o in found if o.get('clientOrderId') == client_id), None)
+        if order is None or order.get('status') not in ('closed', 'canceled', 'expired', 'rejected'):
+            return None
+        return order
+    
+    async def _unwind(self, side: str, order: Dict, amount: float, exchange, pair: str) -> bool:
+        """Reverse a lone filled leg with the opposite market order"""
+        filled = order.get('filled') or amount
+        try:
+            if side == 'buy':
+                reverse = await exchange.create_market_sell_order(pair, filled)
             else:
-                return pair
-        
-        # Format based on exchange
-        if exchange == 'coinbase':
-            return f"{base}-{quote}"
-        elif exchange == 'bybit':
-            return f"{base}{quote}"
-        elif exchange == 'bitvavo':
-            return f"{base}-{quote}"
-        else:
-            return f"{base}/{quote}"
+                reverse = await exchange.create_market_buy_order(pair, filled)
+            logger.warning(f"Unwound arbitrage {side} leg {order.get('id')} with {reverse.get('id')}")
+            return True
+        except Exception as e:
+            logger.critical(f"Arbitrage unwind of {side} leg {order.get('id')} failed: {e}")
+            return False
+
+    def _get_exchange_pair_format(self, pair: str, exchange: str) -> str:
+        """Convert pair to exchange-specific format"""
+        return symbol_registry.native(exchange, pair) or pair
     
+    def _record_execution(self, opportunity: Dict, status: str, latency: Dict, message: str):
+        """Store one execution attempt with its latency breakdown"""
+        try:
+            db.execute_query("""
+                CREATE TABLE IF NOT EXISTS arbitrage_executions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pair TEXT,
+                    buy_exchange TEXT,
+                    sell_exchange TEXT,
+                    status TEXT,
+                    validate_ms REAL,
+                    submit_ms REAL,
+                    total_ms REAL,
+                    message TEXT,
+                    timestamp TEXT
+                )
+            """)
+            
+            db.execute_query("""
+                INSERT INTO arbitrage_executions
+                (pair, buy_exchange, sell_exchange, status, validate_ms, submit_ms, total_ms, message, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                opportunity.get('pair'),
+                opportunity.get('buy_exchange'),
+                opportunity.get('sell_exchange'),
+                status,
+                latency.get('validate_ms'),
+                latency.get('submit_ms'),
+                latency.get('total_ms'),
+                message,
+                datetime.now().isoformat()
+            ))
+            
+            logger.info(f"Arbitrage execution {status} in {latency['total_ms']:.0f}ms")
+        
+        except Exception as e:
+            logger.error(f"Failed to record arbitrage execution: {e}")
+
     def _store_arbitrage_trade(self, opportunity: Dict, buy_order: Dict, sell_order: Dict, profit: float):
         """Store arbitrage trade in database"""
         try:
@@ -350,34 +399,31 @@ class ArbitrageBot:
         except Exception as e:
             logger.error(f"Failed to store arbitrage trade: {e}")
     
-    async def start_monitoring(self, scan_interval: int = 10):
-        """Start continuous arbitrage monitoring"""
+    async def start_monitoring(self, scan_interval: Optional[float] = None):
+        """Start event-driven arbitrage monitoring.
+        
+        Each exchange is polled on its own schedule, paced by how fast its
+        quotes move and by its rate budget; only pairs whose quotes changed
+        are re-evaluated. scan_interval, if given, caps the slowest poll.
+        """
         self.active = True
         logger.info("Starting arbitrage monitoring...")
         
-        while self.active:
-            try:
-                # Scan for opportunities
-                opportunities = await self.scan_opportunities()
-                
-                if opportunities:
-                    logger.info(f"Found {len(opportunities)} arbitrage opportunities")
-                    
-                    # Log top opportunities
-                    for opp in opportunities[:5]:
-                        logger.info(f"{opp['pair']}: {opp['buy_exchange']} -> {opp['sell_exchange']} "
-                                  f"= {opp['net_profit_percent']:.2f}% profit")
-                
-                # Wait before next scan
-                await asyncio.sleep(scan_interval)
-                
-            except Exception as e:
-                logger.error(f"Arbitrage monitoring error: {e}")
-                await asyncio.sleep(scan_interval)
+        try:
+            if not self.monitored_pairs:
+                await self.initialize()
+            
+            await arbitrage_monitor.run(self.monitored_pairs, self.min_profit_percent, scan_interval)
+        
+        except Exception as e:
+            logger.error(f"Arbitrage monitoring error: {e}")
+        
+        self.active = False
     
     def stop_monitoring(self):
         """Stop arbitrage monitoring"""
         self.active = False
+        arbitrage_monitor.stop()
         logger.info("Stopping arbitrage monitoring")
     
     async def get_statistics(self) -> Dict:
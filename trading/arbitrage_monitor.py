@@ -0,0 +1,195 @@
+# trading/arbitrage_monitor.py
+"""
+Arasaka Watchtower - Event-driven cross-exchange arbitrage monitoring with adaptive polling
+"""
+import asyncio
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+from config.exchange_manager import exchange_manager
+from config.settings import settings
+from market.multi_exchange_fetcher import multi_fetcher
+from market.price_matrix import PriceMatrix
+from market.rate_budget import TokenBucket
+from market.symbol_registry import symbol_registry
+from utils.logger import logger
+
+class _PollSchedule:
+    """When one exchange is next polled.
+    
+    The pace follows how fast its quotes move: interval = target_move /
+    observed move per second (EWMA), clipped to [min_interval,
+    max_interval], so a quiet exchange is polled rarely and a busy one
+    often. A token bucket holding the monitor's share of the exchange's
+    request allowance caps the average rate. Consecutive errors double the
+    interval.
+    """
+    
+    __slots__ = ("min_interval", "max_interval", "target_move", "bucket",
+                 "move_rate", "last_poll", "last_update", "errors")
+    
+    def __init__(self, min_interval, max_interval, target_move, requests_per_minute, burst):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_move = target_move
+        self.bucket = TokenBucket(requests_per_minute, burst)
+        self.move_rate = None  # EWMA of mean |log mid change| per second
+        self.last_poll = None
+        self.last_update = None
+        self.errors = 0
+    
+    @property
+    def interval(self) -> float:
+        if self.move_rate is None:
+            interval = self.min_interval  # Learn the pace quickly
+        elif self.move_rate == 0:
+            interval = self.max_interval
+        else:
+            interval = self.target_move / self.move_rate
+        interval *= 2 ** min(self.errors, 10)
+        return float(np.clip(interval, self.min_interval, self.max_interval))
+    
+    def observe(self, move: float, now: float):
+        """Fold the mean absolute mid move since the previous update into the pace"""
+        if self.last_update is not None and now > self.last_update:
+            rate = move / (now - self.last_update)
+            self.move_rate = rate if self.move_rate is None else 0.7 * self.move_rate + 0.3 * rate
+        self.last_update = now
+    
+    def delay(self, now: float) -> float:
+        """Seconds until the next poll is due and affordable"""
+        due = 0.0 if self.last_poll is None else self.last_poll + self.interval - now
+        return max(due, self.bucket.delay(now), 0.0)
+    
+    def spend(self, now: float):
+        self.bucket.spend(now)
+        self.last_poll = now
+
+class ArbitrageMonitor:
+    """Keeps the live opportunity set current from per-exchange ticker updates.
+    
+    Every exchange is polled on its own schedule. Each response updates only
+    that exchange's column of the price matrix, and only the pairs whose
+    quotes moved are re-evaluated against every other exchange - their old
+    opportunities are dropped and any that still clear the threshold are
+    re-added. Listeners get each batch of fresh opportunities.
+    """
+    
+    def __init__(self):
+        config = settings.TRADING.get("arbitrage", {}).get("monitor", {})
+        self.min_interval = config.get("min_interval", 0.5)
+        self.max_interval = config.get("max_interval", 30.0)
+        self.target_move = config.get("target_move", 0.0005)
+        self.rate_budget = config.get("rate_budget", 0.5)
+        self.burst = config.get("burst", 5)
+        
+        self.min_profit_percent = 0.5
+        self.log_opportunities = True
+        self.matrix = None
+        self.schedules = {}
+        self.opportunities = {}  # (pair, buy exchange, sell exchange) -> opportunity
+        self._listeners = []
+        self._running = False
+    
+    def add_listener(self, callback):
+        """Register callback(opportunities) for each batch of fresh opportunities"""
+        self._listeners.append(callback)
+    
+    def reset(self, pairs: List[str], exchanges: List[str], min_profit_percent: float = 0.5,
+              max_interval: Optional[float] = None, native: Optional[Callable[[str, str], Optional[str]]] = None):
+        """Start over with a new pair/exchange universe (native maps pairs to exchange symbols)"""
+        self.min_profit_percent = min_profit_percent
+        self.matrix = PriceMatrix(pairs, exchanges, native or symbol_registry.native)
+        self.opportunities = {}
+        self.schedules = {}
+        for exchange in exchanges:
+            # Exchange limits are requests per minute; the monitor gets its share
+            limit = exchange_manager.get_exchange_config(exchange).get("rate_limit", 60)
+            self.schedules[exchange] = _PollSchedule(
+                self.min_interval, max_interval or self.max_interval, self.target_move,
+                limit * self.rate_budget, self.burst
+            )
+    
+    # ===== Updates =====
+    
+    def apply(self, exchange: str, tickers: Dict[str, Dict], now: float) -> List[Dict]:
+        """Feed one exchange's tickers; returns the fresh opportunities on the pairs that moved"""
+        matrix = self.matrix
+        j = matrix.column[exchange]
+        before = (matrix.bid[:, j] + matrix.ask[:, j]) / 2
+        
+        changed = matrix.update(exchange, tickers)
+        
+        after = (matrix.bid[:, j] + matrix.ask[:, j]) / 2
+        quoted = np.isfinite(before) & np.isfinite(after)
+        schedule = self.schedules[exchange]
+        if quoted.any():
+            schedule.observe(float(np.mean(np.abs(np.log(after[quoted] / before[quoted])))), now)
+        else:
+            schedule.last_update = now  # First quotes - nothing to compare yet
+        
+        if len(changed) == 0:
+            return []
+        
+        moved = {matrix.pairs[row] for row in changed}
+        self.opportunities = {key: opp for key, opp in self.opportunities.items() if key[0] not in moved}
+        fresh = matrix.opportunities(self.min_profit_percent, rows=changed)
+        for opp in fresh:
+            self.opportunities[(opp['pair'], opp['buy_exchange'], opp['sell_exchange'])] = opp
+        
+        if fresh:
+            self._emit(fresh)
+        return fresh
+    
+    def current(self) -> List[Dict]:
+        """Live opportunities, best first"""
+        return sorted(self.opportunities.values(), key=lambda opp: opp['net_profit_percent'], reverse=True)
+    
+    def _emit(self, fresh: List[Dict]):
+        if self.log_opportunities:
+            logger.info(f"Found {len(fresh)} arbitrage opportunities")
+            for opp in fresh[:5]:
+                logger.info(f"{opp['pair']}: {opp['buy_exchange']} -> {opp['sell_exchange']} "
+                          f"= {opp['net_profit_percent']:.2f}% profit")
+        
+        for callback in list(self._listeners):
+            try:
+                callback(fresh)
+            except Exception as e:
+                logger.error(f"Arbitrage listener flatlined: {e}")
+    
+    # ===== Polling =====
+    
+    async def run(self, pairs: List[str], min_profit_percent: float = 0.5, max_interval: Optional[float] = None):
+        """Poll every connected exchange on its own adaptive schedule until stopped"""
+        await multi_fetcher.initialize()
+        self.reset(pairs, list(multi_fetcher.exchanges), min_profit_percent, max_interval)
+        self._running = True
+        logger.info(f"Arbitrage monitor watching {len(pairs)} pairs on {len(self.schedules)} exchanges")
+        await asyncio.gather(*(self._poll(name) for name in self.schedules))
+    
+    async def _poll(self, exchange_name: str):
+        exchange = multi_fetcher.exchanges[exchange_name]
+        schedule = self.schedules[exchange_name]
+        symbols = self.matrix.symbols(exchange_name)
+        loop = asyncio.get_running_loop()
+        
+        while self._running and symbols:
+            await asyncio.sleep(schedule.delay(loop.time()))
+            if not self._running:
+                break
+            
+            schedule.spend(loop.time())
+            try:
+                tickers = await exchange.fetch_tickers(symbols)
+                schedule.errors = 0
+                self.apply(exchange_name, tickers, loop.time())
+            except Exception as e:
+                schedule.errors += 1
+                logger.error(f"Arbitrage monitor tickers from {exchange_name} flatlined: {e}")
+    
+    def stop(self):
+        self._running = False
+
+# Create singleton instance
+arbitrage_monitor = ArbitrageMonitor()
@@ -0,0 +1,201 @@
+# trading/cycle_detector.py
+"""
+Arasaka Loop Hunter - Triangular and multi-hop arbitrage cycles over the ticker graph
+"""
+from datetime import datetime
+from typing import Dict, List, Tuple
+import numpy as np
+
+from config.settings import settings
+from market.price_matrix import taker_fees
+from utils.logger import logger
+
+def find_negative_cycles(n_nodes: int, src: np.ndarray, dst: np.ndarray, weight: np.ndarray,
+                         eps: float = 1e-12) -> List[List[int]]:
+    """Bellman-Ford over edge arrays; returns negative cycles as lists of edge indices.
+    
+    Every node starts at distance 0 (an implicit source linked to all of
+    them), and each round relaxes all edges at once. A cycle in the
+    predecessor graph certifies a negative cycle, so the search stops as soon
+    as one shows up rather than running all n - 1 rounds; it stops earlier
+    still when nothing improves (no negative cycle).
+    """
+    # Group edges by destination once so each round is a segmented min
+    order = np.argsort(dst, kind="stable")
+    src_sorted, dst_sorted, weight_sorted = src[order], dst[order], weight[order]
+    starts = np.flatnonzero(np.r_[True, dst_sorted[1:] != dst_sorted[:-1]]) if len(order) else np.zeros(0, dtype=int)
+    targets = dst_sorted[starts]
+    
+    dist = np.zeros(n_nodes)
+    pred = np.full(n_nodes, -1)  # Sorted edge index into each node
+    
+    for _ in range(n_nodes):
+        if len(order) == 0:
+            break
+        cand = dist[src_sorted] + weight_sorted
+        best = dist.copy()
+        best[targets] = np.minimum(dist[targets], np.minimum.reduceat(cand, starts))
+        improved = best < dist - eps
+        if not improved.any():
+            return []
+        
+        winners = improved[dst_sorted] & (cand <= best[dst_sorted])
+        pred[dst_sorted[winners]] = np.flatnonzero(winners)
+        dist = np.where(improved, best, dist)
+        
+        parent = np.where(pred >= 0, src_sorted[np.maximum(pred, 0)], n_nodes)
+        looping = _reaches_cycle(parent, n_nodes)
+        if looping.any():
+            return [[int(order[edge]) for edge in cycle] for cycle in _extract_cycles(parent, pred, looping)]
+    
+    return []
+
+def _reaches_cycle(parent: np.ndarray, n_nodes: int) -> np.ndarray:
+    """Nodes whose parent chain never reaches a root, by pointer doubling"""
+    jump = np.append(parent, n_nodes)  # Roots point at a sentinel that points at itself
+    for _ in range(max(1, int(np.ceil(np.log2(n_nodes + 1))))):
+        jump = jump[jump]
+    return jump[:n_nodes] != n_nodes
+
+def _extract_cycles(parent: np.ndarray, pred: np.ndarray, looping: np.ndarray) -> List[List[int]]:
+    """Walk parent links from each looping node; each walk ends on a distinct cycle or a visited one"""
+    cycles = []
+    seen = np.zeros(len(parent), dtype=bool)
+    for start in np.flatnonzero(looping):
+        walk = {}
+        node = int(start)
+        while not seen[node] and node not in walk:
+            walk[node] = len(walk)
+            node = int(parent[node])
+        if node in walk:
+            # Parent links run backwards along the cycle
+            loop = list(walk)[walk[node]:]
+            cycles.append([int(pred[v]) for v in reversed(loop)])
+        for v in walk:
+            seen[v] = True
+    return cycles
+
+class CycleDetector:
+    """Profitable currency cycles on one exchange or across several.
+    
+    Nodes are (exchange, currency). Each market BASE/QUOTE adds two edges:
+    selling base at the bid (rate bid x (1 - fee)) and buying it at the ask
+    (rate (1 - fee) / ask). Edge weights are -log(rate), so a round trip
+    that multiplies the starting balance by more than one is a negative
+    cycle. With cross-exchange cycles on, the same currency on two exchanges
+    is linked at rate one - that assumes funded balances on both sides, the
+    same assumption the two-exchange scanner makes.
+    
+    Each Bellman-Ford pass yields the cycles in its predecessor graph; the
+    worst-rate market edge of each is then removed and the search repeats,
+    up to max_cycles.
+    """
+    
+    def __init__(self):
+        config = settings.TRADING.get("arbitrage", {})
+        self.max_legs = config.get("max_cycle_legs", 4)
+        self.cross_exchange = config.get("cross_exchange_cycles", True)
+        self.max_cycles = config.get("max_cycles", 10)
+    
+    def build_graph(self, all_tickers: Dict[str, Dict]) -> Tuple[List[Tuple[str, str]], np.ndarray, np.ndarray, np.ndarray, List[Dict]]:
+        """(nodes, src, dst, rate, legs) for every quoted spot market"""
+        fees = dict(zip(all_tickers, taker_fees(list(all_tickers))))
+        index = {}
+        src, dst, rate, legs = [], [], [], []
+        
+        def node(exchange, currency):
+            key = (exchange, currency)
+            if key not in index:
+                index[key] = len(index)
+            return index[key]
+        
+        for exchange, tickers in all_tickers.items():
+            keep = 1 - fees[exchange]
+            for symbol, ticker in tickers.items():
+                if ":" in symbol or "/" not in symbol:
+                    continue  # Derivatives and unparseable symbols
+                bid, ask = ticker.get("bid"), ticker.get("ask")
+                if not bid or not ask or bid <= 0 or ask <= 0:
+                    continue
+                
+                base, quote = symbol.split("/", 1)
+                b, q = node(exchange, base), node(exchange, quote)
+                src += [b, q]
+                dst += [q, b]
+                rate += [bid * keep, keep / ask]
+                legs += [
+                    {"exchange": exchange, "symbol": symbol, "side": "sell", "price": bid},
+                    {"exchange": exchange, "symbol": symbol, "side": "buy", "price": ask}
+                ]
+        
+        if self.cross_exchange:
+            holders = {}
+            for exchange, currency in index:
+                holders.setdefault(currency, []).append(exchange)
+            for currency, exchanges in holders.items():
+                for a in exchanges:
+                    for b in exchanges:
+                        if a != b:
+                            src.append(index[(a, currency)])
+                            dst.append(index[(b, currency)])
+                            rate.append(1.0)
+                            legs.append({"exchange": f"{a}->{b}", "symbol": currency, "side": "transfer", "price": 1.0})
+        
+        nodes = list(index)
+        return nodes, np.array(src, dtype=int), np.array(dst, dtype=int), np.array(rate, dtype=float), legs
+    
+    def find_cycles(self, all_tickers: Dict[str, Dict], min_profit_percent: float = 0.0) -> List[Dict]:
+        """Profitable cycles (after fees) of at most max_legs trades, best first"""
+        try:
+            nodes, src, dst, rate, legs = self.build_graph(all_tickers)
+            if len(src) == 0:
+                return []
+            
+            weight = -np.log(rate)
+            market = np.array([leg["side"] != "transfer" for leg in legs])
+            cycles = []
+            
+            for _ in range(self.max_cycles):
+                found = find_negative_cycles(len(nodes), src, dst, weight)
+                if not found:
+                    break
+                for edges in found:
+                    cycle = self._describe(nodes, src, dst, rate, legs, edges)
+                    trades = sum(1 for leg in cycle["legs"] if leg["side"] != "transfer")
+                    if 2 <= trades <= self.max_legs and cycle["profit_percent"] >= min_profit_percent:
+                        cycles.append(cycle)
+                    
+                    # Cut the cycle at its worst market edge and keep searching
+                    cuttable = [e for e in edges if market[e]] or edges
+                    weight[max(cuttable, key=lambda e: weight[e])] = np.inf
+                if len(cycles) >= self.max_cycles:
+                    break
+            
+            cycles.sort(key=lambda c: c["profit_percent"], reverse=True)
+            return cycles[:self.max_cycles]
+        
+        except Exception as e:
+            logger.error(f"Cycle detection flatlined: {e}")
+            return []
+    
+    def _describe(self, nodes, src, dst, rate, legs, edges) -> Dict:
+        # Start the loop on its lowest node so repeated scans report it the same way
+        first = min(range(len(edges)), key=lambda k: src[edges[k]])
+        edges = edges[first:] + edges[:first]
+        
+        path = [f"{nodes[src[e]][0]}:{nodes[src[e]][1]}" for e in edges] + [f"{nodes[src[edges[0]]][0]}:{nodes[src[edges[0]]][1]}"]
+        cycle_legs = [
+            dict(legs[e], **{"from": nodes[src[e]][1], "to": nodes[dst[e]][1]})
+            for e in edges
+        ]
+        growth = float(np.prod(rate[edges]))
+        return {
+            "path": path,
+            "legs": cycle_legs,
+            "exchanges": sorted({nodes[src[e]][0] for e in edges}),
+            "profit_percent": (growth - 1) * 100,
+            "timestamp": datetime.now().isoformat()
+        }
+
+# Create singleton instance
+cycle_detector = CycleDetector()
@@ -0,0 +1,112 @@
+# trading/hedge_engine.py
+"""
+Arasaka Counterweight - Universe-wide correlation matrix and batched hedge selection
+"""
+import threading
+import numpy as np
+
+from config.settings import settings
+from trading.risk_stats import risk_stats
+from utils.logger import logger
+
+def pairwise_correlation(returns, min_overlap=2):
+    """Pearson correlation of every column pair over the rows both have data for.
+    
+    `returns` is (timestamps x symbols) with NaN for missing candles. All sums
+    are masked matrix products, so the whole matrix costs four BLAS calls
+    instead of a Python loop over pairs. Returns (corr, overlap); pairs with
+    fewer than min_overlap shared rows, zero variance, and the diagonal are NaN.
+    """
+    present = ~np.isnan(returns)
+    mask = present.astype(np.float64)
+    x = np.where(present, returns, 0.0)
+    
+    overlap = mask.T @ mask                # Shared observations per pair
+    sums = x.T @ mask                      # sums[i, j] = sum of x_i where j is present
+    squares = (x * x).T @ mask
+    products = x.T @ x
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = np.maximum(overlap, 1.0)
+        cov = products - sums * sums.T / n
+        var_i = squares - sums * sums / n
+        var_j = var_i.T
+        corr = cov / np.sqrt(var_i * var_j)
+    
+    invalid = (overlap < min_overlap) | ~(var_i > 0) | ~(var_j > 0)
+    corr[invalid] = np.nan
+    np.fill_diagonal(corr, np.nan)
+    return np.clip(corr, -1.0, 1.0), overlap.astype(np.int64)
+
+class HedgeEngine:
+    """Picks the most negatively correlated hedge for many positions at once.
+    
+    Returns come from the risk stats cache, aligned by candle timestamp across
+    the whole symbol universe. The correlation matrix is recomputed only when
+    the cache has seen new candles, so repeated scans between candles are
+    plain array lookups.
+    """
+    
+    def __init__(self):
+        config = settings.TRADING.get("hedging", {})
+        self.window = config.get("window", 251)
+        self.min_overlap = config.get("min_overlap", 200)
+        self.max_correlation = config.get("max_correlation", -0.3)
+        
+        self._lock = threading.Lock()
+        self._version = None
+        self.symbols = []
+        self._corr = np.zeros((0, 0))
+    
+    def correlation_matrix(self):
+        """(symbols, corr) for the full universe, refreshed when new candles arrive"""
+        with self._lock:
+            if risk_stats.version != self._version:
+                symbols, _, returns = risk_stats.aligned_returns(self.window)
+                if symbols:
+                    corr, _ = pairwise_correlation(returns, self.min_overlap)
+                else:
+                    corr = np.zeros((0, 0))
+                
+                self.symbols = symbols
+                self._corr = corr
+                self._version = risk_stats.version
+            
+            return self.symbols, self._corr
+    
+    def best_hedges(self, positions):
+        """Best hedge for each (symbol, amount) position, in input order.
+        
+        Each result is (hedge_symbol, hedge_amount, correlation), or
+        (None, 0, 0.0) when no symbol is correlated below max_correlation.
+        The hedge is sized by the strength of the correlation.
+        """
+        positions = list(positions)
+        results = [(None, 0, 0.0)] * len(positions)
+        
+        try:
+            symbols, corr = self.correlation_matrix()
+            index = {symbol: i for i, symbol in enumerate(symbols)}
+            rows = [(k, index[symbol]) for k, (symbol, _) in enumerate(positions) if symbol in index]
+            if not rows:
+                return results
+            
+            order, idx = map(np.array, zip(*rows))
+            block = np.where(np.isnan(corr[idx]), np.inf, corr[idx])
+            best = block.argmin(axis=1)
+            best_corr = block[np.arange(len(idx)), best]
+            
+            for k, j, c in zip(order, best, best_corr):
+                if c < self.max_correlation:
+                    symbol, amount = positions[k]
+                    hedge_amount = amount * abs(float(c))
+                    results[k] = (symbols[j], hedge_amount, float(c))
+                    logger.info(f"Hedge for {symbol}: {hedge_amount:.4f} {symbols[j]} (correlation: {c:.2f})")
+        
+        except Exception as e:
+            logger.error(f"Hedge engine flatlined: {e}")
+        
+        return results
+
+# Create singleton instance
+hedge_engine = HedgeEngine()
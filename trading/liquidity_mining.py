@@ -178,21 +178,14 @@ class LiquidityMiner:
                     logger.info("Liquidity successfully added - Earning passive Eddies!")
                     
                     # Track in database
-                    db.execute_query(
-                        """
-                        INSERT INTO trades (id, symbol, side, amount, price, fee, leverage, timestamp)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        (
-                            tx_hash.hex(),
-                            "DEFI:LIQUIDITY",
-                            "mine",
-                            mining_amount,
-                            0,
-                            receipt["gasUsed"] * recommended_gas / 10**18,
-                            1.0,
-                            datetime.now().isoformat()
-                        )
+                    db.record_trade(
+                        tx_hash.hex(),
+                        "DEFI:LIQUIDITY",
+                        "mine",
+                        mining_amount,
+                        0,
+                        receipt["gasUsed"] * recommended_gas / 10**18,
+                        1.0
                     )
                 else:
                     logger.error("Liquidity mining transaction failed")
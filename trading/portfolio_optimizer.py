@@ -0,0 +1,318 @@
+# trading/portfolio_optimizer.py
+"""
+Arasaka Capital Allocator - Long-only mean-variance and risk-parity portfolio solvers
+"""
+import threading
+import numpy as np
+
+from config.settings import settings
+from core.database import db
+from trading.risk_stats import risk_stats
+from utils.logger import logger
+
+OBJECTIVES = ("max_sharpe", "min_variance", "risk_parity")
+
+def project_simplex(V):
+    """Euclidean projection of each row of V onto {w >= 0, sum(w) = 1}"""
+    n = V.shape[1]
+    U = -np.sort(-V, axis=1)
+    css = np.cumsum(U, axis=1) - 1
+    k = np.arange(1, n + 1)
+    rho = np.count_nonzero(U - css / k > 0, axis=1)
+    theta = css[np.arange(len(V)), rho - 1] / rho
+    return np.maximum(V - theta[:, None], 0)
+
+def project_budget(V, a):
+    """Euclidean projection of each row of V onto {y >= 0, a.y = 1}.
+    
+    The projection is y = max(v - tau * a, 0) for the shift tau where a.y = 1.
+    a.y is piecewise linear and non-increasing in tau with breakpoints v_i / a_i,
+    so sorting the breakpoints and prefix sums locate tau exactly. Needs at
+    least one a_i > 0.
+    """
+    rows = np.arange(len(V))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        breaks = np.where(a != 0, V / a, np.inf)
+    order = np.argsort(breaks, axis=1)
+    s = np.take_along_axis(breaks, order, axis=1)
+    A = a[order]
+    av = A * np.take_along_axis(V, order, axis=1)
+    aa = A * A
+    pos, neg = A > 0, A < 0
+    
+    # Active terms at a shift between breakpoints k-1 and k: positive a_i with
+    # breakpoint index >= k, negative a_i with index < k
+    zeros = np.zeros((len(V), 1))
+    def suffix(X):
+        return np.concatenate([np.cumsum(X[:, ::-1], axis=1)[:, ::-1], zeros], axis=1)
+    def prefix(X):
+        return np.concatenate([zeros, np.cumsum(X, axis=1)], axis=1)
+    total_av = suffix(av * pos) + prefix(av * neg)
+    total_aa = suffix(aa * pos) + prefix(aa * neg)
+    
+    with np.errstate(invalid="ignore"):
+        budget = np.where(np.isfinite(s), total_av[:, :-1] - s * total_aa[:, :-1], -np.inf)
+    k = np.count_nonzero(budget >= 1, axis=1)
+    tau = (total_av[rows, k] - 1) / total_aa[rows, k]
+    return np.maximum(V - tau[:, None] * a, 0)
+
+def solve_qp(Q, C, project, W0, lipschitz, tol=1e-9, max_iter=10000):
+    """Minimize 1/2 w'Qw - c'w over a convex set, one problem per row of C.
+    
+    Accelerated projected gradient (FISTA) with adaptive restart: every row
+    is a separate QP sharing Q, so a batch of problems costs one matrix
+    product per iteration. W0 is the warm start. Returns (W, iterations).
+    """
+    step = 1.0 / max(lipschitz, 1e-18)
+    W = project(W0)
+    Y = W.copy()
+    t = np.ones(len(W))
+    
+    for iteration in range(1, max_iter + 1):
+        W_next = project(Y - (Y @ Q - C) * step)
+        delta = W_next - W
+        scale = np.maximum(np.abs(W_next).max(axis=1), 1.0)
+        if np.all(np.abs(delta).max(axis=1) <= tol * scale):
+            return W_next, iteration
+        
+        # Restart momentum on rows where it started pointing uphill
+        restart = np.sum((Y - W_next) * delta, axis=1) > 0
+        t = np.where(restart, 1.0, t)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        Y = W_next + ((t - 1) / t_next)[:, None] * delta
+        W, t = W_next, t_next
+    
+    return W, max_iter
+
+class PortfolioOptimizer:
+    """Portfolio weights over the open long positions, solved as QPs.
+    
+    Inputs are the risk stats cache's mean returns and EWMA covariance.
+    Results are cached per objective and only re-solved when the position set
+    or the covariance estimate for it changes; a re-solve warm-starts from the
+    previous weights, which after one new candle are already near-optimal.
+    """
+    
+    def __init__(self):
+        config = settings.TRADING.get("portfolio", {})
+        self.objective = config.get("objective", "max_sharpe")
+        self.window = config.get("window", 251)
+        self.frontier_points = config.get("frontier_points", 25)
+        self.periods_per_year = config.get("periods_per_year", 252)
+        self.tolerance = float(config.get("tolerance", 1e-9))
+        self.max_iterations = config.get("max_iterations", 10000)
+        
+        self._lock = threading.RLock()
+        self._inputs_key = None
+        self._inputs = None
+        self._cache = {}  # objective -> {"symbols", "mu", "cov", "result"}
+    
+    # ===== Inputs =====
+    
+    def _position_symbols(self):
+        rows = db.fetch_all("SELECT DISTINCT symbol FROM positions WHERE side = 'buy' ORDER BY symbol")
+        return [row[0] for row in rows]
+    
+    def _load_inputs(self, symbols):
+        """(valid symbols, mean returns, PSD covariance, largest eigenvalue), cached per candle"""
+        key = (risk_stats.version, tuple(symbols))
+        if key == self._inputs_key:
+            return self._inputs
+        
+        valid, mu, cov = risk_stats.covariance(symbols, window=self.window, min_count=self.window)
+        keep = np.diag(cov) > 0 if len(valid) else np.zeros(0, dtype=bool)
+        valid = [symbol for symbol, k in zip(valid, keep) if k]
+        mu, cov = mu[keep], cov[np.ix_(keep, keep)]
+        
+        # Pairs without enough shared history have zeroed covariance, which can
+        # leave the matrix slightly indefinite - clip it back to PSD
+        top = 0.0
+        if len(valid):
+            eigenvalues, vectors = np.linalg.eigh(cov)
+            if eigenvalues[0] < 0:
+                eigenvalues = np.maximum(eigenvalues, 0)
+                cov = (vectors * eigenvalues) @ vectors.T
+            top = eigenvalues[-1]
+        
+        self._inputs_key = key
+        self._inputs = (valid, mu, cov, top)
+        return self._inputs
+    
+    def _warm_start(self, objective, symbols):
+        """Previous weights mapped onto the current symbols, or None"""
+        entry = self._cache.get(objective)
+        if not entry or not isinstance(entry["result"], dict):
+            return None
+        previous = entry["result"]
+        w = np.array([previous.get(symbol, 0.0) for symbol in symbols])
+        return w if w.sum() > 0 else None
+    
+    # ===== Solvers =====
+    
+    def min_variance(self, cov, top, w0=None):
+        n = len(cov)
+        w0 = np.full(n, 1.0 / n) if w0 is None else w0
+        W, _ = solve_qp(2 * cov, np.zeros((1, n)), project_simplex, w0[None, :], 2 * top,
+                        self.tolerance, self.max_iterations)
+        return W[0]
+    
+    def max_sharpe(self, mu, cov, top, w0=None):
+        """Long-only tangency portfolio.
+        
+        With covariance C, solved as min y'Cy subject to mu.y = 1, y >= 0, then normalized -
+        the standard convex reformulation of the Sharpe ratio.
+        """
+        if not np.any(mu > 0):
+            logger.warning("No symbol has a positive expected return - falling back to min variance")
+            return self.min_variance(cov, top, w0)
+        
+        n = len(mu)
+        if w0 is None or mu @ w0 <= 0:
+            w0 = np.where(mu > 0, mu, 0.0)
+        y0 = w0 / (mu @ w0)
+        
+        project = lambda V: project_budget(V, mu)
+        Y, _ = solve_qp(2 * cov, np.zeros((1, n)), project, y0[None, :], 2 * top,
+                        self.tolerance, self.max_iterations)
+        return Y[0] / Y[0].sum()
+    
+    def risk_parity(self, cov, w0=None, max_iter=100):
+        """Equal risk contribution weights.
+        
+        C is the covariance. Newton's method on 1/2 y'Cy - (1/n) sum(log y) (Spinu's convex form);
+        normalized y gives every asset the same share of portfolio variance.
+        """
+        n = len(cov)
+        b = np.full(n, 1.0 / n)
+        if w0 is None or np.any(w0 <= 0):
+            w0 = 1 / np.sqrt(np.diag(cov))
+        y = w0 / np.sqrt(w0 @ cov @ w0)  # Optimal y has y'Cy = 1
+        
+        def objective(y):
+            return 0.5 * y @ cov @ y - b @ np.log(y)
+        
+        for _ in range(max_iter):
+            gradient = cov @ y - b / y
+            hessian = cov + np.diag(b / (y * y))
+            direction = np.linalg.solve(hessian, gradient)
+            if gradient @ direction < self.tolerance:
+                break
+            
+            # Backtrack to stay positive and keep descending
+            alpha, current = 1.0, objective(y)
+            while np.any(y - alpha * direction <= 0) or objective(y - alpha * direction) > current - 0.25 * alpha * (gradient @ direction):
+                alpha /= 2
+                if alpha < 1e-12:
+                    break
+            y = y - alpha * direction
+        
+        return y / y.sum()
+    
+    def efficient_frontier(self, mu, cov, top, points, W0=None):
+        """Long-only frontier from min variance to max return in one batched solve.
+        
+        Row k minimizes w'Cw - t_k mu.w. t runs from 0 (min variance) to the
+        smallest trade-off at which the highest-return asset alone is optimal.
+        """
+        n = len(mu)
+        best = int(np.argmax(mu))
+        gaps = mu[best] - mu
+        below = gaps > 0
+        if below.any():
+            t_max = np.max(2 * (cov[best, best] - cov[best, below]) / gaps[below])
+        else:
+            t_max = 0.0
+        t = t_max * np.linspace(0, 1, points) ** 2
+        
+        if W0 is None or W0.shape != (points, n):
+            W0 = np.full((points, n), 1.0 / n)
+        W, _ = solve_qp(2 * cov, t[:, None] * mu, project_simplex, W0, 2 * top,
+                        self.tolerance, self.max_iterations)
+        return W
+    
+    # ===== Cached entry points =====
+    
+    def _solve(self, objective, symbols):
+        valid, mu, cov, top = self._load_inputs(symbols)
+        if len(valid) < 2:
+            return valid, {symbol: 1.0 / len(valid) for symbol in valid}
+        
+        entry = self._cache.get(objective)
+        if (entry and entry["symbols"] == valid
+                and np.array_equal(entry["mu"], mu) and np.array_equal(entry["cov"], cov)):
+            return valid, entry["result"]
+        
+        if objective == "frontier":
+            previous = entry["weights"] if entry and entry["symbols"] == valid else None
+            W = self.efficient_frontier(mu, cov, top, self.frontier_points, previous)
+            returns = W @ mu * self.periods_per_year
+            vols = np.sqrt(np.einsum("ij,jk,ik->i", W, cov, W) * self.periods_per_year)
+            result = [
+                {
+                    "return": float(r),
+                    "volatility": float(v),
+                    "sharpe": float(r / v) if v > 0 else 0.0,
+                    "weights": {symbol: float(x) for symbol, x in zip(valid, w)}
+                }
+                for r, v, w in zip(returns, vols, W)
+            ]
+            self._cache[objective] = {"symbols": valid, "mu": mu, "cov": cov, "result": result, "weights": W}
+            return valid, result
+        
+        w0 = self._warm_start(objective, valid)
+        if objective == "min_variance":
+            w = self.min_variance(cov, top, w0)
+        elif objective == "risk_parity":
+            w = self.risk_parity(cov, w0)
+        else:
+            w = self.max_sharpe(mu, cov, top, w0)
+        
+        result = {symbol: float(x) for symbol, x in zip(valid, w)}
+        logger.info(f"Portfolio optimized ({objective}): {result}")
+        self._cache[objective] = {"symbols": valid, "mu": mu, "cov": cov, "result": result}
+        return valid, result
+    
+    def optimize(self, objective=None, symbols=None):
+        """Target weights for the open long positions (or given symbols).
+        
+        Symbols without a full window of history get weight 0. When none has
+        one, every symbol gets an equal weight rather than an arbitrary pick.
+        """
+        objective = objective or self.objective
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown portfolio objective: {objective}")
+        
+        try:
+            with self._lock:
+                symbols = self._position_symbols() if symbols is None else sorted(set(symbols))
+                if len(symbols) < 2:
+                    return {symbols[0]: 1.0} if symbols else {}
+                
+                valid, result = self._solve(objective, symbols)
+                if not valid:
+                    logger.warning(f"No return history for {', '.join(symbols)} - falling back to equal weights")
+                    return {symbol: 1.0 / len(symbols) for symbol in symbols}
+                
+                weights = dict(result)
+                for symbol in symbols:
+                    weights.setdefault(symbol, 0.0)
+                return weights
+        
+        except Exception as e:
+            logger.error(f"Portfolio optimization flatlined: {e}")
+            return {}
+    
+    def frontier(self, symbols=None):
+        """Efficient frontier points (annualized return, volatility, Sharpe, weights)"""
+        try:
+            with self._lock:
+                symbols = self._position_symbols() if symbols is None else sorted(set(symbols))
+                valid, result = self._solve("frontier", symbols)
+                return result if len(valid) >= 2 else []
+        
+        except Exception as e:
+            logger.error(f"Efficient frontier flatlined: {e}")
+            return []
+
+# Create singleton instance
+portfolio_optimizer = PortfolioOptimizer()
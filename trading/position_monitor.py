@@ -0,0 +1,276 @@
+# trading/position_monitor.py
+"""
+Arasaka Tripwire - Streaming stop-loss/take-profit triggers for open positions
+"""
+import asyncio
+import heapq
+import inspect
+import itertools
+import threading
+
+from config.settings import settings
+from core.database import db
+from utils.logger import logger
+
+class _SymbolTriggers:
+    """Trigger levels for one symbol, nearest threshold on top of each heap"""
+    
+    __slots__ = ("falls", "rises", "stale")
+    
+    def __init__(self):
+        self.falls = []  # Max-heap of (-level, seq, id): fire when price <= level
+        self.rises = []  # Min-heap of (level, seq, id): fire when price >= level
+        self.stale = 0
+
+class PositionMonitor:
+    """Watches price ticks against every open position's stop-loss and take-profit.
+    
+    Long stops and short take-profits fire when price falls to their level;
+    long take-profits and short stops fire when it rises to theirs. Each symbol
+    keeps one heap per direction, so a tick only compares against the nearest
+    level on each side - O(1) when nothing fires, O(log n) per trigger that
+    does. Updated or closed positions leave stale heap entries behind that are
+    skipped when they surface and compacted once they pile up.
+    
+    Positions are loaded from the database, then tracked as they're recorded.
+    Fired exits go to listeners registered with add_exit_listener. A fired
+    position stays out of tracking and reloads until its listener reports
+    back through exit_finished, so a slow close can't be fired twice.
+    """
+    
+    def __init__(self):
+        config = settings.TRADING.get("position_monitor", {})
+        self.poll_interval = config.get("poll_interval", 1.0)
+        self.reload_interval = config.get("reload_interval", 60)
+        
+        self._lock = threading.RLock()
+        self._seq = itertools.count()
+        self._listeners = []
+        self._running = False
+        self.positions = {}  # id -> position dict (with its current heap seq)
+        self._books = {}     # symbol -> _SymbolTriggers
+        self._exiting = set()  # Ids fired but not yet closed or failed
+        
+        self.reload()
+        db.add_listener(self._on_write)
+    
+    # ===== Tracking =====
+    
+    def track(self, position_id, symbol, side, amount, entry_price, stop_loss, take_profit):
+        """Start (or restart) watching a position's exit levels"""
+        with self._lock:
+            if position_id in self._exiting:
+                return
+            if position_id in self.positions:
+                self._retire(position_id)
+            
+            seq = next(self._seq)
+            self.positions[position_id] = {
+                "id": position_id, "symbol": symbol, "side": side, "amount": amount,
+                "entry_price": entry_price, "stop_loss": stop_loss, "take_profit": take_profit,
+                "seq": seq
+            }
+            
+            book = self._books.setdefault(symbol, _SymbolTriggers())
+            long = side == "buy"
+            for level, falls in [(stop_loss, long), (take_profit, not long)]:
+                if not level:
+                    continue
+                if falls:
+                    heapq.heappush(book.falls, (-level, seq, position_id))
+                else:
+                    heapq.heappush(book.rises, (level, seq, position_id))
+    
+    def untrack(self, position_id):
+        """Stop watching a position (closed elsewhere); returns it or None"""
+        with self._lock:
+            return self._retire(position_id)
+    
+    def exit_finished(self, position_id):
+        """The exit for a fired position completed or failed - it may be tracked again"""
+        with self._lock:
+            self._exiting.discard(position_id)
+    
+    def update_levels(self, position_id, stop_loss=None, take_profit=None):
+        """Move a tracked position's stop-loss and/or take-profit"""
+        with self._lock:
+            position = self.positions.get(position_id)
+            if position is None:
+                return
+            self.track(
+                position_id, position["symbol"], position["side"], position["amount"], position["entry_price"],
+                position["stop_loss"] if stop_loss is None else stop_loss,
+                position["take_profit"] if take_profit is None else take_profit
+            )
+    
+    def _retire(self, position_id, popped=0):
+        position = self.positions.pop(position_id, None)
+        if position is None:
+            return None
+        
+        # Its heap entries (less any already popped) are now stale; rebuild
+        # once they outnumber live ones
+        book = self._books[position["symbol"]]
+        book.stale += bool(position["stop_loss"]) + bool(position["take_profit"]) - popped
+        if book.stale > len(book.falls) + len(book.rises) - book.stale:
+            self._compact(position["symbol"])
+        return position
+    
+    def _live(self, seq, position_id):
+        position = self.positions.get(position_id)
+        return position is not None and position["seq"] == seq
+    
+    def _compact(self, symbol):
+        book = self._books[symbol]
+        book.falls = [entry for entry in book.falls if self._live(entry[1], entry[2])]
+        book.rises = [entry for entry in book.rises if self._live(entry[1], entry[2])]
+        heapq.heapify(book.falls)
+        heapq.heapify(book.rises)
+        book.stale = 0
+        if not book.falls and not book.rises:
+            del self._books[symbol]
+    
+    def _on_write(self, table, rowid, row):
+        """DB listener - start watching positions as they're recorded"""
+        if table == "positions":
+            position_id, symbol, side, amount, entry_price, stop_loss, take_profit, _ = row
+            self.track(position_id, symbol, side, amount, entry_price, stop_loss, take_profit)
+    
+    def reload(self):
+        """Rebuild from the positions table (startup, or rows written by other processes)"""
+        try:
+            rows = db.fetch_all(
+                "SELECT id, symbol, side, amount, entry_price, stop_loss, take_profit FROM positions"
+            )
+            with self._lock:
+                self.positions = {}
+                self._books = {}
+                for row in rows:
+                    self.track(*row)
+            logger.info(f"Position monitor armed: {len(rows)} positions")
+        except Exception as e:
+            logger.error(f"Position monitor reload flatlined: {e}")
+    
+    # ===== Ticks =====
+    
+    def add_exit_listener(self, callback):
+        """Register callback(exit_order); coroutine callbacks are scheduled on the running loop"""
+        self._listeners.append(callback)
+    
+    def on_tick(self, symbol, price):
+        """Check a price against the symbol's nearest levels; returns the exits fired"""
+        book = self._books.get(symbol)
+        if book is None or not price:
+            return []
+        
+        exits = []
+        with self._lock:
+            while book.falls and -book.falls[0][0] >= price:
+                level, seq, position_id = heapq.heappop(book.falls)
+                if self._live(seq, position_id):
+                    exits.append(self._fire(position_id, -level, price, falls=True))
+                else:
+                    book.stale -= 1
+            
+            while book.rises and book.rises[0][0] <= price:
+                level, seq, position_id = heapq.heappop(book.rises)
+                if self._live(seq, position_id):
+                    exits.append(self._fire(position_id, level, price, falls=False))
+                else:
+                    book.stale -= 1
+        
+        for exit_order in exits:
+            self._emit(exit_order)
+        return exits
+    
+    def on_ticks(self, prices):
+        """Apply a batch of {symbol: price} ticks"""
+        exits = []
+        for symbol, price in prices.items():
+            exits.extend(self.on_tick(symbol, price))
+        return exits
+    
+    def _fire(self, position_id, level, price, falls):
+        position = self._retire(position_id, popped=1)
+        self._exiting.add(position_id)
+        long = position["side"] == "buy"
+        trigger = "stop_loss" if falls == long else "take_profit"
+        
+        logger.warning(
+            f"{trigger.replace('_', '-').title()} hit on {position['symbol']} at {price:.4f} "
+            f"(level {level:.4f}) - exiting {position['amount']}"
+        )
+        return {
+            "position_id": position_id,
+            "symbol": position["symbol"],
+            "side": "sell" if long else "buy",
+            "amount": position["amount"],
+            "entry_price": position["entry_price"],
+            "stop_loss": position["stop_loss"],
+            "take_profit": position["take_profit"],
+            "trigger": trigger,
+            "trigger_level": level,
+            "price": price
+        }
+    
+    def _emit(self, exit_order):
+        for callback in list(self._listeners):
+            try:
+                result = callback(exit_order)
+                if inspect.isawaitable(result):
+                    asyncio.get_running_loop().create_task(result)
+            except Exception as e:
+                logger.error(f"Exit listener flatlined: {e}")
+    
+    # ===== Price feed =====
+    
+    async def run(self):
+        """Poll tickers for every watched symbol and feed them through on_tick.
+        
+        One fetch_tickers call per exchange per interval, however many
+        positions are open. Symbols are stored as "exchange:pair"; bare pairs
+        are polled on the first connected exchange.
+        """
+        from market.multi_exchange_fetcher import multi_fetcher
+        
+        await multi_fetcher.initialize()
+        self._running = True
+        loop = asyncio.get_running_loop()
+        last_reload = loop.time()
+        
+        while self._running:
+            try:
+                if loop.time() - last_reload > self.reload_interval:
+                    self.reload()
+                    last_reload = loop.time()
+                
+                default = next(iter(multi_fetcher.exchanges), None)
+                wanted = {}
+                for symbol in list(self._books):
+                    exchange_name, pair = symbol.split(":", 1) if ":" in symbol else (default, symbol)
+                    if exchange_name in multi_fetcher.exchanges:
+                        wanted.setdefault(exchange_name, {})[pair] = symbol
+                
+                async def poll(exchange_name, pairs):
+                    try:
+                        return pairs, await multi_fetcher.exchanges[exchange_name].fetch_tickers(list(pairs))
+                    except Exception as e:
+                        logger.error(f"Position monitor tickers from {exchange_name} flatlined: {e}")
+                        return pairs, {}
+                
+                for pairs, tickers in await asyncio.gather(*(poll(name, pairs) for name, pairs in wanted.items())):
+                    self.on_ticks({
+                        pairs[pair]: ticker.get("last")
+                        for pair, ticker in tickers.items() if pair in pairs
+                    })
+            
+            except Exception as e:
+                logger.error(f"Position monitor loop flatlined: {e}")
+            
+            await asyncio.sleep(self.poll_interval)
+    
+    def stop(self):
+        self._running = False
+
+# Create singleton instance
+position_monitor = PositionMonitor()
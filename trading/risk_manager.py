@@ -4,12 +4,17 @@ Arasaka Risk Management Protocols - Protect your Eddies from market flatlines
 """
 import numpy as np
 import pandas as pd
-from scipy.optimize import minimize
 from datetime import datetime
 import asyncio
 
 from config.settings import settings
 from core.database import db
+from trading.hedge_engine import hedge_engine
+from trading.portfolio_optimizer import portfolio_optimizer
+from trading.position_monitor import position_monitor
+from trading.risk_state import risk_state
+from trading.risk_stats import risk_stats
+from trading.var_engine import var_engine
 from utils.logger import logger
 
 class RiskManager:
@@ -80,8 +85,9 @@ class RiskManager:
                 logger.warning(f"Trade rejected: Leverage {leverage} exceeds max {self.max_leverage}")
                 return False
             
-            # Get portfolio value
-            portfolio_value = db.get_portfolio_value()
+            # Get portfolio value from the running ledger
+            risk_state.sync(force=False)
+            portfolio_value = risk_state.portfolio_value
             
             # Calculate max position size based on portfolio
             max_size = self.max_position_size * portfolio_value
@@ -101,20 +107,7 @@ class RiskManager:
                 return False
             
             # Check daily loss limit
-            trades_today = db.fetch_all(
-                """
-                SELECT side, amount, price, fee 
-                FROM trades 
-                WHERE timestamp >= date('now', 'start of day')
-                """
-            )
-            
-            daily_pnl = 0
-            for trade in trades_today:
-                if trade[0] == "buy":
-                    daily_pnl -= trade[1] * trade[2] + trade[3]
-                else:
-                    daily_pnl += trade[1] * trade[2] - trade[3]
+            daily_pnl = risk_state.daily_pnl
             
             max_daily_loss_amount = self.max_daily_loss * portfolio_value
             if daily_pnl < -max_daily_loss_amount:
@@ -135,34 +128,18 @@ class RiskManager:
     def adjust_position_size(self, symbol, amount):
         """Adjust position size using Kelly Criterion"""
         try:
-            portfolio_value = db.get_portfolio_value()
+            risk_state.sync(force=False)
+            portfolio_value = risk_state.portfolio_value
             
-            # Get recent price data
-            data = db.fetch_all(
-                """
-                SELECT close FROM historical_data 
-                WHERE symbol = ? 
-                ORDER BY timestamp DESC 
-                LIMIT 100
-                """,
-                (symbol,)
-            )
+            # Cached stats over the last 100 closes (99 returns)
+            mean_return, variance, count = risk_stats.stats(symbol, window=99)
             
-            if len(data) < 20:
+            if count < 19:
                 logger.warning("Insufficient data for Kelly sizing, using default")
                 return min(amount, self.max_position_size * portfolio_value)
             
-            # Calculate returns
-            prices = [d[0] for d in data]
-            returns = np.diff(prices) / prices[:-1]
-            
             # Kelly Criterion calculation
-            if len(returns) > 0 and np.std(returns) > 0:
-                mean_return = np.mean(returns)
-                variance = np.var(returns)
-                kelly_fraction = mean_return / variance if variance > 0 else 0.1
-            else:
-                kelly_fraction = 0.1
+            kelly_fraction = mean_return / variance if variance > 0 else 0.1
             
             # Cap Kelly fraction between 1% and 50%
             kelly_fraction = min(max(kelly_fraction, 0.01), 0.5)
@@ -194,7 +171,8 @@ class RiskManager:
         """Dynamically adjust leverage based on confidence and market conditions"""
         try:
             base_leverage = self.max_leverage
-            portfolio_value = db.get_portfolio_value()
+            risk_state.sync(force=False)
+            portfolio_value = risk_state.portfolio_value
             
             # Reduce leverage in bear markets or for small portfolios
             if market_regime == "bear" or portfolio_value < 1000:
@@ -208,6 +186,9 @@ class RiskManager:
             if portfolio_value > 50000:
                 leverage = min(leverage, 1.5)
             
+            # Tail-risk gate: scale down as portfolio VaR passes its limit
+            leverage = var_engine.leverage_cap(leverage, portfolio_value)
+            
             logger.info(f"Leverage adjusted to {leverage}x (Confidence: {prediction_confidence:.2f}, Regime: {market_regime})")
             
             return leverage
@@ -216,80 +197,10 @@ class RiskManager:
             logger.error(f"Leverage adjustment flatlined: {e}")
             return 1.0
     
-    def optimize_portfolio(self):
+    def optimize_portfolio(self, objective=None):
         """Optimize portfolio weights using Modern Portfolio Theory"""
-        try:
-            # Get all active positions
-            positions = db.fetch_all("SELECT DISTINCT symbol FROM positions WHERE side = 'buy'")
-            symbols = [p[0] for p in positions]
-            
-            if len(symbols) < 2:
-                logger.info("Not enough positions for optimization")
-                return {symbols[0]: 1.0} if symbols else {}
-            
-            # Get historical returns for each symbol
-            returns_data = []
-            valid_symbols = []
-            
-            for symbol in symbols:
-                data = db.fetch_all(
-                    """
-                    SELECT close FROM historical_data 
-                    WHERE symbol = ? 
-                    ORDER BY timestamp DESC 
-                    LIMIT 252
-                    """,
-                    (symbol,)
-                )
-                
-                if len(data) >= 252:
-                    prices = [d[0] for d in data]
-                    returns = np.diff(prices) / prices[:-1]
-                    returns_data.append(returns)
-                    valid_symbols.append(symbol)
-            
-            if len(valid_symbols) < 2:
-                return {symbols[0]: 1.0} if symbols else {}
-            
-            # Calculate covariance matrix
-            returns_array = np.array(returns_data)
-            mean_returns = np.mean(returns_array, axis=1)
-            cov_matrix = np.cov(returns_array)
-            
-            # Optimization objective: maximize Sharpe ratio
-            def negative_sharpe(weights):
-                portfolio_return = np.sum(mean_returns * weights) * 252
-                portfolio_vol = np.sqrt(np.dot(weights.T, np.dot(cov_matrix * 252, weights)))
-                return -portfolio_return / portfolio_vol if portfolio_vol > 0 else 0
-            
-            # Constraints and bounds
-            constraints = {"type": "eq", "fun": lambda w: np.sum(w) - 1}
-            bounds = [(0, 1) for _ in range(len(valid_symbols))]
-            initial_weights = np.ones(len(valid_symbols)) / len(valid_symbols)
-            
-            # Optimize
-            result = minimize(
-                negative_sharpe,
-                initial_weights,
-                method="SLSQP",
-                bounds=bounds,
-                constraints=constraints
-            )
-            
-            # Create weights dictionary
-            weights = {symbol: weight for symbol, weight in zip(valid_symbols, result.x)}
-            
-            # Add zero weights for excluded symbols
-            for symbol in symbols:
-                if symbol not in weights:
-                    weights[symbol] = 0.0
-            
-            logger.info(f"Portfolio optimized: {weights}")
-            return weights
-            
-        except Exception as e:
-            logger.error(f"Portfolio optimization flatlined: {e}")
-            return {}
+        # Cached QP solve - only re-runs when positions or the covariance change
+        return portfolio_optimizer.optimize(objective)
     
     def rebalance_trades(self):
         """Rebalance portfolio to target weights"""
@@ -365,49 +276,27 @@ class RiskManager:
                 WHERE side = 'buy'
                 """
             )
+            if not positions:
+                logger.info("Auto-hedge scan complete - Risk contained!")
+                return
             
-            for symbol, side, amount in positions:
-                # Get recent volatility
-                market_data = db.fetch_all(
-                    """
-                    SELECT high, low, close 
-                    FROM market_data 
-                    WHERE symbol = ? 
-                    ORDER BY timestamp DESC 
-                    LIMIT 14
-                    """,
-                    (symbol,)
-                )
-                
-                if len(market_data) >= 14:
-                    # Calculate ATR
-                    atr = self._calculate_atr_from_data(market_data)
-                    
-                    # Get 30-day volatility for dynamic threshold
-                    hist_data = db.fetch_all(
-                        """
-                        SELECT close 
-                        FROM historical_data 
-                        WHERE symbol = ? 
-                        ORDER BY timestamp DESC 
-                        LIMIT 720
-                        """,
-                        (symbol,)
-                    )
-                    
-                    if hist_data:
-                        prices = [d[0] for d in hist_data]
-                        returns = np.diff(prices) / prices[:-1]
-                        hist_vol = np.std(returns)
-                        dynamic_threshold = max(self.flash_drop_threshold, hist_vol * 2)
-                    else:
-                        dynamic_threshold = self.flash_drop_threshold
-                    
-                    # Check if hedging needed
-                    if atr > dynamic_threshold:
-                        hedge_symbol, hedge_amount = self.calculate_hedge(symbol, amount)
-                        if hedge_symbol:
-                            logger.info(f"Auto-hedge triggered for {symbol}: Hedge with {hedge_amount} {hedge_symbol}")
+            # Last 14 candles for every held symbol in one query
+            symbols = sorted({symbol for symbol, _, _ in positions})
+            highs, lows, closes, counts = self._load_market_windows(symbols, 14)
+            atr = self._atr_batch(highs, lows, closes, counts)
+            
+            # 30-day volatility (720 hourly candles) for dynamic threshold
+            hist_vol = np.array([risk_stats.volatility(symbol, window=719) for symbol in symbols])
+            dynamic_threshold = np.maximum(self.flash_drop_threshold, hist_vol * 2)
+            
+            # Check if hedging needed
+            needs_hedge = set(np.array(symbols)[(counts >= 14) & (atr > dynamic_threshold)])
+            at_risk = [(symbol, amount) for symbol, _, amount in positions if symbol in needs_hedge]
+            
+            # One correlation matrix lookup for every position that needs cover
+            for (symbol, _), (hedge_symbol, hedge_amount, _) in zip(at_risk, hedge_engine.best_hedges(at_risk)):
+                if hedge_symbol:
+                    logger.info(f"Auto-hedge triggered for {symbol}: Hedge with {hedge_amount} {hedge_symbol}")
             
             logger.info("Auto-hedge scan complete - Risk contained!")
             
@@ -425,134 +314,130 @@ class RiskManager:
                 WHERE side = 'buy'
                 """
             )
+            if not positions:
+                logger.info("Flash crash protection scan complete")
+                return
+            
+            # Last 14 candles for every held symbol in one query - the first 5
+            # closes give the drop, all 14 the ATR for the dynamic stop-loss
+            symbols = sorted({symbol for _, symbol, _, _ in positions})
+            highs, lows, closes, counts = self._load_market_windows(symbols, 14)
+            atr = self._atr_batch(highs, lows, closes, counts)
+            
+            current_price = closes[:, 0]
+            initial_price = closes[:, 4]
+            
+            # Calculate drop percentage
+            with np.errstate(divide="ignore", invalid="ignore"):
+                drop = np.where(initial_price > 0, (initial_price - current_price) / initial_price, 0.0)
+            stop_price = current_price * (1 - self.stop_loss_buffer - atr)
             
+            # Trigger protection if drop exceeds threshold
+            crashed = (counts >= 5) & (drop > self.flash_drop_threshold)
+            row = {symbol: i for i, symbol in enumerate(symbols)}
+            
+            updates = []
             for position_id, symbol, amount, entry_price in positions:
-                # Get recent prices
-                recent_prices = db.fetch_all(
+                i = row[symbol]
+                if crashed[i]:
+                    logger.warning(f"Flash crash detected on {symbol}: {drop[i]:.1%} drop!")
+                    logger.info(f"Would exit position at stop price: {stop_price[i]:.2f}")
+                    updates.append((float(stop_price[i]), position_id))
+            
+            # Update all stop-losses in one transaction
+            if updates:
+                db.executemany(
                     """
-                    SELECT close 
-                    FROM market_data 
-                    WHERE symbol = ? 
-                    ORDER BY timestamp DESC 
-                    LIMIT 5
+                    UPDATE positions 
+                    SET stop_loss = ? 
+                    WHERE id = ?
                     """,
-                    (symbol,)
+                    updates
                 )
-                
-                if len(recent_prices) == 5:
-                    prices = [p[0] for p in recent_prices]
-                    current_price = prices[0]
-                    initial_price = prices[-1]
-                    
-                    # Calculate drop percentage
-                    drop = (initial_price - current_price) / initial_price if initial_price > 0 else 0
-                    
-                    # Get ATR for dynamic stop-loss
-                    market_data = db.fetch_all(
-                        """
-                        SELECT high, low, close 
-                        FROM market_data 
-                        WHERE symbol = ? 
-                        ORDER BY timestamp DESC 
-                        LIMIT 14
-                        """,
-                        (symbol,)
-                    )
-                    
-                    if market_data:
-                        atr = self._calculate_atr_from_data(market_data)
-                        stop_price = current_price * (1 - self.stop_loss_buffer - atr)
-                    else:
-                        stop_price = current_price * (1 - self.stop_loss_buffer)
-                    
-                    # Trigger protection if drop exceeds threshold
-                    if drop > self.flash_drop_threshold:
-                        logger.warning(f"Flash crash detected on {symbol}: {drop:.1%} drop!")
-                        logger.info(f"Would exit position at stop price: {stop_price:.2f}")
-                        
-                        # Update position with stop-loss
-                        db.execute_query(
-                            """
-                            UPDATE positions 
-                            SET stop_loss = ? 
-                            WHERE id = ?
-                            """,
-                            (stop_price, position_id)
-                        )
+                for stop, position_id in updates:
+                    position_monitor.update_levels(position_id, stop_loss=stop)
             
             logger.info("Flash crash protection scan complete")
             
         except Exception as e:
             logger.error(f"Flash crash protection flatlined: {e}")
     
+    def _load_market_windows(self, symbols, depth):
+        """Latest `depth` market_data candles for many symbols in one query.
+        
+        Returns (highs, lows, closes, counts): (symbols x depth) arrays ordered
+        newest first and NaN-padded, plus each symbol's number of candles.
+        """
+        highs = np.full((len(symbols), depth), np.nan)
+        lows = np.full((len(symbols), depth), np.nan)
+        closes = np.full((len(symbols), depth), np.nan)
+        counts = np.zeros(len(symbols), dtype=int)
+        if not symbols:
+            return highs, lows, closes, counts
+        
+        # One index seek per symbol on (symbol, timestamp), so the cost doesn't
+        # grow with how much history market_data holds
+        held = ", ".join("(?)" for _ in symbols)
+        rows = db.fetch_all(
+            f"""
+            WITH held(symbol) AS (VALUES {held})
+            SELECT symbol, ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY timestamp DESC) AS rn,
+                   high, low, close
+            FROM (
+                SELECT m.symbol, m.timestamp, m.high, m.low, m.close
+                FROM held
+                JOIN market_data m ON m.rowid IN (
+                    SELECT rowid FROM market_data
+                    WHERE symbol = held.symbol
+                    ORDER BY timestamp DESC
+                    LIMIT ?
+                )
+            )
+            """,
+            (*symbols, depth)
+        )
+        if not rows:
+            return highs, lows, closes, counts
+        
+        index = {symbol: i for i, symbol in enumerate(symbols)}
+        symbol_col, rn, high, low, close = zip(*rows)
+        i = np.fromiter((index[symbol] for symbol in symbol_col), dtype=int, count=len(rows))
+        j = np.array(rn) - 1
+        
+        highs[i, j] = np.array(high, dtype=float)
+        lows[i, j] = np.array(low, dtype=float)
+        closes[i, j] = np.array(close, dtype=float)
+        np.add.at(counts, i, 1)
+        return highs, lows, closes, counts
+    
+    def _atr_batch(self, highs, lows, closes, counts, period=14):
+        """Row-wise _calculate_atr_from_data over newest-first candle windows.
+        
+        Same definition: true range against the adjacent row's close, averaged
+        over `period` rows and divided by the oldest close; 0.02 when a symbol
+        has fewer than `period` candles.
+        """
+        highs, lows, closes = highs[:, :period], lows[:, :period], closes[:, :period]
+        
+        adjacent = np.full_like(closes, np.nan)
+        adjacent[:, 1:] = closes[:, :-1]
+        true_range = np.fmax(
+            highs - lows,
+            np.fmax(np.abs(highs - adjacent), np.abs(lows - adjacent))
+        )
+        
+        atr = np.full(len(closes), 0.02)
+        full = counts >= period
+        if full.any():
+            atr[full] = true_range[full].mean(axis=1) / closes[full, period - 1]
+        return np.where(np.isnan(atr), 0.02, atr)
+    
     def calculate_hedge(self, symbol, amount):
         """Calculate optimal hedge for a position"""
         try:
-            # Get returns for correlation calculation
-            data = db.fetch_all(
-                """
-                SELECT close 
-                FROM historical_data 
-                WHERE symbol = ? 
-                ORDER BY timestamp DESC 
-                LIMIT 252
-                """,
-                (symbol,)
-            )
-            
-            if len(data) < 252:
-                return None, 0
-            
-            prices = [d[0] for d in data]
-            returns = np.diff(prices) / prices[:-1]
-            
-            # Find negatively correlated assets
-            correlations = {}
-            
-            # Get other symbols
-            other_symbols = db.fetch_all(
-                """
-                SELECT DISTINCT symbol 
-                FROM historical_data 
-                WHERE symbol != ?
-                """,
-                (symbol,)
-            )
-            
-            for other_symbol in other_symbols[:10]:  # Limit to 10 for performance
-                other_data = db.fetch_all(
-                    """
-                    SELECT close 
-                    FROM historical_data 
-                    WHERE symbol = ? 
-                    ORDER BY timestamp DESC 
-                    LIMIT 252
-                    """,
-                    (other_symbol[0],)
-                )
-                
-                if len(other_data) == 252:
-                    other_prices = [d[0] for d in other_data]
-                    other_returns = np.diff(other_prices) / other_prices[:-1]
-                    
-                    if len(other_returns) == len(returns):
-                        corr = np.corrcoef(returns, other_returns)[0, 1]
-                        correlations[other_symbol[0]] = corr
-            
-            if not correlations:
-                return None, 0
-            
-            # Find best hedge (most negative correlation)
-            hedge_symbol = min(correlations, key=lambda x: correlations[x])
-            hedge_ratio = -correlations[hedge_symbol]
-            
-            # Only hedge if correlation is significantly negative
-            if correlations[hedge_symbol] < -0.3:
-                hedge_amount = amount * abs(hedge_ratio)
-                logger.info(f"Hedge for {symbol}: {hedge_amount:.4f} {hedge_symbol} (correlation: {correlations[hedge_symbol]:.2f})")
-                return hedge_symbol, hedge_amount
-            
-            return None, 0
+            # Most negatively correlated symbol over the aligned returns window
+            hedge_symbol, hedge_amount, _ = hedge_engine.best_hedges([(symbol, amount)])[0]
+            return hedge_symbol, hedge_amount
             
         except Exception as e:
             logger.error(f"Hedge calculation flatlined: {e}")
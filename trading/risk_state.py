@@ -0,0 +1,234 @@
+# trading/risk_state.py
+"""
+Arasaka Risk Ledger - Running daily P&L, exposure and portfolio value for pre-trade checks
+"""
+import threading
+import time
+from datetime import datetime, timezone
+
+from core.database import db
+from utils.logger import logger
+
+class RiskState:
+    """In-memory risk totals kept current as trades and positions are written.
+    
+    Rows recorded through db.record_trade / record_position / update_portfolio_value
+    in this process arrive via a DB listener. Rows written by other processes
+    (GUI simulation, scripts) are picked up by sync(), which only reads rows
+    past the last seen rowid. Either way each row is applied exactly once, so
+    the checks themselves are plain attribute lookups. Positions are keyed on
+    their id rather than a rowid watermark: closed positions are deleted, and
+    SQLite hands a deleted max rowid to the next insert. They can also be
+    deleted or edited elsewhere (kill switch, manual closes), so sync() checks
+    the table's count and totals against the ledger and reloads the position
+    side when they disagree.
+    
+    Daily P&L follows the same cash-flow convention as the old per-check scan:
+    buys subtract notional plus fee, everything else adds notional less fee,
+    counting trades stamped on or after the current UTC date.
+    """
+    
+    def __init__(self, sync_interval=1.0):
+        self.sync_interval = sync_interval
+        self._lock = threading.RLock()
+        self._reset()
+        self.rebuild()
+        db.add_listener(self._on_write)
+    
+    def _reset(self):
+        self.day = self._today()
+        self._daily_pnl = 0.0
+        self.portfolio_value = 100  # Same default as db.get_portfolio_value
+        self.exposure = {}  # symbol -> [gross, net]
+        self.gross_exposure = 0.0
+        self.net_exposure = 0.0
+        self.positions = {}  # id -> (symbol, side, amount, entry_price)
+        self._seen = {"trades": 0, "portfolio": 0}
+        self._last_sync = 0.0
+    
+    @staticmethod
+    def _today():
+        # Matches SQLite's date('now', 'start of day'), which is UTC
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    
+    def _roll_day(self):
+        today = self._today()
+        if today != self.day:
+            self.day = today
+            self._daily_pnl = 0.0
+    
+    # ===== Applying rows =====
+    
+    def _apply_trade(self, side, amount, price, fee, timestamp):
+        self._roll_day()
+        if timestamp < self.day:
+            return
+        
+        if side == "buy":
+            self._daily_pnl -= amount * price + fee
+        else:
+            self._daily_pnl += amount * price - fee
+    
+    def _apply_position(self, symbol, side, amount, entry_price, sign=1):
+        gross = abs(amount * entry_price) * sign
+        net = gross if side == "buy" else -gross
+        
+        totals = self.exposure.setdefault(symbol, [0.0, 0.0])
+        totals[0] += gross
+        totals[1] += net
+        self.gross_exposure += gross
+        self.net_exposure += net
+    
+    def _add_position(self, position_id, symbol, side, amount, entry_price):
+        self._remove_position(position_id)  # A re-recorded id replaces its old row
+        self.positions[position_id] = (symbol, side, amount, entry_price)
+        self._apply_position(symbol, side, amount, entry_price)
+    
+    def _remove_position(self, position_id):
+        position = self.positions.pop(position_id, None)
+        if position:
+            self._apply_position(*position, sign=-1)
+    
+    def _on_write(self, table, rowid, row):
+        """DB listener for rows inserted in this process"""
+        with self._lock:
+            if table == "positions":
+                position_id, symbol, side, amount, entry_price, _, _, _ = row
+                self._add_position(position_id, symbol, side, amount or 0, entry_price or 0)
+                return
+            
+            if table not in self._seen or rowid <= self._seen[table]:
+                return
+            
+            # Another process wrote in between - catch up in rowid order instead
+            if rowid > self._seen[table] + 1:
+                self.sync()
+                return
+            
+            self._seen[table] = rowid
+            
+            if table == "trades":
+                _, _, side, amount, price, fee, _, timestamp = row
+                self._apply_trade(side, amount or 0, price or 0, fee or 0, timestamp or "")
+            elif table == "portfolio":
+                self.portfolio_value = row[0]
+    
+    def close_position(self, position_id):
+        """Remove a closed position's exposure"""
+        with self._lock:
+            self._remove_position(position_id)
+    
+    # ===== Loading from the database =====
+    
+    def rebuild(self):
+        """Recompute everything from the database (startup, or after manual edits)"""
+        try:
+            with self._lock:
+                self._reset()
+                
+                for side, amount, price, fee, timestamp in db.fetch_all(
+                    """
+                    SELECT side, amount, price, fee, timestamp FROM trades
+                    WHERE timestamp >= date('now', 'start of day')
+                    """
+                ):
+                    self._apply_trade(side, amount or 0, price or 0, fee or 0, timestamp)
+                
+                self._load_positions()
+                
+                portfolio = db.fetch_one("SELECT value FROM portfolio ORDER BY timestamp DESC LIMIT 1")
+                if portfolio:
+                    self.portfolio_value = portfolio[0]
+                
+                for table in ("trades", "portfolio"):
+                    self._seen[table] = db.fetch_one(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}")[0]
+                
+                self._last_sync = time.monotonic()
+            
+            logger.info(
+                f"Risk ledger rebuilt - daily P&L {self._daily_pnl:.2f}, "
+                f"gross exposure {self.gross_exposure:.2f}, portfolio {self.portfolio_value:.2f} Eddies"
+            )
+        
+        except Exception as e:
+            logger.error(f"Risk ledger rebuild flatlined: {e}")
+    
+    def _load_positions(self):
+        """Replace the exposure totals with the positions table as it is now"""
+        self.exposure = {}
+        self.gross_exposure = 0.0
+        self.net_exposure = 0.0
+        self.positions = {}
+        
+        for position_id, symbol, side, amount, entry_price in db.fetch_all(
+            "SELECT id, symbol, side, amount, entry_price FROM positions"
+        ):
+            self._add_position(position_id, symbol, side, amount or 0, entry_price or 0)
+    
+    def _positions_match(self):
+        """Whether the table's position count and exposure totals equal the ledger's"""
+        count, gross, net = db.fetch_one(
+            """
+            SELECT COUNT(*), TOTAL(ABS(amount * entry_price)),
+                   TOTAL(CASE WHEN side = 'buy' THEN ABS(amount * entry_price) ELSE -ABS(amount * entry_price) END)
+            FROM positions
+            """
+        )
+        tolerance = 1e-9 * max(1.0, abs(gross))
+        return (
+            count == len(self.positions)
+            and abs(gross - self.gross_exposure) <= tolerance
+            and abs(net - self.net_exposure) <= tolerance
+        )
+    
+    def sync(self, force=True):
+        """Apply rows other processes wrote since the last sync.
+        
+        Trades and portfolio values are rowid range seeks that are normally
+        empty. Positions get one aggregate over the (small) open positions
+        table, so rows added, deleted or edited elsewhere are reconciled.
+        With force=False it runs at most once per sync_interval seconds.
+        """
+        if not force and time.monotonic() - self._last_sync < self.sync_interval:
+            return
+        
+        try:
+            with self._lock:
+                for rowid, side, amount, price, fee, timestamp in db.fetch_all(
+                    "SELECT rowid, side, amount, price, fee, timestamp FROM trades WHERE rowid > ? ORDER BY rowid",
+                    (self._seen["trades"],)
+                ):
+                    self._apply_trade(side, amount or 0, price or 0, fee or 0, timestamp or "")
+                    self._seen["trades"] = rowid
+                
+                if not self._positions_match():
+                    self._load_positions()
+                    logger.info(f"Risk ledger reconciled positions - gross exposure {self.gross_exposure:.2f}")
+                
+                latest = db.fetch_one(
+                    "SELECT id, value FROM portfolio WHERE id > ? ORDER BY id DESC LIMIT 1",
+                    (self._seen["portfolio"],)
+                )
+                if latest:
+                    self._seen["portfolio"], self.portfolio_value = latest
+                
+                self._last_sync = time.monotonic()
+        
+        except Exception as e:
+            logger.error(f"Risk ledger sync flatlined: {e}")
+    
+    # ===== Lookups =====
+    
+    @property
+    def daily_pnl(self):
+        with self._lock:
+            self._roll_day()
+            return self._daily_pnl
+    
+    def symbol_exposure(self, symbol):
+        """(gross, net) open notional for a symbol; net is long minus short"""
+        gross, net = self.exposure.get(symbol, (0.0, 0.0))
+        return gross, net
+
+# Create singleton instance
+risk_state = RiskState()
@@ -0,0 +1,314 @@
+# trading/risk_stats.py
+"""
+Arasaka Risk Telemetry - Cached return statistics and EWMA covariance across symbols
+"""
+import threading
+from itertools import groupby
+import numpy as np
+
+from config.settings import settings
+from core.database import db
+from utils.logger import logger
+
+class _ReturnWindow:
+    """Ring of a symbol's most recent candle returns with running sums"""
+    
+    def __init__(self, size):
+        self.returns = np.zeros(size)
+        self.timestamps = np.zeros(size, dtype=np.int64)
+        self.position = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.last_timestamp = None
+        self.last_close = None
+    
+    def push(self, value, timestamp):
+        size = len(self.returns)
+        if self.count == size:
+            old = self.returns[self.position]
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+        
+        self.returns[self.position] = value
+        self.timestamps[self.position] = timestamp
+        self.position = (self.position + 1) % size
+        self.total += value
+        self.total_sq += value * value
+    
+    def _recent_idx(self, n):
+        n = min(n, self.count)
+        return (self.position - n + np.arange(n)) % len(self.returns)
+    
+    def recent(self, n):
+        """Last n returns, oldest first"""
+        return self.returns[self._recent_idx(n)]
+    
+    def recent_with_timestamps(self, n):
+        """Last n (timestamps, returns), oldest first"""
+        idx = self._recent_idx(n)
+        return self.timestamps[idx], self.returns[idx]
+
+class RiskStatsCache:
+    """Per-symbol mean/variance and a cross-symbol EWMA covariance matrix.
+    
+    Fed by the database's historical_data writes: every candle newer than the
+    last one seen for its symbol adds one return to that symbol's window and
+    one RiskMetrics-style (zero-mean) EWMA step to its variance and to its
+    covariance with every symbol that already has a return at the same
+    timestamp. Readers get numpy
+    lookups instead of pulling hundreds of closes per symbol per call.
+    
+    The cache warms up lazily from the database on first read, so importing
+    the risk engine stays cheap.
+    """
+    
+    def __init__(self):
+        config = settings.TRADING.get("risk_stats", {})
+        self.window = config.get("window", 720)
+        self.decay = config.get("ewma_lambda", 0.94)
+        self.min_observations = config.get("min_observations", 30)
+        self.align_window = config.get("align_window", 64)
+        
+        self._lock = threading.RLock()
+        self._loaded = False
+        self.version = 0  # Bumped on every change, so downstream caches know to refresh
+        self._reset()
+        db.add_listener(self._on_write)
+    
+    def _reset(self):
+        self.symbols = []
+        self._index = {}
+        self._series = []
+        self._cov = np.zeros((0, 0))
+        self._nobs = np.zeros((0, 0), dtype=np.int64)
+        self._pending = {}  # timestamp -> {symbol index: return}
+    
+    # ===== Updates =====
+    
+    def _symbol_index(self, symbol):
+        i = self._index.get(symbol)
+        if i is not None:
+            return i
+        
+        i = len(self.symbols)
+        self.symbols.append(symbol)
+        self._index[symbol] = i
+        self._series.append(_ReturnWindow(self.window))
+        
+        # Grow the matrices geometrically so adding symbols stays amortized O(n)
+        if i >= len(self._cov):
+            size = max(8, 2 * len(self._cov))
+            cov = np.zeros((size, size))
+            nobs = np.zeros((size, size), dtype=np.int64)
+            cov[:i, :i] = self._cov[:i, :i]
+            nobs[:i, :i] = self._nobs[:i, :i]
+            self._cov, self._nobs = cov, nobs
+        
+        return i
+    
+    def _advance(self, symbol, timestamp, close):
+        """Move a symbol's series to a new candle; returns (index, return) or None"""
+        i = self._symbol_index(symbol)
+        series = self._series[i]
+        
+        if series.last_timestamp is not None and timestamp <= series.last_timestamp:
+            return None  # Re-stored or out-of-order candle
+        if not close:
+            return None
+        
+        previous = series.last_close
+        series.last_timestamp = timestamp
+        series.last_close = close
+        if not previous:
+            return None
+        
+        r = close / previous - 1
+        series.push(r, timestamp)
+        self.version += 1
+        return i, r
+    
+    def _observe(self, timestamp, candles):
+        """Fold candles that share a timestamp, as (symbol, close) pairs, into the statistics"""
+        moved = [m for m in (self._advance(symbol, timestamp, close) for symbol, close in candles) if m]
+        if moved:
+            idx, returns = zip(*moved)
+            self._update_covariance(np.array(idx), timestamp, np.array(returns))
+    
+    def _ewma(self, block, products):
+        fresh = self._nobs[block] == 0
+        self._cov[block] = np.where(
+            fresh, products, self.decay * self._cov[block] + (1 - self.decay) * products
+        )
+        self._nobs[block] += 1
+    
+    def _update_covariance(self, idx, timestamp, returns):
+        """One EWMA step for the new returns against each other and against
+        returns other symbols already reported for the same timestamp"""
+        self._ewma(np.ix_(idx, idx), np.outer(returns, returns))
+        
+        bucket = self._pending.setdefault(timestamp, {})
+        if bucket:
+            others = np.fromiter(bucket.keys(), dtype=np.int64, count=len(bucket))
+            values = np.fromiter(bucket.values(), dtype=np.float64, count=len(bucket))
+            self._ewma(np.ix_(idx, others), np.outer(returns, values))
+            self._cov[np.ix_(others, idx)] = self._cov[np.ix_(idx, others)].T
+            self._nobs[np.ix_(others, idx)] = self._nobs[np.ix_(idx, others)].T
+        bucket.update(zip(idx.tolist(), returns.tolist()))
+        
+        # Only recent timestamps can still be matched by other symbols' candles
+        while len(self._pending) > self.align_window:
+            del self._pending[min(self._pending)]
+    
+    def _on_write(self, table, rowid, rows):
+        """DB listener - historical_data writes arrive as a batch of candle rows"""
+        if table != "historical_data":
+            return
+        
+        with self._lock:
+            if not self._loaded:
+                return  # Warm-up will read these rows from the database
+            for symbol, timestamp, _, _, _, close, _ in sorted(rows, key=lambda row: row[1]):
+                self._observe(timestamp, [(symbol, close)])
+    
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                rows = db.fetch_all(
+                    """
+                    SELECT symbol, timestamp, close FROM (
+                        SELECT symbol, timestamp, close,
+                               ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY timestamp DESC) AS rn
+                        FROM historical_data
+                    )
+                    WHERE rn <= ?
+                    ORDER BY timestamp, symbol
+                    """,
+                    (self.window + 1,)
+                )
+                
+                self._reset()
+                for timestamp, group in groupby(rows, key=lambda row: row[1]):
+                    self._observe(timestamp, [(symbol, close) for symbol, _, close in group])
+                
+                logger.info(f"Risk stats cache warmed: {len(self.symbols)} symbols, {len(rows)} candles")
+            except Exception as e:
+                logger.error(f"Risk stats warm-up flatlined: {e}")
+            self._loaded = True
+    
+    # ===== Lookups =====
+    
+    def stats(self, symbol, window=None):
+        """(mean, variance, count) of the symbol's last `window` candle returns"""
+        self._ensure_loaded()
+        with self._lock:
+            i = self._index.get(symbol)
+            if i is None:
+                return 0.0, 0.0, 0
+            
+            series = self._series[i]
+            if window is None or window >= series.count:
+                n = series.count
+                if n == 0:
+                    return 0.0, 0.0, 0
+                mean = series.total / n
+                return mean, max(series.total_sq / n - mean * mean, 0.0), n
+            
+            returns = series.recent(window)
+            return float(returns.mean()), float(returns.var()), len(returns)
+    
+    def volatility(self, symbol, window=None):
+        """Standard deviation of recent candle returns (0 if unknown)"""
+        _, variance, _ = self.stats(symbol, window)
+        return float(np.sqrt(variance))
+    
+    def covariance(self, symbols, window=None, min_count=None):
+        """Mean returns and EWMA covariance for the symbols with enough history.
+        
+        Returns (valid_symbols, mean_returns, cov_matrix). Pairs that have not
+        yet shared min_observations timestamps get zero covariance.
+        """
+        self._ensure_loaded()
+        min_count = self.min_observations if min_count is None else min_count
+        
+        with self._lock:
+            valid, idx, means = [], [], []
+            for symbol in symbols:
+                mean, _, count = self.stats(symbol, window)
+                if count >= min_count:
+                    valid.append(symbol)
+                    idx.append(self._index[symbol])
+                    means.append(mean)
+            
+            idx = np.array(idx, dtype=np.int64)
+            cov = self._cov[np.ix_(idx, idx)].copy()
+            cov[self._nobs[np.ix_(idx, idx)] < self.min_observations] = 0.0
+            cov[np.diag_indices(len(idx))] = self._cov[idx, idx]
+            
+            return valid, np.array(means), cov
+    
+    def correlations(self, symbol):
+        """EWMA correlation of `symbol` with every other symbol sharing enough history"""
+        self._ensure_loaded()
+        with self._lock:
+            i = self._index.get(symbol)
+            if i is None:
+                return {}
+            
+            n = len(self.symbols)
+            variances = np.diag(self._cov)[:n]
+            denom = np.sqrt(variances[i] * variances)
+            valid = (self._nobs[i, :n] >= self.min_observations) & (denom > 0)
+            valid[i] = False
+            
+            corr = np.zeros(n)
+            corr[valid] = self._cov[i, :n][valid] / denom[valid]
+            return {self.symbols[j]: float(corr[j]) for j in np.flatnonzero(valid)}
+    
+    def aligned_returns(self, window, symbols=None):
+        """Timestamp-aligned returns over the last `window` candle timestamps.
+        
+        Returns (symbols, timestamps, matrix) where matrix is (timestamps x
+        symbols) with NaN wherever a symbol has no candle at that timestamp.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            symbols = list(self.symbols) if symbols is None else [s for s in symbols if s in self._index]
+            if not symbols:
+                return [], np.zeros(0, dtype=np.int64), np.zeros((0, 0))
+            
+            columns, stamps, values = [], [], []
+            for j, symbol in enumerate(symbols):
+                ts, returns = self._series[self._index[symbol]].recent_with_timestamps(window)
+                columns.append(np.full(len(ts), j))
+                stamps.append(ts)
+                values.append(returns)
+            
+            columns = np.concatenate(columns)
+            stamps = np.concatenate(stamps)
+            values = np.concatenate(values)
+        
+        timestamps = np.unique(stamps)[-window:]
+        keep = stamps >= timestamps[0] if len(timestamps) else np.zeros(0, dtype=bool)
+        rows = np.searchsorted(timestamps, stamps[keep])
+        
+        matrix = np.full((len(timestamps), len(symbols)), np.nan)
+        matrix[rows, columns[keep]] = values[keep]
+        return symbols, timestamps, matrix
+    
+    def invalidate(self):
+        """Drop cached state; the next read reloads from the database"""
+        with self._lock:
+            self._loaded = False
+            self._reset()
+            self.version += 1
+
+# Create singleton instance
+risk_stats = RiskStatsCache()
@@ -8,7 +8,6 @@ import uuid
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from sklearn.cluster import KMeans
 
 from config.settings import settings
 from core.database import db
@@ -17,51 +16,57 @@ from utils.logger import logger
 class TradingBot:
     def __init__(self):
         self.exchange = None
-        self.trainer = None
-        self.rl_trainer = None
+        self.policy = None
         self.strategies = None
         self.risk_manager = None
         self.fetcher = None
         self._initialized = False
+    
+    @property
+    def trainer(self):
+        """XGBoost trainer, loaded on first prediction rather than at startup"""
+        from ml.trainer import get_trainer
+        return get_trainer()
         
-async def initialize(self):
-    """Updated initialization for multi-exchange"""
-    if self._initialized:
-        return
-            
-        from ml.trainer import trainer
-        from ml.rl_trainer import rl_trainer
+    async def initialize(self):
+        """Updated initialization for multi-exchange"""
+        if self._initialized:
+            return
+        
+        from ml.policy_inference import policy
         from trading.strategies import strategies
         from trading.risk_manager import risk_manager
         from market.data_fetcher import fetcher
         from market.multi_exchange_fetcher import multi_fetcher
-    
+        from config.exchange_manager import exchange_manager
+        from trading.position_monitor import position_monitor
+        
         self.multi_fetcher = multi_fetcher
-        self.trainer = trainer
-        self.rl_trainer = rl_trainer
+        self.policy = policy
         self.strategies = strategies
         self.risk_manager = risk_manager
         self.fetcher = fetcher
         
         # Initialize exchange
         enabled_exchanges = exchange_manager.get_enabled_exchanges()
-    if enabled_exchanges:
-        self.primary_exchange = enabled_exchanges[0]
-    else:
-        self.primary_exchange = "coinbase"  # Default
+        if enabled_exchanges:
+            self.primary_exchange = enabled_exchanges[0]
+        else:
+            self.primary_exchange = "coinbase"  # Default
         
-        if settings.TESTNET:
+        if settings.TESTNET and self.exchange:
             self.exchange.set_sandbox_mode(True)
-            
+        
+        # Stop-loss/take-profit exits stream in from the position monitor
+        self.position_monitor = position_monitor
+        position_monitor.add_exit_listener(self.close_position)
+        self._monitor_task = asyncio.create_task(position_monitor.run())
+        
         self._initialized = True
 
     async def execute_trade(self, symbol, side, amount, leverage=1.0):
-    """Execute trade on best exchange"""
-    await self.initialize()
-    
-    # Find best exchange for this pair
-    best_exchange = await self.multi_fetcher.get_best_exchange_for_pair(symbol)
-    if best_exchange:
+        """Execute trade on the exchange named by the symbol prefix (Binance by default)"""
+        await self.initialize()
         
         try:
             # Parse symbol if it has exchange prefix
@@ -90,13 +95,9 @@ async def initialize(self):
                 raise Exception("No market data available")
                 
             ml_prediction = self.trainer.predict(latest_data[0])
-            rl_action = self.rl_trainer.predict(latest_data[0])
             
-            # Calculate RL confidence
-            state = self.prepare_state(latest_data[0])
-            state_array = np.array(state).reshape(1, -1)
-            rl_predictions = self.rl_trainer.model.predict(state_array, verbose=0)
-            rl_confidence = np.max(rl_predictions) if rl_predictions.size > 0 else 0.5
+            # RL action and confidence from one numpy forward pass
+            rl_action, rl_confidence = self.policy.predict(latest_data[0])
             
             # Market regime detection
             market_regime = await self.detect_market_regime()
@@ -165,21 +166,14 @@ async def initialize(self):
             
             # Store trade in database
             trade_id = str(uuid.uuid4())
-            db.execute_query(
-                """
-                INSERT INTO trades (id, symbol, side, amount, price, fee, leverage, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    trade_id, 
-                    f"binance:{pair}", 
-                    side, 
-                    amount, 
-                    order.get('price', 0),
-                    order.get('fee', {}).get('cost', 0),
-                    leverage,
-                    datetime.now().isoformat()
-                )
+            db.record_trade(
+                trade_id,
+                f"binance:{pair}",
+                side,
+                amount,
+                order.get('price', 0),
+                order.get('fee', {}).get('cost', 0),
+                leverage
             )
             
             # Create position with dynamic stop-loss/take-profit
@@ -210,26 +204,68 @@ async def initialize(self):
             
             # Store position
             position_id = str(uuid.uuid4())
-            db.execute_query(
-                """
-                INSERT INTO positions (id, symbol, side, amount, entry_price, stop_loss, take_profit, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    position_id,
-                    f"binance:{pair}",
-                    side,
-                    amount,
-                    entry_price,
-                    stop_loss,
-                    take_profit,
-                    datetime.now().isoformat()
-                )
+            db.record_position(
+                position_id,
+                f"binance:{pair}",
+                side,
+                amount,
+                entry_price,
+                stop_loss,
+                take_profit
             )
             
         except Exception as e:
             logger.error(f"Position creation failed: {e}")
 
+    async def close_position(self, exit_order):
+        """Market-close a position whose stop-loss or take-profit was hit.
+        
+        The order goes to the exchange named by the symbol prefix - bare pairs
+        to the first connected exchange, the one the monitor priced them on.
+        """
+        from market.multi_exchange_fetcher import multi_fetcher
+        
+        symbol = exit_order["symbol"]
+        default = next(iter(multi_fetcher.exchanges), None)
+        exchange_name, pair = symbol.split(":", 1) if ":" in symbol else (default, symbol)
+        exchange = multi_fetcher.exchanges.get(exchange_name)
+        entry_side = "buy" if exit_order["side"] == "sell" else "sell"
+        
+        if exchange is None:
+            # No order placed - keep the position on the books rather than record a fill that never
+            # happened, and leave it marked as exiting so reloads don't fire it again every tick
+            logger.error(f"{exchange_name or 'No exchange'} not connected - {exit_order['trigger']} exit of "
+                         f"{symbol} not placed, position left open for a manual close")
+            return
+        
+        try:
+            order = await exchange.create_market_order(pair, exit_order["side"], exit_order["amount"])
+            price = order.get('price') or exit_order["price"]
+            fee = (order.get('fee') or {}).get('cost', 0)
+        except Exception as e:
+            logger.error(f"Position exit order flatlined: {e}")
+            # Re-arm so the next tick retries the exit
+            self.position_monitor.exit_finished(exit_order["position_id"])
+            self.position_monitor.track(
+                exit_order["position_id"], symbol, entry_side, exit_order["amount"],
+                exit_order["entry_price"], exit_order["stop_loss"], exit_order["take_profit"]
+            )
+            return
+        
+        try:
+            db.record_trade(str(uuid.uuid4()), symbol, exit_order["side"], exit_order["amount"], price, fee)
+            db.execute_query("DELETE FROM positions WHERE id = ?", (exit_order["position_id"],))
+            
+            from trading.risk_state import risk_state
+            risk_state.close_position(exit_order["position_id"])
+            
+            logger.info(f"Position {exit_order['position_id']} closed by {exit_order['trigger']} at {price:.4f}")
+            
+        except Exception as e:
+            logger.error(f"Position exit bookkeeping flatlined: {e}")
+        finally:
+            self.position_monitor.exit_finished(exit_order["position_id"])
+
     def calculate_atr(self, data):
         """Calculate Average True Range for dynamic risk management"""
         if not data or len(data) < 2:
@@ -272,7 +308,8 @@ async def initialize(self):
             if len(features) < 3:
                 return "bull"
                 
-            # K-means clustering
+            # K-means clustering (scikit-learn loads on first regime check)
+            from sklearn.cluster import KMeans
             kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
             kmeans.fit(features)
             
@@ -420,6 +457,8 @@ async def initialize(self):
 
     async def close(self):
         """Close exchange connections"""
+        if getattr(self, "position_monitor", None):
+            self.position_monitor.stop()
         if self.exchange:
             await self.exchange.close()
 
@@ -0,0 +1,146 @@
+# trading/var_engine.py
+"""
+Arasaka Tail Sentinel - Historical, parametric and Monte Carlo VaR/CVaR for open positions
+"""
+import threading
+from statistics import NormalDist
+import numpy as np
+
+from config.settings import settings
+from trading.risk_state import risk_state
+from trading.risk_stats import risk_stats
+from utils.logger import logger
+
+METHODS = ("historical", "parametric", "monte_carlo")
+
+def tail_risk(pnl, confidence):
+    """(VaR, CVaR) of a P&L sample as positive loss amounts"""
+    cutoff = np.quantile(pnl, 1 - confidence)
+    tail = pnl[pnl <= cutoff]
+    return max(-float(cutoff), 0.0), max(-float(tail.mean()), 0.0) if len(tail) else 0.0
+
+class VaREngine:
+    """Portfolio value-at-risk and expected shortfall over the open positions.
+    
+    Exposures are the ledger's net notional per symbol; returns, means and the
+    EWMA covariance come from the risk stats cache. All three methods start from
+    one-candle P&L and scale it to the horizon before taking the quantile: the
+    mean grows linearly with the number of candles, the deviation from it with
+    the square root (square-root-of-time applies to sigma only).
+    Monte Carlo shocks are drawn once and reused: for a linear book the
+    scenario P&L is shocks @ (factor' @ exposure), one matrix-vector product.
+    Results are cached until a new candle arrives or exposure changes.
+    """
+    
+    def __init__(self):
+        config = settings.TRADING.get("var", {})
+        self.confidence = config.get("confidence", 0.99)
+        self.horizon = config.get("horizon", 24)
+        self.window = config.get("window", 720)
+        self.simulations = config.get("simulations", 10000)
+        self.t_df = config.get("t_df", 5)
+        self.method = config.get("method", "monte_carlo")
+        self.max_var_pct = config.get("max_var_pct", 0.05)
+        
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(config.get("seed", 7))
+        self._normals = np.zeros((self.simulations, 0))
+        self._mixing = np.sqrt((self.t_df - 2) / self._rng.chisquare(self.t_df, (self.simulations, 1))) if self.t_df and self.t_df > 2 else None
+        self._key = None
+        self._result = None
+    
+    def _draw_shocks(self, n):
+        """Unit-variance multivariate Student-t shocks (normal if t_df is 0).
+        
+        Normals are grown as symbols are added; the chi-square mixing column is
+        shared by every symbol so the tails stay jointly fat.
+        """
+        missing = n - self._normals.shape[1]
+        if missing > 0:
+            self._normals = np.hstack([self._normals, self._rng.standard_normal((self.simulations, missing))])
+        
+        shocks = self._normals[:, :n]
+        if self.t_df and self.t_df > 2:
+            shocks = shocks * self._mixing
+        return shocks
+    
+    def _exposures(self):
+        risk_state.sync(force=False)
+        return {symbol: net for symbol, (gross, net) in risk_state.exposure.items() if net}
+    
+    def calculate(self, exposures=None):
+        """VaR and CVaR by every method for {symbol: net notional} (default: open positions)"""
+        exposures = self._exposures() if exposures is None else exposures
+        book = tuple(sorted(exposures.items()))
+        
+        with self._lock:
+            if self._key == (risk_stats.version, book):
+                return self._result
+            
+            horizon, scale = self.horizon, np.sqrt(self.horizon)
+            gross = float(sum(abs(v) for v in exposures.values()))
+            result = {
+                "confidence": self.confidence,
+                "horizon": self.horizon,
+                "gross_exposure": gross,
+                "coverage": 0.0
+            }
+            for method in METHODS:
+                result[method] = {"var": 0.0, "cvar": 0.0}
+            
+            symbols, mu, cov = risk_stats.covariance(list(exposures), window=self.window)
+            if symbols:
+                e = np.array([exposures[symbol] for symbol in symbols])
+                result["coverage"] = float(np.abs(e).sum() / gross) if gross else 0.0
+                
+                # Historical: replay aligned past returns against today's book
+                aligned, _, returns = risk_stats.aligned_returns(self.window, symbols)
+                pnl = np.nan_to_num(returns) @ np.array([exposures[symbol] for symbol in aligned])
+                drift = pnl.mean() if len(pnl) else 0.0
+                var, cvar = tail_risk(drift * horizon + (pnl - drift) * scale, self.confidence)
+                result["historical"] = {"var": float(var), "cvar": float(cvar)}
+                
+                # Parametric: normal P&L with the EWMA covariance
+                mean = float(e @ mu) * horizon
+                sigma = float(np.sqrt(max(e @ cov @ e, 0.0))) * scale
+                z = NormalDist().inv_cdf(1 - self.confidence)
+                var = max(-(mean + z * sigma), 0.0)
+                cvar = max(-(mean - sigma * NormalDist().pdf(z) / (1 - self.confidence)), 0.0)
+                result["parametric"] = {"var": float(var), "cvar": float(cvar)}
+                
+                # Monte Carlo: fat-tailed shocks through a PSD factor of the covariance
+                eigenvalues, vectors = np.linalg.eigh(cov)
+                factor = vectors * np.sqrt(np.maximum(eigenvalues, 0))
+                pnl = mean + self._draw_shocks(len(symbols)) @ (factor.T @ e) * scale
+                var, cvar = tail_risk(pnl, self.confidence)
+                result["monte_carlo"] = {"var": float(var), "cvar": float(cvar)}
+            
+            self._key = (risk_stats.version, book)
+            self._result = result
+            return result
+    
+    def value_at_risk(self, method=None):
+        """(VaR, CVaR) of the open positions by the configured method"""
+        try:
+            result = self.calculate()
+            risk = result[method or self.method]
+            return risk["var"], risk["cvar"]
+        except Exception as e:
+            logger.error(f"VaR calculation flatlined: {e}")
+            return 0.0, 0.0
+    
+    def leverage_cap(self, leverage, portfolio_value):
+        """Shrink leverage in proportion once VaR exceeds max_var_pct of the portfolio"""
+        if portfolio_value <= 0:
+            return leverage
+        
+        var, _ = self.value_at_risk()
+        var_pct = var / portfolio_value
+        if var_pct > self.max_var_pct:
+            capped = max(1.0, leverage * self.max_var_pct / var_pct)
+            logger.warning(f"VaR {var_pct:.1%} of portfolio exceeds {self.max_var_pct:.1%} - leverage capped at {capped:.2f}x")
+            return min(leverage, capped)
+        return leverage
+
+# Create singleton instance
+var_engine = VaREngine()